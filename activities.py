@@ -0,0 +1,107 @@
+# activities.py
+
+import utime
+
+# --- Feeding types/methods for selection ---
+FEED_TYPES = [
+    "breast milk", "formula", "fortified milk", "other"
+]
+FEED_METHODS = [
+    "both breasts", "left breast", "right breast", "bottle", "other"
+]
+
+# Seconds each running timer stays on the home screen when several run.
+CYCLE = 3
+
+# One row per timed activity:
+# (timer name, home screen label, entry endpoint, confirmation,
+#  extra timer data, prompts asked when stopping as (field, title, options))
+TABLE = (
+    ("feeding", "Feed", "feedings", "Logged!",
+     {"type": "breast milk", "method": "both breasts"},
+     (("type", "Feed Type?", FEED_TYPES), ("method", "Feed Method?", FEED_METHODS))),
+    ("sleep", "Sleep", "sleep", "Sleep Logged", None, ()),
+    ("tummy time", "Tummy", "tummy-times", "Tummy Logged", None, ()),
+    ("pumping", "Pump", "pumping", "Pump Logged", None, ()),
+)
+
+# Timer name -> Baby Buddy endpoint of the entry that finishes it.
+ENDPOINTS = {row[0]: row[2] for row in TABLE}
+
+
+class Activity:
+    """A timed activity and the timer currently running for it, if any."""
+
+    __slots__ = ("name", "label", "endpoint", "done", "data", "prompts", "timer_id", "start")
+
+    def __init__(self, name, label, endpoint, done, data=None, prompts=()):
+        self.name = name
+        self.label = label
+        self.endpoint = endpoint
+        self.done = done
+        self.data = data
+        self.prompts = prompts
+        self.timer_id = None
+        self.start = None
+
+    @property
+    def active(self):
+        return self.timer_id is not None
+
+    def begin(self, timer_id, start=None):
+        self.timer_id = timer_id
+        self.start = utime.time() if start is None else start
+
+    def end(self):
+        self.timer_id = None
+        self.start = None
+
+    def line(self, now):
+        elapsed = max(0, now - self.start)  # the clock may not be set yet
+        return "%s %02d:%02d" % (self.label, elapsed // 3600, (elapsed % 3600) // 60)
+
+
+class Activities:
+    """Registry of the activities in :data:`TABLE`, keyed by timer name."""
+
+    def __init__(self, table=TABLE):
+        self.order = [Activity(*row) for row in table]
+        self.by_name = {a.name: a for a in self.order}
+
+    def get(self, name):
+        return self.by_name[name]
+
+    def running(self):
+        return [a for a in self.order if a.timer_id is not None]
+
+    def count_running(self):
+        n = 0
+        for a in self.order:
+            if a.timer_id is not None:
+                n += 1
+        return n
+
+    def nth_running(self, idx):
+        for a in self.order:
+            if a.timer_id is not None:
+                if not idx:
+                    return a
+                idx -= 1
+        return None
+
+    def next_change_ms(self, now):
+        """Milliseconds until a running timer's display next changes, or None."""
+        # Runs on every clock tick, so it walks the table instead of
+        # building the running() list.
+        ms = None
+        count = 0
+        for a in self.order:
+            if a.timer_id is None:
+                continue
+            count += 1
+            d = (60 - (now - a.start) % 60) * 1000
+            if ms is None or d < ms:
+                ms = d
+        if count > 1:
+            ms = min(ms, (CYCLE - now % CYCLE) * 1000)
+        return ms
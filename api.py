@@ -1,20 +1,75 @@
 # api.py
 import ujson as json
-import urequests as requests
 import time
+import httpclient
+import jsonstream
+from transport import RestTransport
+from activities import ENDPOINTS
+
+# Fields kept from list responses; everything else is dropped while parsing.
+CHILD_FIELDS = ("id", "first_name", "last_name")
+TIMER_FIELDS = ("id", "child", "name", "start", "end")
+# Page size asked of list endpoints; bounds the size of every response.
+PAGE_SIZE = 10
+# Returned by acollect() when the server answers 304 to an ETag.
+NOT_MODIFIED = "not modified"
+
+
+def _quote(value):
+    return str(value).replace("%", "%25").replace("&", "%26").replace(" ", "%20")
+
+
+def _query(params):
+    return "?" + "&".join("%s=%s" % (k, _quote(v)) for k, v in params.items())
+
+
+def _pick(items, match):
+    # acollect()'s answer for a whole list.
+    if match is None:
+        return items
+    for item in items:
+        if match(item):
+            return item
+    return None
+
 
 class BabyBuddyAPI:
-    def __init__(self, secrets_path="secrets.json"):
-        self.secrets = self.load_secrets(secrets_path)
-        self.base_url = self.secrets["api"]["url"]
-        self.token = self.secrets["api"]["token"]
+    def __init__(self, secrets_path="secrets.json", journal=None, load=True, perf=None, config=None,
+                 breaker=None, clock=None, cache=None):
+        # ``config`` is an already parsed secrets dict; skips reading the file.
+        self.secrets = config if config is not None else self.load_secrets(secrets_path)
+        api_cfg = self.secrets["api"]
+        self.base_url = api_cfg["url"]
+        self.base_path = httpclient.split_url(self.base_url)[2]
+        self.token = api_cfg["token"]
         self.headers = {
             "Authorization": f"Token {self.token}",
             "Content-Type": "application/json"
         }
+        # One persistent connection per runtime: the blocking session for
+        # boot and the REPL, the async one for the uasyncio tasks.
+        timeout = api_cfg.get("timeout", httpclient.DEFAULT_TIMEOUT)
+        keep_alive = api_cfg.get("keep_alive", True)
+        self.session = httpclient.Session(
+            self.base_url, timeout=timeout,
+            connect_timeout=api_cfg.get("connect_timeout", httpclient.CONNECT_TIMEOUT),
+            keep_alive=keep_alive)
+        self.asession = httpclient.AsyncSession(self.base_url, timeout=timeout, keep_alive=keep_alive)
+        self.journal = journal
+        self.perf = perf
+        self.breaker = breaker  # netsup.Breaker; fails requests fast while open
+        self.clock = clock      # clock.Clock; checks the RTC against the Date headers
+        self.worker = None      # networker.NetWorker; sends aget/apost from the other core
+        self.cache = cache      # cache.ResponseCache; answers repeated GETs locally
+        # Carries the posts: REST by default, or transport.MqttTransport.
+        self.transport = RestTransport(self)
+        self.last_status = None
+        self.last_etag = None
         self.children = []
         self.child_index = 0
-        self.load_children()
+        self._initials = (None, "No Child")  # (child dict, its initials)
+        if load:
+            self.load_children()
 
     def load_secrets(self, path):
         with open(path) as f:
@@ -22,38 +77,317 @@ class BabyBuddyAPI:
 
     # --- Network Helpers ---
 
-    def get(self, endpoint):
-        url = self.base_url + endpoint + "/"
+    def get(self, endpoint, params=None):
+        url = self._path(endpoint, params)
+        self.last_status = None
+        res = self._cached(endpoint, url)
+        if res is not None:
+            return res
+        if not self._allowed():
+            return None
+        t0 = time.ticks_ms()
         try:
-            resp = requests.get(url, headers=self.headers)
+            resp = self.session.request("GET", url, self.headers)
+            self.last_status = resp.status_code
+            self._seen(resp.headers.get("date"))
             if resp.status_code == 200:
-                return resp.json()
+                res = resp.json()
+                self._keep(endpoint, url, res, len(resp.content))
+                return res
             else:
                 print(f"API GET {url} failed: {resp.status_code}")
         except Exception as e:
             print(f"API GET {url} error: {e}")
+        finally:
+            self._done(endpoint, t0)
         return None
 
     def post(self, endpoint, data):
-        url = self.base_url + endpoint + "/"
+        self.last_status = None
+        if not self._allowed():
+            return None
+        t0 = time.ticks_ms()
+        res, status, date = self.transport.post(endpoint, data)
+        self._wrote(endpoint)
+        return self._posted(endpoint, res, status, date, t0)
+
+    async def aget(self, endpoint, timeout=None, params=None):
+        """Non-blocking GET for the asyncio runtime."""
+        url = self._path(endpoint, params)
+        self.last_status = None
+        res = self._cached(endpoint, url)
+        if res is not None:
+            return res
+        if not self._allowed():
+            return None
+        t0 = time.ticks_ms()
+        if self.worker is not None:
+            res = await self._offload("GET", url, None, endpoint, t0, timeout)
+            self._keep(endpoint, url, res)
+            return res
         try:
-            resp = requests.post(url, headers=self.headers, data=json.dumps(data))
-            if resp.status_code in (200, 201):
-                return resp.json()
+            resp = await self.asession.request("GET", url, self.headers, timeout=timeout)
+            self.last_status = resp.status_code
+            self._seen(resp.headers.get("date"))
+            if resp.status_code == 200:
+                res = resp.json()
+                self._keep(endpoint, url, res, len(resp.content))
+                return res
             else:
-                print(f"API POST {url} failed: {resp.status_code}")
+                print(f"API GET {url} failed: {resp.status_code}")
         except Exception as e:
-            print(f"API POST {url} error: {e}")
+            print(f"API GET {url} error: {e}")
+        finally:
+            self._done(endpoint, t0)
         return None
 
+    async def apost(self, endpoint, data, timeout=None):
+        """Non-blocking POST for the asyncio runtime."""
+        self.last_status = None
+        if not self._allowed():
+            return None
+        t0 = time.ticks_ms()
+        res, status, date = await self.transport.apost(endpoint, data, timeout)
+        self._wrote(endpoint)
+        return self._posted(endpoint, res, status, date, t0)
+
+    def _posted(self, endpoint, res, status, date, t0):
+        self.last_status = status
+        self._seen(date)
+        self._done(endpoint, t0)
+        if status is not None and res is None:
+            print(f"API POST {endpoint} failed: {status}")
+        return res
+
+    async def _offload(self, method, url, data, endpoint, t0, timeout=None):
+        """Have the network worker send the request, encode and parse it,
+        and wait for the answer without blocking the event loop."""
+        try:
+            res, status, date = await self.worker.call(method, url, data, timeout)
+        except Exception as e:
+            print(f"API {method} {url} error: {e}")
+            res = status = date = None
+        self.last_status = status
+        self._seen(date)
+        self._done(endpoint, t0)
+        if status is not None and res is None:
+            print(f"API {method} {url} failed: {status}")
+        return res
+
+    def _path(self, endpoint, params=None):
+        return self.base_path + endpoint + "/" + (_query(params) if params else "")
+
+    # --- Response cache ---
+
+    def _cache_key(self, endpoint, path, fields=None):
+        """Cache key of a GET, or None if its endpoint is not cached."""
+        if self.cache is None or not self.cache.cacheable(endpoint):
+            return None
+        return path + "#" + ",".join(fields) if fields else path
+
+    def _cached(self, endpoint, path, fields=None):
+        key = self._cache_key(endpoint, path, fields)
+        if key is None:
+            return None
+        res = self.cache.get(key)
+        if res is not None:
+            self.last_status = 200
+        return res
+
+    def _keep(self, endpoint, path, res, size=None, fields=None):
+        key = self._cache_key(endpoint, path, fields)
+        if key is not None and res is not None:
+            self.cache.put(endpoint, key, res, size)
+
+    def _wrote(self, endpoint):
+        # Also after a failed or timed-out post, which the server may
+        # still have applied.
+        if self.cache is not None:
+            self.cache.written(endpoint)
+
+    def _allowed(self):
+        return self.breaker is None or self.breaker.allow()
+
+    def _seen(self, date):
+        if self.clock is not None:
+            self.clock.observe(date)
+
+    def _done(self, endpoint, t0):
+        # Streamed lists are timed to the response headers only.
+        if self.perf is not None:
+            self.perf.request(endpoint, t0, self.last_status)
+        if self.breaker is not None:
+            self.breaker.record(self.last_status)
+
+    def _list_path(self, endpoint, params):
+        query = {"limit": PAGE_SIZE}
+        if params:
+            query.update(params)
+        return self.base_path + endpoint + "/" + _query(query)
+
+    def iter_results(self, endpoint, params=None, fields=None):
+        """Yield list results one object at a time, following pagination lazily.
+
+        Pages are parsed while they stream in and trimmed to ``fields``, so
+        only one object is held in memory at once. Iteration ends quietly on
+        a network or HTTP error, leaving :attr:`last_status` other than 200.
+        Close the generator if you stop early.
+        """
+        path = self._list_path(endpoint, params)
+        while path:
+            self.last_status = None
+            if not self._allowed():
+                return
+            t0 = time.ticks_ms()
+            try:
+                resp = self.session.request("GET", path, self.headers, stream=True)
+            except Exception as e:
+                print(f"API GET {path} error: {e}")
+                self._done(endpoint, t0)
+                return
+            self.last_status = resp.status_code
+            self._seen(resp.headers.get("date"))
+            self._done(endpoint, t0)
+            parser = jsonstream.ResultsParser(fields)
+            try:
+                if resp.status_code != 200:
+                    print(f"API GET {path} failed: {resp.status_code}")
+                    return
+                while True:
+                    chunk = resp.raw.read()
+                    if not chunk:
+                        break
+                    for item in parser.feed(chunk):
+                        yield item
+            except Exception as e:
+                print(f"API GET {path} error: {e}")
+                self.last_status = None  # the list is incomplete
+                return
+            finally:
+                resp.close()
+            nxt = parser.meta.get("next")
+            path = httpclient.split_url(nxt)[2] if nxt else None
+
+    async def acollect(self, endpoint, params=None, fields=None, match=None, timeout=None,
+                       etag=None, fresh=False):
+        """Async counterpart of :meth:`iter_results`.
+
+        Returns the list of all results, or with ``match`` the first result
+        it accepts (None if there is none). Returns None on errors.
+
+        With ``etag`` the request is conditional: :data:`NOT_MODIFIED` comes
+        back if the list is unchanged. :attr:`last_etag` holds the tag of a
+        complete single-page answer, None if there is nothing to reuse.
+        Without one, and unless ``fresh`` is set, the list comes from
+        :attr:`cache` when it has it; complete answers are kept there.
+        """
+        path = self._list_path(endpoint, params)
+        cached = None if etag or fresh else self._cached(endpoint, path, fields)
+        if cached is not None:
+            self.last_etag = None
+            return _pick(cached, match)
+        keep = self._cache_key(endpoint, path) is not None
+        if keep:
+            # Read the whole list so it can be kept; match it afterwards.
+            match, wanted = None, match
+        items = []
+        headers = self.headers
+        if etag:
+            headers = dict(headers)
+            headers["If-None-Match"] = etag
+        self.last_etag = None
+        first = True
+        while path:
+            self.last_status = None
+            if not self._allowed():
+                return None
+            t0 = time.ticks_ms()
+            try:
+                resp = await self.asession.request("GET", path, headers, stream=True,
+                                                   timeout=timeout)
+            except Exception as e:
+                print(f"API GET {path} error: {e}")
+                self._done(endpoint, t0)
+                return None
+            self.last_status = resp.status_code
+            self._seen(resp.headers.get("date"))
+            self._done(endpoint, t0)
+            parser = jsonstream.ResultsParser(fields)
+            try:
+                if resp.status_code == 304 and etag:
+                    self.last_etag = etag
+                    return NOT_MODIFIED
+                if resp.status_code != 200:
+                    print(f"API GET {path} failed: {resp.status_code}")
+                    return None
+                while True:
+                    chunk = await resp.raw.read()
+                    if not chunk:
+                        break
+                    for item in parser.feed(chunk):
+                        if match is None:
+                            items.append(item)
+                        elif match(item):
+                            return item
+            except Exception as e:
+                print(f"API GET {path} error: {e}")
+                return None
+            finally:
+                await resp.raw.close()
+            nxt = parser.meta.get("next")
+            if first:
+                # Only the first page is tagged; the tag stands for the
+                # whole list only if that page was all of it.
+                self.last_etag = None if nxt else resp.headers.get("etag")
+                headers = self.headers
+                first = False
+            path = httpclient.split_url(nxt)[2] if nxt else None
+        if keep:
+            self._keep(endpoint, self._list_path(endpoint, params), items, fields=fields)
+            return _pick(items, wanted)
+        return None if match else items
+
+    def collect(self, endpoint, params=None, fields=None):
+        """All results of a list endpoint, from :attr:`cache` when it has them;
+        None on errors."""
+        path = self._list_path(endpoint, params)
+        items = self._cached(endpoint, path, fields)
+        if items is not None:
+            return items
+        items = list(self.iter_results(endpoint, params, fields))
+        if self.last_status != 200:
+            return None
+        self._keep(endpoint, path, items, fields=fields)
+        return items
+
+    def submit(self, endpoint, data, tag=None):
+        """Record a write. With a journal attached it is queued on flash and
+        acknowledged at once; otherwise it is posted immediately. ``tag``
+        goes with the journal entry (see :attr:`Journal.on_settle`)."""
+        if self.journal is None:
+            return self.post(endpoint, data)
+        self.journal.append(endpoint, data, tag=tag)
+        return {"queued": True}
+
+    def replay(self, limit=None):
+        """Push queued journal entries to the server."""
+        if self.journal is None:
+            return 0
+        return self.journal.replay(self, limit)
+
+    async def areplay(self, limit=None):
+        if self.journal is None:
+            return 0
+        return await self.journal.areplay(self, limit)
+
     # --- Children Management ---
 
     def load_children(self):
-        resp = self.get("children")
-        if resp and "results" in resp:
-            self.children = resp["results"]
-        else:
-            self.children = []
+        self.children = list(self.collect("children", fields=CHILD_FIELDS) or ())
+        self.child_index = 0
+
+    async def aload_children(self):
+        self.children = list(await self.acollect("children", fields=CHILD_FIELDS) or ())
         self.child_index = 0
 
     def active_child(self):
@@ -62,11 +396,18 @@ class BabyBuddyAPI:
         return self.children[self.child_index]
 
     def child_initials(self):
+        # Called on every home screen render: the string is only rebuilt
+        # when the active child is a different object.
         child = self.active_child()
+        if child is self._initials[0]:
+            return self._initials[1]
         if not child:
-            return "No Child"
-        name = child.get("first_name", "") + " " + child.get("last_name", "")
-        return "".join([n[0].upper() for n in name.split() if n])[:4]  # max 4 initials
+            initials = "No Child"
+        else:
+            name = child.get("first_name", "") + " " + child.get("last_name", "")
+            initials = "".join([n[0].upper() for n in name.split() if n])[:4]  # max 4 initials
+        self._initials = (child, initials)
+        return initials
 
     def next_child(self):
         if not self.children:
@@ -80,18 +421,29 @@ class BabyBuddyAPI:
 
     # --- Activity Timers ---
 
-    def get_active_timer(self, activity_name):
-        resp = self.get("timers")
-        if not resp or "results" not in resp:
-            return None
+    def _timer_query(self, activity_name):
+        """Server-side filter for the active child's running timers, plus a
+        local check in case the server ignores some of the parameters."""
         child = self.active_child()
         if not child:
-            return None
+            return None, None
         child_id = child["id"]
-        for t in resp["results"]:
-            if t["child"] == child_id and t["name"] == activity_name and t["end"] is None:
-                return t
-        return None
+
+        def match(t):
+            return t.get("child") == child_id and t.get("name") == activity_name and t.get("end") is None
+        return {"child": child_id, "active": "true"}, match
+
+    def get_active_timer(self, activity_name):
+        params, match = self._timer_query(activity_name)
+        if params is None:
+            return None
+        return _pick(self.collect("timers", params, TIMER_FIELDS) or (), match)
+
+    async def aget_active_timer(self, activity_name):
+        params, match = self._timer_query(activity_name)
+        if params is None:
+            return None
+        return await self.acollect("timers", params, TIMER_FIELDS, match)
 
     def start_timer(self, activity_name, data=None):
         """Start a new timer for the active child."""
@@ -105,23 +457,23 @@ class BabyBuddyAPI:
         }
         if data:
             payload.update(data)
+        if self.journal is not None:
+            # Hand out a local id now; the journal maps it to the server id
+            # when the start is replayed.
+            local_id = self.journal.new_local_id()
+            self.journal.append("timers", payload, local_id)
+            return {"id": local_id, "queued": True}
         return self.post("timers", payload)
 
-    def finish_timer(self, activity_name, timer_id, data=None):
+    def finish_timer(self, activity_name, timer_id, data=None, tag=None):
         """Finalize a running timer by creating the corresponding entry."""
-        endpoint_map = {
-            "feeding": "feedings",
-            "sleep": "sleep",
-            "tummy time": "tummy-times",
-            "pumping": "pumping",
-        }
-        endpoint = endpoint_map.get(activity_name)
+        endpoint = ENDPOINTS.get(activity_name)
         if not endpoint:
             print(f"No endpoint for activity '{activity_name}'")
             return None
         payload = data or {}
         payload["timer"] = timer_id
-        return self.post(endpoint, payload)
+        return self.submit(endpoint, payload, tag)
 
     # --- Feeding Example ---
 
@@ -139,37 +491,49 @@ class BabyBuddyAPI:
 
     # --- Additional Logging Helpers ---
 
-    def log_diaper_change(self, wet=True, solid=False):
+    def log_diaper_change(self, wet=True, solid=False, tag=None):
         """Log a diaper change entry."""
+        child = self.active_child()
+        if not child:
+            print("No active child available for diaper change")
+            return None
         payload = {
-            "child": self.active_child()["id"],
+            "child": child["id"],
             "wet": 1 if wet else 0,
             "solid": 1 if solid else 0,
         }
-        return self.post("changes", payload)
+        return self.submit("changes", payload, tag)
 
-    def log_weight(self, weight):
+    def log_weight(self, weight, tag=None):
         """Log a weight measurement (in grams)."""
+        child = self.active_child()
+        if not child:
+            print("No active child available for weight")
+            return None
         payload = {
-            "child": self.active_child()["id"],
+            "child": child["id"],
             "weight": weight,
         }
-        return self.post("weight", payload)
+        return self.submit("weight", payload, tag)
 
-    def log_temperature(self, temperature):
+    def log_temperature(self, temperature, tag=None):
         """Log a temperature measurement in Celsius."""
+        child = self.active_child()
+        if not child:
+            print("No active child available for temperature")
+            return None
         payload = {
-            "child": self.active_child()["id"],
+            "child": child["id"],
             "temperature": temperature,
         }
-        return self.post("temperature", payload)
+        return self.submit("temperature", payload, tag)
 
     # --- Status and Error Handling ---
 
     def is_connected(self):
         """Check API availability using authentication headers."""
         try:
-            resp = requests.get(self.base_url, headers=self.headers)
+            resp = self.session.request("GET", self.base_path, self.headers)
             return resp.status_code == 200
         except Exception as e:
             print(f"API connection check failed: {e}")
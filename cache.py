@@ -0,0 +1,119 @@
+# cache.py
+
+import ujson as json
+import utime
+from activities import ENDPOINTS
+
+# Seconds a GET answer stays fresh, per endpoint; endpoints not listed are
+# not cached. Timers also start and stop elsewhere, so they are kept only
+# briefly (sync.py follows them with conditional requests anyway).
+TTLS = {"children": 3600, "timers": 30}
+# Bounds for the whole cache: the number of answers, and the size of their
+# JSON bodies (B), so it stays a small, fixed part of the heap.
+MAX_ENTRIES = 8
+MAX_BYTES = 4096
+# Endpoints a write to the key changes besides itself: an entry posted for
+# a timed activity stops its timer.
+RELATED = {endpoint: ("timers",) for endpoint in ENDPOINTS.values()}
+
+
+class ResponseCache:
+    """Bounded read-through cache of parsed GET answers.
+
+    Answers are keyed by request path (endpoint and query) and expire
+    after their endpoint's TTL, counted in ticks so clock steps do not
+    matter. When an answer would not fit in ``max_entries`` or
+    ``max_bytes``, the least recently used ones are dropped first.
+    :meth:`written` drops everything a write may have changed. Cached
+    values are shared with every caller, so treat them as read-only.
+    """
+
+    def __init__(self, ttls=TTLS, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, related=RELATED):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.related = related
+        self.entries = {}   # key -> [endpoint, value, size, expires (ticks_ms), last use]
+        self.bytes = 0
+        self.uses = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def cacheable(self, endpoint):
+        return self.ttls.get(endpoint, 0) > 0
+
+    def get(self, key):
+        """The fresh value cached under ``key``, or None."""
+        entry = self.entries.get(key)
+        if entry is not None and utime.ticks_diff(entry[3], utime.ticks_ms()) <= 0:
+            self._drop(key)
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.uses += 1
+        entry[4] = self.uses
+        self.hits += 1
+        return entry[1]
+
+    def put(self, endpoint, key, value, size=None):
+        """Keep an answer of ``endpoint``; ``size`` is its body length (B)."""
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0 or value is None:
+            return
+        if size is None:
+            size = len(json.dumps(value))
+        self._drop(key)
+        if size > self.max_bytes:
+            return
+        while self.entries and (len(self.entries) >= self.max_entries
+                                or self.bytes + size > self.max_bytes):
+            self._evict()
+        self.uses += 1
+        self.entries[key] = [endpoint, value, size, utime.ticks_add(utime.ticks_ms(), int(ttl * 1000)),
+                             self.uses]
+        self.bytes += size
+
+    def invalidate(self, endpoint):
+        """Drop every answer of ``endpoint``."""
+        for key in [k for k, e in self.entries.items() if e[0] == endpoint]:
+            self._drop(key)
+            self.invalidations += 1
+
+    def written(self, endpoint):
+        """Drop what a write to ``endpoint`` may have made stale."""
+        self.invalidate(endpoint)
+        for other in self.related.get(endpoint, ()):
+            self.invalidate(other)
+
+    def clear(self):
+        self.entries = {}
+        self.bytes = 0
+
+    def _evict(self):
+        oldest = None
+        for key, entry in self.entries.items():
+            if oldest is None or entry[4] < self.entries[oldest][4]:
+                oldest = key
+        self._drop(oldest)
+        self.evictions += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,276 @@
+# clock.py
+
+import machine
+import struct
+import utime
+import uasyncio as asyncio
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+
+NTP_HOST = "time.microsoft.com"
+NTP_PORT = 123
+# Seconds between 1900 (NTP) and the epoch of utime.time(), as in ntptime.
+NTP_DELTA = 3155673600 if utime.gmtime(0)[0] == 2000 else 2208988800
+# Deadline of one NTP exchange (ms).
+NTP_TIMEOUT = 2000
+# Time between NTP checks once the clock is good (s); HTTP Date headers
+# watch it in between. A failed check is retried after RETRY_MIN,
+# doubling up to RETRY_MAX.
+RESYNC = 24 * 3600
+RETRY_MIN = 60
+RETRY_MAX = 3600
+# Drift samples need at least this long a baseline (s); the estimate is
+# clamped to +-MAX_PPM and moves by DRIFT_WEIGHT of each new sample.
+MIN_BASELINE = 3600
+MAX_PPM = 500
+DRIFT_WEIGHT = 0.5
+# An HTTP Date more than this far from the RTC (s) means the RTC is off.
+DATE_SLACK = 2
+# Receive and second-edge poll periods (s).
+POLL = 0.02
+EDGE_POLL = 0.005
+
+_MONTHS = "JanFebMarAprMayJunJulAugSepOctNovDec"
+
+
+def parse_http_date(text):
+    """Epoch seconds of an HTTP ``Date`` (``Sun, 06 Nov 1994 08:49:37 GMT``),
+    or None if the text does not parse."""
+    try:
+        _, day, mon, year, clock, _ = text.split()
+        month = _MONTHS.index(mon)
+        if month % 3:
+            return None
+        h, mi, s = clock.split(":")
+        return utime.mktime((int(year), month // 3 + 1, int(day), int(h), int(mi), int(s), 0, 0))
+    except (AttributeError, ValueError):
+        return None
+
+
+def set_rtc(t):
+    tm = utime.gmtime(t)
+    machine.RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], 0))
+
+
+class Clock:
+    """Keeps the RTC on time without ever blocking the event loop.
+
+    :meth:`run` asks an NTP server over a non-blocking UDP socket once the
+    link is up and then every :data:`RESYNC` seconds. Each answer is
+    compared with the RTC at the moment its second turns over, so the
+    error is known to a few ms, and the RTC is set on a true second
+    boundary. Errors seen over a long enough baseline give the RTC's drift,
+    which is corrected between checks by one-second steps timed from the
+    estimate. :meth:`observe` takes the ``Date`` header of every Baby Buddy
+    answer: it sets a clock that NTP has not reached yet and steps one
+    that has wandered more than :data:`DATE_SLACK` seconds.
+
+    ``on_step(delta, first)`` is called after the RTC moved by ``delta``
+    seconds; ``first`` is True for the step that first set it.
+    """
+
+    def __init__(self, host=NTP_HOST, port=NTP_PORT, power=None, on_step=None):
+        self.host = host
+        self.port = port
+        self.power = power
+        self.on_step = on_step
+        self.synced = False         # set from NTP or an HTTP Date
+        self.source = None          # "ntp" or "http"
+        self.busy = False           # an exchange or a step is in progress
+        self.drift = None           # ppm, positive when the RTC runs slow
+        self.set_at = None          # RTC second of the last NTP set
+        self.corrected = 0          # ms stepped for drift since then
+        self.due = 0                # utime.time() of the next NTP check
+        self.retry = RETRY_MIN
+        self.last_error = None      # ms, of the last NTP check
+        self.syncs = 0
+        self.failures = 0
+        self.steps = 0
+        self.http_steps = 0
+        self._addr = None
+        self._wake = asyncio.Event()
+
+    # --- NTP ---
+
+    async def _query(self):
+        """One SNTP exchange: the server's time as (seconds, ms) and the
+        ticks_ms it stands for (halfway through the round trip), or None."""
+        if self._addr is None:
+            self._addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            query = bytearray(48)
+            query[0] = 0x1B  # version 3, client
+            t0 = utime.ticks_ms()
+            sock.sendto(query, self._addr)
+            while True:
+                try:
+                    msg = sock.recv(48)
+                    break
+                except OSError:
+                    if utime.ticks_diff(utime.ticks_ms(), t0) > NTP_TIMEOUT:
+                        return None
+                    await asyncio.sleep(POLL)
+            t1 = utime.ticks_ms()
+        finally:
+            sock.close()
+        if len(msg) < 48 or msg[1] == 0:  # short, or a kiss-o'-death
+            return None
+        sec, frac = struct.unpack_from("!II", msg, 40)
+        if not sec:
+            return None
+        return sec - NTP_DELTA, (frac >> 22) * 1000 >> 10, utime.ticks_add(t0, utime.ticks_diff(t1, t0) // 2)
+
+    async def _edge(self):
+        """Wait for the RTC second to turn over; returns it and the ticks_ms."""
+        t = utime.time()
+        while True:
+            await asyncio.sleep(EDGE_POLL)
+            now = utime.time()
+            if now != t:
+                return now, utime.ticks_ms()
+
+    async def measure(self):
+        """RTC error against the server in ms (positive: RTC behind), or None."""
+        sec, edge = await self._edge()
+        answer = await self._query()
+        if answer is None:
+            return None
+        true_sec, true_ms, at = answer
+        return (true_sec - sec) * 1000 + true_ms - utime.ticks_diff(at, edge)
+
+    async def _step(self, error_ms):
+        """Move the RTC by ``error_ms``, setting it on a true second boundary;
+        returns the new RTC second."""
+        sec, edge = await self._edge()
+        wait = -error_ms % 1000
+        if wait:
+            await asyncio.sleep(wait / 1000)
+        t = sec + (error_ms + wait) // 1000
+        set_rtc(t)
+        return t
+
+    async def sync(self):
+        """Check the RTC against NTP, learn its drift and set it; returns
+        the error in ms, or None if the server did not answer."""
+        self.busy = True
+        try:
+            try:
+                error = await self.measure()
+            except OSError as e:
+                print("NTP error:", e)
+                self._addr = None
+                error = None
+            now = utime.time()
+            if error is None:
+                self.failures += 1
+                self.due = now + self.retry
+                self.retry = min(RETRY_MAX, self.retry * 2)
+                return None
+            if self.source == "ntp" and now - self.set_at >= MIN_BASELINE:
+                sample = (error + self.corrected) * 1000 / (now - self.set_at)
+                sample = max(-MAX_PPM, min(MAX_PPM, sample))
+                if self.drift is None:
+                    self.drift = sample
+                else:
+                    self.drift += (sample - self.drift) * DRIFT_WEIGHT
+            first = not self.synced
+            self.set_at = await self._step(error)
+            self.corrected = 0
+            self.synced = True
+            self.source = "ntp"
+            self.last_error = error
+            self.syncs += 1
+            self.due = self.set_at + RESYNC
+            self.retry = RETRY_MIN
+        finally:
+            self.busy = False
+        self._stepped((error + 500) // 1000, first)
+        return error
+
+    # --- Drift ---
+
+    def next_correction(self):
+        """utime.time() of the next drift step, or None if none is due."""
+        if self.drift is None or self.source != "ntp" or abs(self.drift) < 0.01:
+            return None
+        half = 500 if self.drift > 0 else -500
+        return self.set_at + int((self.corrected + half) * 1000 / self.drift)
+
+    async def correct(self):
+        """Step the RTC by the second its drift has cost since the last step."""
+        sign = 1 if self.drift > 0 else -1
+        self.busy = True
+        try:
+            await self._step(sign * 1000)
+        finally:
+            self.busy = False
+        self.corrected += sign * 1000
+        self.steps += 1
+        self._stepped(sign, False)
+
+    # --- HTTP Date ---
+
+    def observe(self, date):
+        """Check the RTC against the ``Date`` header of a server answer."""
+        t = parse_http_date(date)
+        if t is None or self.busy:
+            return
+        # The header is truncated to the second and a round trip old.
+        delta = t - utime.time()
+        if self.synced and -DATE_SLACK <= delta <= DATE_SLACK:
+            return
+        first = not self.synced
+        set_rtc(t)
+        self.synced = True
+        self.source = "http"
+        self.http_steps += 1
+        self.due = min(self.due, utime.time())  # ask NTP for the fine setting
+        self._wake.set()
+        self._stepped(delta, first)
+
+    def _stepped(self, delta, first):
+        if self.on_step is not None and (delta or first):
+            self.on_step(delta, first)
+
+    # --- Task ---
+
+    async def run(self, online):
+        """Check NTP whenever ``online`` is set and a check is due; step for
+        drift in between."""
+        while True:
+            now = utime.time()
+            if now >= self.due:
+                await online.wait()
+                await self.sync()
+                continue
+            at = self.due
+            step = self.next_correction()
+            if step is not None and step <= now:
+                await self.correct()
+                continue
+            if step is not None and step < at:
+                at = step
+            wait = at - now
+            if self.power is not None:
+                self.power.wake_in("ntp", wait * 1000)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {
+            "synced": self.synced,
+            "source": self.source,
+            "error_ms": self.last_error,
+            "drift_ppm": None if self.drift is None else round(self.drift, 1),
+            "syncs": self.syncs,
+            "failures": self.failures,
+            "steps": self.steps,
+            "http_steps": self.http_steps,
+        }
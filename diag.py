@@ -0,0 +1,141 @@
+# diag.py
+# Read-back side of perf.py: summaries, the JSON dump and the diagnostics
+# screen pages. Imported on first use only.
+
+import gc
+import ujson as json
+import utime
+from perf import EDGES, NBUCKETS, NSTATS, COUNT, ERRORS, TOTAL, MAX
+
+
+def largest_block(limit):
+    """Largest single allocation that currently succeeds, to within 64 bytes."""
+    lo, hi = 0, limit
+    while hi - lo > 64:
+        mid = (lo + hi) // 2
+        try:
+            buf = bytearray(mid)
+            del buf
+            lo = mid
+        except MemoryError:
+            hi = mid
+    return lo
+
+
+def sample_fragmentation(perf):
+    """Update the largest-block and fragmentation marks.
+
+    MicroPython has no call for the largest free block, so it is found by
+    trial allocation; that allocates and may collect, so it only runs here.
+    """
+    if not hasattr(gc, "mem_free"):
+        return
+    perf.sample_heap()
+    free = gc.mem_free()
+    block = largest_block(free)
+    heap = perf.heap
+    if heap[1] < 0 or block < heap[1]:
+        heap[1] = block
+    frag = 100 - block * 100 // free if free else 0
+    if frag > heap[2]:
+        heap[2] = frag
+
+
+def quantile(perf, name, q):
+    """Upper bound of quantile ``q`` of ``name`` in ms, or None if empty."""
+    slot = perf.slots[name]
+    count = perf.stats[slot * NSTATS + COUNT]
+    if not count:
+        return None
+    worst = perf.stats[slot * NSTATS + MAX]
+    need = count * q
+    seen = 0
+    for b in range(len(EDGES)):
+        seen += perf.hist[slot * NBUCKETS + b]
+        if seen >= need:
+            return min(EDGES[b], worst)
+    return worst
+
+
+def summary(perf, name):
+    slot = perf.slots[name]
+    base = slot * NSTATS
+    count = perf.stats[base + COUNT]
+    return {
+        "n": count,
+        "errors": perf.stats[base + ERRORS],
+        "mean_ms": perf.stats[base + TOTAL] // count if count else 0,
+        "p50_ms": quantile(perf, name, 0.5),
+        "p95_ms": quantile(perf, name, 0.95),
+        "max_ms": perf.stats[base + MAX],
+        "buckets": list(perf.hist[slot * NBUCKETS:(slot + 1) * NBUCKETS]),
+    }
+
+
+def snapshot(perf):
+    sample_fragmentation(perf)
+    out = {
+        "uptime_s": utime.ticks_diff(utime.ticks_ms(), perf.since) // 1000,
+        "boot_ms": perf.boot[0],
+        "boot_heap": perf.boot[1],
+        "edges_ms": list(EDGES),
+        "faults": perf.faults,
+        "series": {},
+        "heap": {
+            "free": gc.mem_free() if hasattr(gc, "mem_free") else None,
+            "free_low": perf.heap[0],
+            "block_low": perf.heap[1],
+            "frag_max_pct": perf.heap[2],
+        },
+    }
+    churn = perf.churn
+    if churn[0] or churn[3]:
+        out["render_alloc"] = {
+            "n": churn[0],
+            "mean_b": churn[1] // churn[0] if churn[0] else 0,
+            "max_b": churn[2],
+            "gc_during": churn[3],
+        }
+    for name in perf.series:
+        if perf.stats[perf.slots[name] * NSTATS + COUNT]:
+            out["series"][name or "root"] = summary(perf, name)
+    if perf.lcd is not None:
+        out["lcd"] = {"writes": perf.lcd.i2c_writes, "bytes": perf.lcd.i2c_bytes}
+    if perf.clock is not None:
+        out["clock"] = perf.clock.stats()
+    if perf.cache is not None:
+        out["cache"] = perf.cache.stats()
+    return out
+
+
+def dump(perf):
+    """Print the snapshot as one JSON line, e.g. to the serial console."""
+    print("PERF " + json.dumps(snapshot(perf)))
+
+
+def pages(perf):
+    """Two-line pages for the diagnostics screen."""
+    snap = snapshot(perf)
+    heap = snap["heap"]
+    out = [("Boot %d ms" % snap["boot_ms"], "heap %d B" % snap["boot_heap"])]
+    if heap["free"] is not None:
+        out.append(("Heap free %d" % heap["free"], "low %d" % heap["free_low"]))
+        out.append(("Frag max %d%%" % heap["frag_max_pct"], "block low %d" % heap["block_low"]))
+    if "render_alloc" in snap:
+        ra = snap["render_alloc"]
+        out.append(("Render alloc B", "%d max%d gc%d" % (ra["mean_b"], ra["max_b"], ra["gc_during"])))
+    if snap["faults"]:
+        out.append(("Action errors", "%d" % snap["faults"]))
+    if "lcd" in snap:
+        out.append(("LCD writes", "%d %dB" % (snap["lcd"]["writes"], snap["lcd"]["bytes"])))
+    if "clock" in snap:
+        c = snap["clock"]
+        out.append(("Clock %s %sms" % (c["source"] or "unset", c["error_ms"]),
+                    "drift %s st%d" % (c["drift_ppm"], c["steps"] + c["http_steps"])))
+    if "cache" in snap:
+        c = snap["cache"]
+        out.append(("Cache hit %d" % c["hits"], "miss %d inv %d" % (c["misses"], c["invalidations"])))
+    for name, s in snap["series"].items():
+        out.append(("%s n%d e%d" % (name[:8], s["n"], s["errors"]),
+                    "p50<%s max%d" % (s["p50_ms"], s["max_ms"])))
+    return out
@@ -1,70 +1,181 @@
 # hardware.py
 
 from machine import Pin, I2C
-from time import ticks_ms, ticks_diff, sleep_ms
+from time import ticks_ms, ticks_diff
 from machine_i2c_lcd import I2cLcd
 from rotary_irq import RotaryIRQ
 
+# The LCD is an HD44780 behind a PCF8574 expander in 4-bit mode: every LCD
+# byte is four expander bytes (high nibble with and without E, then low).
+_RS = 0x01
+_E = 0x04
+_BACKLIGHT = 0x08
+_CMD_CGRAM = 0x40
+_CMD_DDRAM = 0x80
+_SPACE = 0x20
+
+# A gap between encoder detents this long (ms) or longer counts as the
+# knob being at rest; speed() reads 1000 / gap detents per second.
+ENCODER_REST_MS = 500
+
+
 class LCDDisplay:
     def __init__(self, i2c_addr=0x27, rows=2, cols=16, sda=20, scl=21, freq=100_000):
         self.i2c = I2C(0, sda=Pin(sda), scl=Pin(scl), freq=freq)
         self.lcd = I2cLcd(self.i2c, i2c_addr, rows, cols)
+        self.addr = i2c_addr
         self.rows = rows
         self.cols = cols
-        self._lines = ["", ""]
+        # Framebuffer of what the panel shows, so only changed cells are sent.
+        self._fb = bytearray(b" " * (rows * cols))
+        self._row = bytearray(cols)
+        # One frame: a cursor move plus data for every cell, or a glyph load.
+        self._out = bytearray(4 * max(rows * (cols + 1), 9))
+        self._n = 0
+        # memoryview slices of _out by length // 4, made on first use so a
+        # flush does not allocate once the common frame sizes have been seen.
+        self._views = [None] * (len(self._out) // 4 + 1)
+        self._cursor = -1   # DDRAM address the panel will write next, -1 unknown
+        self.i2c_bytes = 0
+        self.i2c_writes = 0
 
     def clear(self):
         self.lcd.clear()
-        self._lines = ["", ""]
+        for i in range(len(self._fb)):
+            self._fb[i] = _SPACE
+        self._cursor = -1
 
     def show(self, line1, line2=""):
-        lines = [line1[:self.cols], line2[:self.cols]]
-        for row in range(min(self.rows, 2)):
-            if self._lines[row] != lines[row]:
-                self.show_line(row, lines[row])
+        self._set_row(0, line1)
+        if self.rows > 1:
+            self._set_row(1, line2)
+        self._flush()
+
+    def show_codes(self, line1, line2=None):
+        """Like :meth:`show` for rows already encoded as character codes.
+
+        Each row is a ``cols`` long bytearray the caller keeps and reuses;
+        it is diffed in place, so nothing is allocated.
+        """
+        self._diff_row(0, line1)
+        if line2 is not None and self.rows > 1:
+            self._diff_row(1, line2)
+        self._flush()
 
     def show_line(self, row, text):
-        self.lcd.move_to(0, row)
-        self.lcd.putstr(" " * self.cols)
-        self.lcd.move_to(0, row)
-        self.lcd.putstr(text[:self.cols])
-        if row < len(self._lines):
-            self._lines[row] = text[:self.cols]
+        if row < self.rows:
+            self._set_row(row, text)
+            self._flush()
+
+    def write(self, row, col, text, flush=True):
+        """Update part of a row, leaving the other cells as they are.
+
+        With ``flush=False`` the cells are only queued, so several writes
+        go out as one I2C transfer with the next flushing call.
+        """
+        if row >= self.rows or col >= self.cols:
+            return
+        buf = self._row
+        fb = self._fb
+        base = row * self.cols
+        for i in range(self.cols):
+            buf[i] = fb[base + i]
+        for i in range(min(len(text), self.cols - col)):
+            buf[col + i] = _code(text[i])
+        self._diff_row(row)
+        if flush:
+            self._flush()
+
+    def define_glyph(self, slot, bitmap):
+        """Load a 5x8 bitmap (eight row values) into CGRAM slot 0-7.
+
+        Show it by putting ``chr(slot)`` in any text; cells already showing
+        the slot change at once.
+        """
+        self._emit(_CMD_CGRAM | ((slot & 7) << 3), 0)
+        for line in bitmap[:8]:
+            self._emit(line & 0x1F, _RS)
+        self._cursor = -1  # the address counter now points into CGRAM
+        self._flush()
+
+    # --- Framebuffer diffing ---
+
+    def _set_row(self, row, text):
+        buf = self._row
+        n = min(len(text), self.cols)
+        for i in range(n):
+            buf[i] = _code(text[i])
+        for i in range(n, self.cols):
+            buf[i] = _SPACE
+        self._diff_row(row)
+
+    def _diff_row(self, row, new=None):
+        if new is None:
+            new = self._row
+        fb = self._fb
+        cols = self.cols
+        base = row * cols
+        c = 0
+        while c < cols:
+            if new[c] == fb[base + c]:
+                c += 1
+                continue
+            start = end = c
+            c += 1
+            while c < cols:
+                if new[c] != fb[base + c]:
+                    end = c
+                elif c - end > 1:
+                    # Two unchanged cells cost more than one cursor move.
+                    break
+                c += 1
+            addr = start + (0x40 if row & 1 else 0) + (cols if row & 2 else 0)
+            if addr != self._cursor:
+                self._emit(_CMD_DDRAM | addr, 0)
+            for k in range(start, end + 1):
+                self._emit(new[k], _RS)
+                fb[base + k] = new[k]
+            self._cursor = addr + end - start + 1
+
+    # --- Batched I2C output ---
+
+    def _emit(self, byte, rs):
+        out = self._out
+        n = self._n
+        if n + 4 > len(out):
+            self._flush()
+            n = 0
+        flags = rs | (_BACKLIGHT if self.lcd.backlight else 0)
+        hi = flags | (byte & 0xF0)
+        lo = flags | ((byte << 4) & 0xF0)
+        out[n] = hi | _E
+        out[n + 1] = hi
+        out[n + 2] = lo | _E
+        out[n + 3] = lo
+        self._n = n + 4
+
+    def _flush(self):
+        if self._n:
+            view = self._views[self._n >> 2]
+            if view is None:
+                view = self._views[self._n >> 2] = memoryview(self._out)[:self._n]
+            self.i2c.writeto(self.addr, view)
+            self.i2c_bytes += self._n
+            self.i2c_writes += 1
+            self._n = 0
+
+
+def _code(ch):
+    # Character ROM code for a str character; chr(0)-chr(7) are the glyphs.
+    b = ord(ch)
+    return b if b < 256 else 0x3F  # "?"
 
 
 class ButtonArray:
-    def __init__(self, pins=(5,6,7,8,9,10,11,12), debounce_ms=40):
+    """The button pins; inputbus.InputBus turns their edges into events."""
+
+    def __init__(self, pins=(5,6,7,8,9,10,11,12)):
         self.pins = [Pin(p, Pin.IN, Pin.PULL_DOWN) for p in pins]
-        # Read the current state of each pin so that a press isn't
-        # falsely detected on boot. 0 means unpressed with pull-down.
-        self.last_state = [btn.value() for btn in self.pins]
-        self.debounce = debounce_ms
-        self.last_press_time = [0] * len(self.pins)
-
-    def read(self):
-        # returns index (0-7) if a button is newly pressed, else None
-        now = ticks_ms()
-        for i, btn in enumerate(self.pins):
-            val = btn.value()
-            if self.last_state[i] == 1 and val == 0:
-                if ticks_diff(now, self.last_press_time[i]) > self.debounce:
-                    self.last_press_time[i] = now
-                    self.last_state[i] = 0
-                    return i
-            elif val == 1:
-                self.last_state[i] = 1
-        return None
-
-    def wait_for_press(self, idx=None):
-        # waits for any button (or button idx) to be pressed, returns index
-        while True:
-            btn = self.read()
-            if btn is not None and (idx is None or btn == idx):
-                while self.pins[btn].value() == 0:
-                    sleep_ms(10)
-                sleep_ms(40)
-                return btn
-            sleep_ms(10)
 
 
 class RotaryEncoder:
@@ -83,43 +194,91 @@ class RotaryEncoder:
         )
         self.button = Pin(sw, Pin.IN, Pin.PULL_UP)
         self.last_button = 1
+        self.last_edge = 0
+        self._skip = False      # the release of the press held now is no click
         self._last_val = self.encoder.value()
+        self._pos = self._last_val  # value at the last detent, for on_turn
+        # Time of the last detent and the running average gap between
+        # detents (ms), kept by the listener for speed().
+        self._turned = ticks_ms()
+        self._gap = ENCODER_REST_MS
+        self.encoder.add_listener(self._detent)
+        # A uasyncio.ThreadSafeFlag raised on every detent and, after
+        # enable_irq(), every switch edge, so widgets can block on input.
+        self.flag = None
+        self.on_switch = None   # also called with the pin on switch edges
+        self.on_turn = None     # also called with the detents of each turn
+
+    def enable_irq(self, hard=False):
+        """Report switch edges through :attr:`flag` and :attr:`on_switch`.
+
+        With ``hard`` the handler runs in interrupt context, so
+        :attr:`on_switch` must not allocate.
+        """
+        self.button.irq(handler=self._switch, trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, hard=hard)
+
+    def _switch(self, pin):
+        if self.flag is not None:
+            self.flag.set()
+        if self.on_switch is not None:
+            self.on_switch(pin)
+
+    def _detent(self):
+        # Scheduled by RotaryIRQ after every detent.
+        now = ticks_ms()
+        gap = ticks_diff(now, self._turned)
+        self._turned = now
+        if gap >= ENCODER_REST_MS:
+            self._gap = ENCODER_REST_MS
+        else:
+            self._gap = (self._gap + gap) >> 1
+        if self.on_turn is not None:
+            val = self.encoder.value()
+            step = val - self._pos
+            self._pos = val
+            if step:
+                self.on_turn(step)
+        if self.flag is not None:
+            self.flag.set()
 
     def get(self):
-        # Returns change since last check: +1/-1/0
+        # Returns the signed number of detents turned since the last check;
+        # a fast spin between two checks keeps every detent.
         val = self.encoder.value()
         diff = val - self._last_val
         self._last_val = val
-        if diff > 0:
-            return 1
-        elif diff < 0:
-            return -1
-        else:
-            return 0
+        return diff
+
+    def speed(self):
+        """Current turning speed in detents per second; it decays to the
+        rest speed as soon as the knob stops."""
+        gap = max(self._gap, ticks_diff(ticks_ms(), self._turned), 1)
+        return 1000 // gap
 
-    def button_pressed(self):
-        # Returns True once when button is pressed
+    def clicked(self, debounce_ms=30):
+        # Non-blocking: returns True once when the button is released
         val = self.button.value()
-        if self.last_button == 1 and val == 0:
-            self.last_button = 0
-            while self.button.value() == 0:
-                sleep_ms(10)
-            sleep_ms(30)
-            self.last_button = 1
-            return True
+        if val == self.last_button:
+            return False
+        now = ticks_ms()
+        if ticks_diff(now, self.last_edge) < debounce_ms:
+            return False
+        self.last_edge = now
         self.last_button = val
-        return False
+        if val == 1 and self._skip:
+            self._skip = False
+            return False
+        return val == 1
 
-    def wait_for_press(self):
-        # Wait until encoder button is pressed and released
-        while self.button.value() == 1:
-            sleep_ms(10)
-        while self.button.value() == 0:
-            sleep_ms(10)
-        sleep_ms(30)
-        return True
+    def skip_click(self):
+        """If the button is held now, do not report its release as a click,
+        e.g. for a screen that a long press opened."""
+        if self.button.value() == 0:
+            self.last_button = 0
+            self._skip = True
 
     def reset(self, val=0):
         self.encoder.set(value=val)
         self._last_val = val
+        self._pos = val
 
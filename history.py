@@ -0,0 +1,125 @@
+# history.py
+
+import struct
+
+# Event kinds, stored as their index: the timed activities first, in the
+# order of activities.TABLE, then the one-off entries.
+KINDS = ("feeding", "sleep", "tummy time", "pumping", "diaper", "weight", "temperature")
+# How the home screen names the latest event of each kind ("Fed 2h10m").
+LABELS = ("Fed", "Slept", "Tummy", "Pumped", "Diaper", "Weighed", "Temp")
+CODES = {name: i for i, name in enumerate(KINDS)}
+
+# Sync status of a record.
+QUEUED = 0      # in the journal, not on the server yet
+SENT = 1        # accepted by the server
+REJECTED = 2    # refused by the server, or failed with no journal to retry
+
+# One record: sequence number (0 marks an empty slot), kind, status, child
+# id, start and end (epoch seconds; equal for one-off entries).
+RECORD = "<IBBIii"
+SIZE = struct.calcsize(RECORD)
+STATUS_AT = 5   # byte offset of the status within a record
+SLOTS = 256
+# Records read per flash access while scanning.
+CHUNK = 16
+
+
+class History:
+    """Fixed-size ring of packed event records on flash.
+
+    Record ``seq`` lives in slot ``seq % slots``, so appending is one
+    seek and one small write whatever the size of the log, and the oldest
+    record is overwritten once the ring is full. The file is scanned once
+    when opened to find the head and to build :attr:`latest`, the start
+    time of the newest record per child and kind, which is all the home
+    screen needs.
+    """
+
+    def __init__(self, path="history.bin", slots=SLOTS):
+        self.path = path
+        self.slots = slots
+        self.seq = 1                # sequence number of the next record
+        self.latest = {}            # child << 4 | kind -> start of the newest record
+        self._latest_seq = {}
+        self._buf = bytearray(SIZE * CHUNK)
+        self._rec = memoryview(self._buf)[:SIZE]
+        self._load()
+
+    def _load(self):
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            self._create()
+            return
+        if f.seek(0, 2) != SIZE * self.slots:
+            # Another ring size or an older record layout.
+            f.close()
+            self._create()
+            return
+        f.seek(0)
+        buf = self._buf
+        with f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                for off in range(0, n - SIZE + 1, SIZE):
+                    seq, kind, status, child, start, end = struct.unpack_from(RECORD, buf, off)
+                    if seq:
+                        self._index(seq, kind, child, start)
+                        if seq >= self.seq:
+                            self.seq = seq + 1
+
+    def _create(self):
+        with open(self.path, "wb") as f:
+            f.write(bytes(SIZE * self.slots))
+
+    def _index(self, seq, kind, child, start):
+        key = child << 4 | kind
+        if seq > self._latest_seq.get(key, 0):
+            self._latest_seq[key] = seq
+            self.latest[key] = start
+
+    def _slot(self, seq):
+        return (seq % self.slots) * SIZE
+
+    # --- Writing ---
+
+    def add(self, kind, child, start, end=None, status=QUEUED):
+        """Append an event; returns its sequence number for :meth:`mark`."""
+        seq = self.seq
+        code = CODES[kind]
+        if end is None:
+            end = start
+        buf = self._rec
+        struct.pack_into(RECORD, buf, 0, seq, code, status, child, start, end)
+        with open(self.path, "r+b") as f:
+            f.seek(self._slot(seq))
+            f.write(buf)
+        self.seq = seq + 1
+        self._index(seq, code, child, start)
+        return seq
+
+    def mark(self, seq, status):
+        """Set the sync status of record ``seq`` unless it was overwritten."""
+        buf = self._rec
+        with open(self.path, "r+b") as f:
+            f.seek(self._slot(seq))
+            if f.readinto(buf) != SIZE or struct.unpack_from("<I", buf, 0)[0] != seq:
+                return False
+            f.seek(self._slot(seq) + STATUS_AT)
+            f.write(bytes((status,)))
+        return True
+
+    def settled(self, tag, accepted):
+        """Journal.on_settle callback: the entry for record ``tag`` is done."""
+        self.mark(tag, SENT if accepted else REJECTED)
+
+    # --- Reading ---
+
+    def since(self, kind, child, now):
+        """Seconds since the newest ``kind`` event for ``child``, or -1."""
+        start = self.latest.get(child << 4 | CODES[kind], None)
+        if start is None:
+            return -1
+        return max(0, now - start)
@@ -0,0 +1,160 @@
+# home.py
+
+from activities import CYCLE
+from history import CODES, LABELS
+
+_SPACE = 0x20
+_ZERO = 0x30
+_COLON = 0x3A
+_SLASH = 0x2F
+_D = 0x64
+_H = 0x68
+_M = 0x6D
+
+
+def _encode(text):
+    # Character ROM codes, as LCDDisplay.show maps them.
+    return bytes(ord(c) if ord(c) < 256 else 0x3F for c in text)
+
+
+def _put(buf, pos, text):
+    """Copy the bytes of ``text`` to ``buf`` at ``pos``; returns the end."""
+    for i in range(min(len(text), len(buf) - pos)):
+        buf[pos + i] = text[i]
+    return min(pos + len(text), len(buf))
+
+
+def _number(buf, pos, value, width=1):
+    """Write ``value`` in decimal, zero padded to ``width``; returns the end."""
+    digits = 1
+    v = value
+    while v >= 10:
+        v //= 10
+        digits += 1
+    if digits < width:
+        digits = width
+    end = pos + digits
+    i = end - 1
+    while i >= pos:
+        if i < len(buf):
+            buf[i] = _ZERO + value % 10
+        value //= 10
+        i -= 1
+    return min(end, len(buf))
+
+
+def _blank(buf, pos):
+    for i in range(pos, len(buf)):
+        buf[i] = _SPACE
+
+
+def _unit(buf, pos, code):
+    if pos < len(buf):
+        buf[pos] = code
+    return min(pos + 1, len(buf))
+
+
+def _ago(buf, pos, seconds):
+    """Write ``5m``, ``2h10m`` or ``3d04h``; returns the end."""
+    minutes = seconds // 60
+    if minutes < 60:
+        return _unit(buf, _number(buf, pos, minutes), _M)
+    if minutes < 1440:
+        pos = _unit(buf, _number(buf, pos, minutes // 60), _H)
+        return _unit(buf, _number(buf, pos, minutes % 60, 2), _M)
+    pos = _unit(buf, _number(buf, pos, minutes // 1440), _D)
+    return _unit(buf, _number(buf, pos, (minutes % 1440) // 60, 2), _H)
+
+
+class HomeScreen:
+    """The home screen, rendered into two preallocated rows.
+
+    Text derived from state (initials, labels, the status line) is encoded
+    once and kept until the state changes; the clock and the timer digits
+    are written in place. A render that only moves the clock allocates
+    nothing, so a night of renders leaves the heap as it found it.
+
+    With a :class:`history.History`, an idle ``Ready`` line also tells how
+    long ago the last ``last`` event of the active child was, e.g.
+    ``Ready Fed 2h10m``, from flash alone.
+    """
+
+    def __init__(self, lcd, activities, cols=16, history=None, last="feeding"):
+        self.lcd = lcd
+        self.activities = activities
+        self.history = history
+        self.last = last
+        self.last_label = _encode(LABELS[CODES[last]])
+        self.top = bytearray(cols)
+        self.bottom = bytearray(cols)
+        self.labels = {a.name: _encode(a.label) for a in activities.order}
+        self.hour = 0
+        self.minute = 0
+        self._initials = ("", b"")   # (str from the API, its bytes)
+        self._status_key = -1
+        self._status = b""
+
+    def set_clock(self, hour, minute):
+        self.hour = hour
+        self.minute = minute
+
+    def _initials_bytes(self, initials):
+        if initials is not self._initials[0]:
+            self._initials = (initials, _encode(initials))
+        return self._initials[1]
+
+    def _status_bytes(self, up, pending, error):
+        key = pending << 2 | (2 if error else 0) | (1 if up else 0)
+        if key != self._status_key:
+            if not up:
+                text = "Offline %d queued" % pending if pending else "Offline"
+            elif error:
+                text = "API Conn Error"
+            elif pending:
+                text = "Ready  %d queued" % pending
+            else:
+                text = "Ready"
+            self._status = _encode(text)
+            self._status_key = key
+        return self._status
+
+    def render(self, now, initials, up, pending, child=0, error=False):
+        """Draw the header and the timer or status line for time ``now``;
+        ``error`` says the server turns the device away."""
+        top = self.top
+        n = _put(top, 0, self._initials_bytes(initials))
+        _blank(top, n)
+        n = _number(top, n + 3, self.hour, 2)
+        if n < len(top):
+            top[n] = _COLON
+        n = _number(top, n + 1, self.minute, 2)
+
+        bottom = self.bottom
+        activities = self.activities
+        count = activities.count_running()
+        if count:
+            idx = (now // CYCLE) % count
+            activity = activities.nth_running(idx)
+            elapsed = now - activity.start
+            if elapsed < 0:
+                elapsed = 0  # the clock may not be set yet
+            n = _put(bottom, 0, self.labels[activity.name])
+            _blank(bottom, n)
+            n = _number(bottom, n + 1, elapsed // 3600, 2)
+            if n < len(bottom):
+                bottom[n] = _COLON
+            n = _number(bottom, n + 1, (elapsed % 3600) // 60, 2)
+            if count > 1:
+                n = _number(bottom, n + 2, idx + 1)
+                if n < len(bottom):
+                    bottom[n] = _SLASH
+                _number(bottom, n + 1, count)
+        else:
+            n = _put(bottom, 0, self._status_bytes(up, pending, error))
+            _blank(bottom, n)
+            if up and not pending and not error and self.history is not None:
+                ago = self.history.since(self.last, child, now)
+                if ago >= 0:
+                    n = _put(bottom, n + 1, self.last_label)
+                    _ago(bottom, n + 1, ago)
+        self.lcd.show_codes(top, bottom)
@@ -0,0 +1,470 @@
+# httpclient.py
+
+import ujson as json
+import uasyncio as asyncio
+import utime
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+try:
+    import ussl as ssl
+except ImportError:
+    import ssl
+
+DEFAULT_TIMEOUT = 10
+CONNECT_TIMEOUT = 5
+# Reconnect instead of reusing a connection idle for longer than this (s);
+# most servers drop keep-alive sockets well before the TCP stack notices.
+MAX_IDLE = 60
+# Read size for streamed bodies.
+CHUNK = 256
+# Methods resent by themselves when a reused connection turns out to be
+# closed. The server may have taken a POST before it dropped the
+# connection; those fail instead and are retried by the journal.
+IDEMPOTENT = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+
+class Response:
+    def __init__(self, status_code, headers, content, raw=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.raw = raw  # body reader when the request was streamed
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        if self.raw is not None:
+            self.raw.close()
+
+
+class StaleConnection(OSError):
+    """The server closed a reused connection before answering."""
+
+
+def split_url(url):
+    """Return (host, port, path, use_ssl) for an http(s) URL."""
+    proto, _, rest = url.split("/", 2)
+    if "/" in rest:
+        host, path = rest.split("/", 1)
+        path = "/" + path
+    else:
+        host, path = rest, "/"
+    use_ssl = proto == "https:"
+    port = 443 if use_ssl else 80
+    if ":" in host:
+        host, port = host.split(":", 1)
+        port = int(port)
+    return host, port, path, use_ssl
+
+
+def _request_head(method, path, host, headers, length, keep_alive):
+    head = "%s %s HTTP/1.1\r\nHost: %s\r\n" % (method, path, host)
+    if headers:
+        for k, v in headers.items():
+            head += "%s: %s\r\n" % (k, v)
+    if length is not None:
+        head += "Content-Length: %d\r\n" % length
+    if not keep_alive:
+        head += "Connection: close\r\n"
+    return (head + "\r\n").encode()
+
+
+def _parse_status(line):
+    if not line:
+        raise StaleConnection("connection closed")
+    return int(line.split(None, 2)[1])
+
+
+def _parse_header(line, headers):
+    k, v = line.decode().split(":", 1)
+    headers[k.strip().lower()] = v.strip()
+
+
+def _reusable(status_line, headers):
+    conn = headers.get("connection", "").lower()
+    if status_line.startswith(b"HTTP/1.0"):
+        return conn == "keep-alive"
+    return conn != "close"
+
+
+def _encode(data):
+    if isinstance(data, str):
+        return data.encode()
+    return data
+
+
+def _framing(status_line, headers, keep_alive):
+    """Return (length, chunked, reusable) for a response body."""
+    chunked = headers.get("transfer-encoding", "").lower() == "chunked"
+    length = None
+    if _parse_status(status_line) in (204, 304):
+        chunked = False
+        length = 0  # never has a body, whatever the headers say
+    elif not chunked and "content-length" in headers:
+        length = int(headers["content-length"])
+    reusable = keep_alive and _reusable(status_line, headers) and (chunked or length is not None)
+    return length, chunked, reusable
+
+
+class Body:
+    """Incremental reader over one response body.
+
+    Handles length-delimited, chunked and read-until-close bodies. Once the
+    body is exhausted the connection is left ready for the next request, or
+    closed if it cannot be reused; closing early drops the connection.
+    """
+
+    def __init__(self, session, length, chunked, reusable):
+        self.session = session
+        self.remaining = length
+        self.chunked = chunked
+        self.reusable = reusable
+        self.chunk_left = 0
+        self.done = False
+
+    def read(self, n=CHUNK):
+        if self.done:
+            return b""
+        rfile = self.session.rfile
+        if self.chunked:
+            if self.chunk_left == 0:
+                size = int(rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    rfile.readline()
+                    self._finish()
+                    return b""
+                self.chunk_left = size
+            data = rfile.read(min(n, self.chunk_left))
+            if not data:
+                raise OSError("short read")
+            self.chunk_left -= len(data)
+            if self.chunk_left == 0:
+                rfile.readline()
+        elif self.remaining is None:
+            data = rfile.read(n)
+            if not data:
+                self._finish()
+        else:
+            if self.remaining == 0:
+                self._finish()
+                return b""
+            data = rfile.read(min(n, self.remaining))
+            if not data:
+                raise OSError("short read")
+            self.remaining -= len(data)
+            if self.remaining == 0:
+                self._finish()
+        return data
+
+    def readall(self):
+        parts = []
+        while True:
+            data = self.read(1024)
+            if not data:
+                return b"".join(parts)
+            parts.append(data)
+
+    def _finish(self):
+        self.done = True
+        if not self.reusable:
+            self.session.close()
+
+    def close(self):
+        if self.done:
+            return
+        if self.remaining == 0 and not self.chunked:
+            self._finish()  # an empty body (204, 304) leaves nothing unread
+            return
+        self.done = True
+        self.session.close()
+
+
+class Session:
+    """Blocking HTTP/1.1 client that keeps one connection to a single origin.
+
+    The socket is reused across requests and reopened when it has been idle
+    too long or the server turns out to have closed it.
+    """
+
+    def __init__(self, origin, timeout=DEFAULT_TIMEOUT, connect_timeout=CONNECT_TIMEOUT,
+                 keep_alive=True, max_idle=MAX_IDLE):
+        self.host, self.port, _, self.use_ssl = split_url(origin)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.keep_alive = keep_alive
+        self.max_idle = max_idle
+        self.sock = None
+        self.rfile = None
+        self.last_used = 0
+        self.connects = 0
+        self.body = None  # last streamed body
+
+    def connect(self):
+        self.close()
+        addr = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)[0][-1]
+        sock = socket.socket()
+        try:
+            sock.settimeout(self.connect_timeout)
+            sock.connect(addr)
+            if self.use_ssl:
+                if hasattr(ssl, "create_default_context"):
+                    sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+                else:
+                    sock = ssl.wrap_socket(sock, server_hostname=self.host)
+            sock.settimeout(self.timeout)
+        except Exception:
+            sock.close()
+            raise
+        self.sock = sock
+        try:
+            self.rfile = sock.makefile("rb")
+        except AttributeError:
+            self.rfile = sock  # MicroPython TLS sockets are streams already
+        self.connects += 1
+
+    def close(self):
+        if self.rfile is not None and self.rfile is not self.sock:
+            self.rfile.close()
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+        self.rfile = None
+
+    def request(self, method, path, headers=None, data=None, stream=False):
+        """Send a request and return a :class:`Response`.
+
+        With ``stream=True`` the body is left unread in ``resp.raw``; read it
+        to the end or call ``resp.close()`` before the next request.
+        """
+        data = _encode(data)
+        if self.body is not None and not self.body.done:
+            self.body.close()  # unread bytes would corrupt the next response
+        self.body = None
+        idle = utime.ticks_diff(utime.ticks_ms(), self.last_used) // 1000
+        if self.sock is not None and idle > self.max_idle:
+            self.close()
+        reused = self.sock is not None
+        if not reused:
+            self.connect()
+        try:
+            resp = self._exchange(method, path, headers, data, stream)
+        except StaleConnection:
+            self.close()
+            if not reused or method not in IDEMPOTENT:
+                raise
+            # The server dropped the idle connection; sending the request
+            # again is harmless even if it saw it.
+            self.connect()
+            resp = self._exchange(method, path, headers, data, stream)
+        except Exception:
+            self.close()
+            raise
+        self.last_used = utime.ticks_ms()
+        return resp
+
+    def _send(self, buf):
+        if hasattr(self.sock, "sendall"):
+            self.sock.sendall(buf)
+        else:
+            self.sock.write(buf)
+
+    def _exchange(self, method, path, headers, data, stream):
+        length = len(data) if data is not None else None
+        buf = _request_head(method, path, self.host, headers, length, self.keep_alive)
+        if data:
+            buf += data  # one segment, so Nagle never holds the body back
+        try:
+            self._send(buf)
+        except OSError as e:
+            raise StaleConnection(str(e))
+        status_line = self.rfile.readline()
+        status = _parse_status(status_line)
+        resp_headers = {}
+        while True:
+            line = self.rfile.readline()
+            if not line or line == b"\r\n":
+                break
+            _parse_header(line, resp_headers)
+        body = Body(self, *_framing(status_line, resp_headers, self.keep_alive))
+        if stream:
+            self.body = body
+            return Response(status, resp_headers, None, body)
+        return Response(status, resp_headers, body.readall())
+
+
+class AsyncSession:
+    """Non-blocking counterpart of :class:`Session` for the asyncio runtime."""
+
+    def __init__(self, origin, timeout=DEFAULT_TIMEOUT, keep_alive=True, max_idle=MAX_IDLE):
+        self.host, self.port, _, self.use_ssl = split_url(origin)
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.max_idle = max_idle
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+        self.last_used = 0
+        self.connects = 0
+
+    async def connect(self):
+        await self.close()
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.use_ssl or None)
+        self.connects += 1
+
+    async def close(self):
+        writer = self.writer
+        self.reader = None
+        self.writer = None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def request(self, method, path, headers=None, data=None, stream=False, timeout=None):
+        # One connection means one request at a time; a streamed body keeps
+        # the lock until it has been read or closed. ``timeout`` overrides
+        # the session's deadline for this request (connect to headers).
+        await self.lock.acquire()
+        try:
+            resp = await asyncio.wait_for(
+                self._request(method, path, headers, _encode(data), stream),
+                self.timeout if timeout is None else timeout)
+        except Exception:
+            await self.close()
+            self.lock.release()
+            raise
+        if resp.raw is None:
+            self.lock.release()
+        return resp
+
+    async def _request(self, method, path, headers, data, stream):
+        idle = utime.ticks_diff(utime.ticks_ms(), self.last_used) // 1000
+        if self.writer is not None and idle > self.max_idle:
+            await self.close()
+        reused = self.writer is not None
+        if not reused:
+            await self.connect()
+        try:
+            resp = await self._exchange(method, path, headers, data, stream)
+        except StaleConnection:
+            if not reused or method not in IDEMPOTENT:
+                raise
+            await self.connect()
+            resp = await self._exchange(method, path, headers, data, stream)
+        self.last_used = utime.ticks_ms()
+        return resp
+
+    async def _exchange(self, method, path, headers, data, stream):
+        length = len(data) if data is not None else None
+        buf = _request_head(method, path, self.host, headers, length, self.keep_alive)
+        if data:
+            buf += data
+        try:
+            self.writer.write(buf)
+            await self.writer.drain()
+        except OSError as e:
+            raise StaleConnection(str(e))
+        reader = self.reader
+        status_line = await reader.readline()
+        status = _parse_status(status_line)
+        resp_headers = {}
+        while True:
+            line = await reader.readline()
+            if not line or line == b"\r\n":
+                break
+            _parse_header(line, resp_headers)
+        body = AsyncBody(self, *_framing(status_line, resp_headers, self.keep_alive))
+        if stream:
+            body.holds_lock = True
+            return Response(status, resp_headers, None, body)
+        return Response(status, resp_headers, await body.readall())
+
+
+class AsyncBody:
+    """Non-blocking counterpart of :class:`Body`; releases the session lock
+    once the body is exhausted or closed."""
+
+    def __init__(self, session, length, chunked, reusable):
+        self.session = session
+        self.remaining = length
+        self.chunked = chunked
+        self.reusable = reusable
+        self.chunk_left = 0
+        self.done = False
+        self.holds_lock = False
+
+    async def read(self, n=CHUNK):
+        if self.done:
+            return b""
+        try:
+            return await asyncio.wait_for(self._read(n), self.session.timeout)
+        except Exception:
+            await self.close()
+            raise
+
+    async def _read(self, n):
+        reader = self.session.reader
+        if self.chunked:
+            if self.chunk_left == 0:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    await self._finish()
+                    return b""
+                self.chunk_left = size
+            data = await reader.read(min(n, self.chunk_left))
+            if not data:
+                raise OSError("short read")
+            self.chunk_left -= len(data)
+            if self.chunk_left == 0:
+                await reader.readline()
+        elif self.remaining is None:
+            data = await reader.read(n)
+            if not data:
+                await self._finish()
+        else:
+            if self.remaining == 0:
+                await self._finish()
+                return b""
+            data = await reader.read(min(n, self.remaining))
+            if not data:
+                raise OSError("short read")
+            self.remaining -= len(data)
+            if self.remaining == 0:
+                await self._finish()
+        return data
+
+    async def readall(self):
+        parts = []
+        while True:
+            data = await self.read(1024)
+            if not data:
+                return b"".join(parts)
+            parts.append(data)
+
+    async def _finish(self):
+        self.done = True
+        if not self.reusable:
+            await self.session.close()
+        self._release()
+
+    async def close(self):
+        if self.done:
+            return
+        if self.remaining == 0 and not self.chunked:
+            await self._finish()  # an empty body (204, 304) leaves nothing unread
+            return
+        self.done = True
+        await self.session.close()
+        self._release()
+
+    def _release(self):
+        if self.holds_lock:
+            self.holds_lock = False
+            self.session.lock.release()
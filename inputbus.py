@@ -0,0 +1,271 @@
+# inputbus.py
+
+import machine
+import micropython
+import utime
+import uasyncio as asyncio
+from array import array
+
+# Event kinds. The source is a button index (0-7) or ENCODER.
+PRESS = 1      # went down (once debounced); value 0
+RELEASE = 2    # came up; value is the time held (ms), or 0 if the press
+               # already made a LONG or a CHORD
+LONG = 3       # held for long_ms; value is that time
+DOUBLE = 4     # pressed again within double_ms of a short press; value is
+               # the gap (ms)
+CHORD = 5      # held together; the source is their bit mask (bit i for
+               # source i), the value the source that completed the chord
+TURN = 6       # the knob moved; value is the signed number of detents
+KINDS = ("", "press", "release", "long", "double", "chord", "turn")
+
+# The encoder's switch (and, for TURN, its knob).
+ENCODER = 8
+SOURCES = ENCODER + 1
+_KNOB = SOURCES  # raw code of a detent; the level bit is the direction
+
+# Closed contacts count as a press after this long (ms); shorter closures
+# are bounce or noise.
+DEBOUNCE_MS = 40
+LONG_MS = 800
+DOUBLE_MS = 350
+# Event poll period in seconds, on ports without uasyncio.ThreadSafeFlag.
+POLL = 0.02
+
+
+class InputBus:
+    """Typed, timestamped events from the buttons and the rotary encoder.
+
+    The pin interrupts (hard, so they also end a lightsleep) and the
+    encoder's detent callback only store a timestamp and a code in a
+    preallocated ring. :meth:`poll`, run from a task, debounces those edges
+    and turns them into events in a second ring, handed out by :meth:`get`
+    as ``(kind, source, ticks_ms, value)``. Nothing waits for a release:
+    :meth:`next_ms` gives the next deadline (a press settling, a long
+    press), and :meth:`wait` sleeps until it or the next edge.
+
+    A press is timestamped at its closing edge and reported once the
+    contact has stayed closed for ``debounce_ms``; a release is reported at
+    its first opening edge.
+    """
+
+    def __init__(self, buttons, encoder, debounce_ms=DEBOUNCE_MS, long_ms=LONG_MS,
+                 double_ms=DOUBLE_MS, queue_size=32):
+        micropython.alloc_emergency_exception_buf(100)
+        self.debounce = debounce_ms
+        self.long = long_ms
+        self.double = double_ms
+        self._size = queue_size
+        # Raw edges, written by the interrupt handlers only.
+        self._times = array("I", [0] * queue_size)
+        self._codes = bytearray(queue_size)     # source << 1 | level
+        self._head = 0
+        self._tail = 0                          # written by poll() only
+        # Events, written by poll() and read by get().
+        self._kinds = bytearray(queue_size)
+        self._sources = array("H", [0] * queue_size)
+        self._at = array("I", [0] * queue_size)
+        self._values = array("i", [0] * queue_size)
+        self._ev_head = 0
+        self._ev_tail = 0
+        # Per source state; a source closed at boot is never reported.
+        now = utime.ticks_ms()
+        self._raw = bytearray(SOURCES)          # last level seen, 1 closed
+        self._raw_at = array("I", [now] * SOURCES)
+        self._down = bytearray(SOURCES)         # debounced level
+        self._down_at = array("I", [now] * SOURCES)
+        self._used = bytearray(SOURCES)         # this press made a LONG or CHORD
+        self._tapped = bytearray(SOURCES)       # a short press may be doubled
+        self._tap_at = array("I", [0] * SOURCES)
+        self._mute = 0                          # bit mask of sources dropped
+        self.overflows = 0                      # raw edges lost
+        self.dropped = 0                        # events lost
+        self.events = 0
+        flag = getattr(asyncio, "ThreadSafeFlag", None)
+        self.flag = flag() if flag is not None else None
+        for i, pin in enumerate(buttons.pins):
+            self._raw[i] = pin.value()  # pull-down: high while pressed
+            pin.irq(handler=lambda p, i=i: self._edge(i, p.value()),
+                    trigger=machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING, hard=True)
+        self._raw[ENCODER] = 1 - encoder.button.value()
+        encoder.on_switch = self._switch
+        encoder.on_turn = self._turn
+        encoder.enable_irq(hard=True)
+        self._down[:] = self._raw
+        self._used[:] = self._raw
+
+    # --- Interrupt side ---
+
+    def _edge(self, source, level):
+        head = self._head
+        nxt = (head + 1) % self._size
+        if nxt == self._tail:
+            self.overflows += 1
+            return
+        self._times[head] = utime.ticks_ms()
+        self._codes[head] = (source << 1) | level
+        self._head = nxt
+        if self.flag is not None:
+            self.flag.set()
+
+    def _switch(self, pin):
+        self._edge(ENCODER, 1 - pin.value())  # pull-up: low while pressed
+
+    def _turn(self, step):
+        # Scheduled, not hard: keep the button IRQs out of the ring
+        # while it is written.
+        state = machine.disable_irq()
+        try:
+            level = 1 if step > 0 else 0
+            n = step if step > 0 else -step
+            while n:
+                self._edge(_KNOB, level)
+                n -= 1
+        finally:
+            machine.enable_irq(state)
+
+    # --- Events ---
+
+    def poll(self):
+        """Turn the edges and deadlines so far into events; never blocks."""
+        while self._tail != self._head:
+            tail = self._tail
+            t = self._times[tail]
+            code = self._codes[tail]
+            self._tail = (tail + 1) % self._size
+            source = code >> 1
+            if source == _KNOB:
+                self._knob(t, 1 if code & 1 else -1)
+                continue
+            self._settle(source, t)
+            level = code & 1
+            if level == self._raw[source]:
+                continue  # a missed edge in between
+            self._raw[source] = level
+            self._raw_at[source] = t
+            if not level and self._down[source]:
+                self._release(source, t)
+        now = utime.ticks_ms()
+        for s in range(SOURCES):
+            self._settle(s, now)
+
+    def get(self):
+        """The oldest event as ``(kind, source, ticks_ms, value)``, or None."""
+        i = self._ev_tail
+        if i == self._ev_head:
+            return None
+        self._ev_tail = (i + 1) % self._size
+        return self._kinds[i], self._sources[i], self._at[i], self._values[i]
+
+    def next_ms(self):
+        """Milliseconds until :meth:`poll` has a deadline to act on, or None."""
+        now = utime.ticks_ms()
+        best = None
+        for s in range(SOURCES):
+            if not self._down[s]:
+                if not self._raw[s]:
+                    continue
+                due = utime.ticks_add(self._raw_at[s], self.debounce)
+            elif not self._used[s]:
+                due = utime.ticks_add(self._down_at[s], self.long)
+            else:
+                continue
+            d = utime.ticks_diff(due, now)
+            if best is None or d < best:
+                best = d
+        return None if best is None else max(0, best)
+
+    async def wait(self, ms=None):
+        """Wait for the next edge, or at most ``ms``."""
+        if self.flag is None:
+            await asyncio.sleep(POLL if ms is None else min(POLL, ms / 1000))
+            return
+        if ms is None:
+            await self.flag.wait()
+            return
+        try:
+            await asyncio.wait_for(self.flag.wait(), ms / 1000)
+        except asyncio.TimeoutError:
+            pass
+
+    def ignore(self, source):
+        """Forget what ``source`` did so far; for a widget that read it
+        directly, so its clicks do not come out as gestures afterwards."""
+        bit = 1 << source
+        self._mute |= bit
+        try:
+            self.poll()
+        finally:
+            self._mute &= ~bit
+        self._used[source] = self._down[source]
+        self._tapped[source] = 0
+
+    def held(self, source):
+        return self._down[source] == 1
+
+    # --- Gestures ---
+
+    def _settle(self, s, t):
+        # Apply the deadlines of source s up to time t.
+        if not self._down[s]:
+            if not self._raw[s] or utime.ticks_diff(t, self._raw_at[s]) < self.debounce:
+                return
+            self._press(s, self._raw_at[s])
+        if not self._used[s] and utime.ticks_diff(t, self._down_at[s]) >= self.long:
+            self._used[s] = 1
+            self._tapped[s] = 0
+            self._emit(LONG, s, utime.ticks_add(self._down_at[s], self.long), self.long)
+
+    def _press(self, s, t):
+        self._down[s] = 1
+        self._down_at[s] = t
+        self._used[s] = 0
+        self._emit(PRESS, s, t, 0)
+        mask = 0
+        for i in range(SOURCES):
+            if self._down[i]:
+                mask |= 1 << i
+        if mask != 1 << s:
+            for i in range(SOURCES):
+                if self._down[i]:
+                    self._used[i] = 1
+                    self._tapped[i] = 0
+            self._emit(CHORD, mask, t, s)
+
+    def _release(self, s, t):
+        self._down[s] = 0
+        if self._used[s]:
+            self._emit(RELEASE, s, t, 0)
+            return
+        down = self._down_at[s]
+        self._emit(RELEASE, s, t, utime.ticks_diff(t, down))
+        gap = utime.ticks_diff(down, self._tap_at[s])
+        if self._tapped[s] and gap <= self.double:
+            self._tapped[s] = 0
+            self._emit(DOUBLE, s, t, gap)
+        else:
+            self._tapped[s] = 1
+            self._tap_at[s] = t
+
+    def _knob(self, t, step):
+        # Detents not taken yet add up in the last TURN event.
+        head = self._ev_head
+        last = (head - 1) % self._size
+        if head != self._ev_tail and self._kinds[last] == TURN:
+            self._values[last] += step
+            return
+        self._emit(TURN, ENCODER, t, step)
+
+    def _emit(self, kind, source, t, value):
+        if self._mute & (source if kind == CHORD else 1 << source):
+            return
+        head = self._ev_head
+        nxt = (head + 1) % self._size
+        if nxt == self._ev_tail:
+            self.dropped += 1
+            return
+        self._kinds[head] = kind
+        self._sources[head] = source
+        self._at[head] = t
+        self._values[head] = value
+        self._ev_head = nxt
+        self.events += 1
@@ -0,0 +1,192 @@
+# journal.py
+
+import ujson as json
+import uos as os
+
+# Statuses that will never succeed on retry; anything else is kept for later.
+def _rejected(status):
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+
+class Journal:
+    """Append-only write-ahead log of API posts kept on flash.
+
+    Every entry is one JSON line ``{"ep": endpoint, "data": payload}``.
+    Timer starts carry a negative local id (``"lid"``) that is handed out
+    immediately; once the start reaches the server the local id is mapped
+    to the real one so later entries referencing it can be rewritten.
+    An entry may carry a ``"tag"``; :attr:`on_settle` is then called with
+    it and whether the server took the entry once it leaves the log.
+    """
+
+    def __init__(self, path="journal.log", state_path="journal.json"):
+        self.path = path
+        self.state_path = state_path
+        self.offset = 0       # byte offset of the first unsent entry
+        self.ids = {}         # local timer id -> server timer id
+        self.next_local = -1
+        self.pending = 0
+        self.on_settle = None  # callback(tag, accepted)
+        self.load_state()
+        self._scan()
+
+    # --- Persistence ---
+
+    def load_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            self.offset = state.get("offset", 0)
+            self.next_local = state.get("next", -1)
+            self.ids = {int(k): v for k, v in state.get("ids", {}).items()}
+        except (OSError, ValueError):
+            self.offset = 0
+            self.ids = {}
+
+    def save_state(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"offset": self.offset, "next": self.next_local, "ids": self.ids}, f)
+        os.rename(tmp, self.state_path)
+
+    def _scan(self):
+        """Count unsent entries and recover the local id counter after a reboot."""
+        self.pending = 0
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            self.offset = 0
+            return
+        last = b"\n"
+        with f:
+            f.seek(self.offset)
+            for line in f:
+                last = line
+                self.pending += 1
+                try:
+                    lid = json.loads(line).get("lid")
+                except ValueError:
+                    continue
+                if lid is not None and lid <= self.next_local:
+                    self.next_local = lid - 1
+        if not last.endswith(b"\n"):
+            # Torn write from a power cut: terminate it so the next append
+            # starts on a fresh line; replay skips the broken entry.
+            with open(self.path, "a") as f:
+                f.write("\n")
+
+    # --- Writing ---
+
+    def new_local_id(self):
+        lid = self.next_local
+        self.next_local -= 1
+        return lid
+
+    def append(self, endpoint, data, local_id=None, tag=None):
+        entry = {"ep": endpoint, "data": data}
+        if local_id is not None:
+            entry["lid"] = local_id
+        if tag is not None:
+            entry["tag"] = tag
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry))
+            f.write("\n")
+        self.pending += 1
+
+    # --- Replay ---
+
+    def replay(self, api, limit=None):
+        """Send queued entries to the server in order.
+
+        Stops at the first entry that fails for a transient reason so that
+        ordering is preserved. Returns the number of entries consumed.
+        """
+        done = 0
+        while self.pending and (limit is None or done < limit):
+            line, end = self._peek()
+            entry = self._prepare(line)
+            if entry is not None:
+                res = api.post(entry["ep"], entry["data"])
+                if not self._settle(entry, res, api.last_status):
+                    break
+            self._advance(end)
+            done += 1
+        return done
+
+    async def areplay(self, api, limit=None):
+        """Async counterpart of :meth:`replay` using ``api.apost``."""
+        done = 0
+        while self.pending and (limit is None or done < limit):
+            line, end = self._peek()
+            entry = self._prepare(line)
+            if entry is not None:
+                res = await api.apost(entry["ep"], entry["data"])
+                if not self._settle(entry, res, api.last_status):
+                    break
+            self._advance(end)
+            done += 1
+        return done
+
+    def _peek(self):
+        # The file is reopened for every entry so nothing holds it open
+        # while a request is in flight and new entries are appended.
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            line = f.readline()
+            return line, f.tell()
+
+    def _prepare(self, line):
+        """Parse an entry and resolve local timer ids; None means skip it."""
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            print("Journal: skipping corrupt entry")
+            return None
+        data = entry["data"]
+        timer = data.get("timer")
+        if timer is not None and timer < 0:
+            if timer not in self.ids:
+                print(f"Journal: dropping entry for unknown timer {timer}")
+                self._settled(entry, False)
+                return None
+            data["timer"] = self.ids[timer]
+            entry["ltimer"] = timer
+        return entry
+
+    def _settle(self, entry, res, status):
+        """Record the outcome of a post; returns False to retry later."""
+        ltimer = entry.get("ltimer")
+        if res is None:
+            if not _rejected(status):
+                return False
+            print(f"Journal: server rejected {entry['ep']}, dropping")
+        else:
+            lid = entry.get("lid")
+            if lid is not None and "id" in res:
+                self.ids[lid] = res["id"]
+        if ltimer is not None:
+            del self.ids[ltimer]
+        self._settled(entry, res is not None)
+        return True
+
+    def _settled(self, entry, accepted):
+        tag = entry.get("tag")
+        if tag is not None and self.on_settle is not None:
+            self.on_settle(tag, accepted)
+
+    def _advance(self, end):
+        self.offset = end
+        self.pending -= 1
+        if self.pending:
+            self.save_state()
+        else:
+            self.compact()
+
+    def compact(self):
+        """Drop the fully replayed log file and rewind the offset."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self.offset = 0
+        self.save_state()
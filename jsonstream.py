@@ -0,0 +1,112 @@
+# jsonstream.py
+
+import ujson as json
+
+_QUOTE = 0x22
+_BACKSLASH = 0x5C
+_LBRACE = 0x7B
+_RBRACE = 0x7D
+_LBRACKET = 0x5B
+_RBRACKET = 0x5D
+_COLON = 0x3A
+_COMMA = 0x2C
+
+
+class ResultsParser:
+    """Push parser for paginated Baby Buddy list responses.
+
+    Feed it the response body in chunks of any size; it returns the objects
+    of the top-level ``results`` array as each one completes, trimmed to
+    ``fields``, and collects the scalar ``meta`` keys (``count``, ``next``)
+    on the way. Only the object currently being read is buffered, so memory
+    stays bounded whatever the page size.
+    """
+
+    def __init__(self, fields=None, meta=(b"count", b"next")):
+        self.fields = fields
+        self.meta_keys = meta
+        self.meta = {}
+        self._buf = b""
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._want_key = False
+        self._key = None
+        self._key_start = -1
+        self._mark = -1          # start of the result or meta value being captured
+        self._capture = None     # meta key whose value starts at _mark
+        self._in_results = False
+
+    def feed(self, data):
+        """Consume a chunk and return the result objects it completed."""
+        buf = self._buf + data if self._buf else data
+        start = len(self._buf)
+        out = []
+        depth = self._depth
+        for i in range(start, len(buf)):
+            c = buf[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == _BACKSLASH:
+                    self._esc = True
+                elif c == _QUOTE:
+                    self._in_str = False
+                    if self._key_start >= 0:
+                        self._key = buf[self._key_start:i]
+                        self._key_start = -1
+                continue
+            if c == _QUOTE:
+                self._in_str = True
+                if depth == 1 and self._want_key:
+                    self._key_start = i + 1
+            elif c == _LBRACE or c == _LBRACKET:
+                depth += 1
+                if depth == 1:
+                    self._want_key = True
+                elif depth == 2 and c == _LBRACKET and self._key == b"results":
+                    self._in_results = True
+                elif depth == 3 and self._in_results and c == _LBRACE:
+                    self._mark = i
+            elif c == _RBRACE or c == _RBRACKET:
+                if depth == 1 and self._capture is not None:
+                    self._end_meta(buf, i)
+                depth -= 1
+                if depth == 2 and self._in_results and self._mark >= 0:
+                    out.append(self._trim(json.loads(buf[self._mark:i + 1])))
+                    self._mark = -1
+                elif depth == 1 and self._in_results:
+                    self._in_results = False
+            elif depth == 1:
+                if c == _COLON:
+                    self._want_key = False
+                    if self._key in self.meta_keys:
+                        self._capture = self._key
+                        self._mark = i + 1
+                elif c == _COMMA:
+                    if self._capture is not None:
+                        self._end_meta(buf, i)
+                    self._want_key = True
+        self._depth = depth
+
+        # Keep only the bytes of whatever token is still open.
+        keep = self._mark if self._mark >= 0 else self._key_start
+        if keep < 0:
+            self._buf = b""
+        else:
+            self._buf = buf[keep:]
+            if self._mark >= 0:
+                self._mark -= keep
+            if self._key_start >= 0:
+                self._key_start -= keep
+        return out
+
+    def _end_meta(self, buf, i):
+        self.meta[self._capture.decode()] = json.loads(buf[self._mark:i].strip())
+        self._capture = None
+        self._mark = -1
+
+    def _trim(self, obj):
+        if self.fields is None:
+            return obj
+        return {k: obj[k] for k in self.fields if k in obj}
@@ -1,314 +1,595 @@
 # main.py
 
-import network
 import utime
-import ujson as json
-import ntptime
+BOOT_T0 = utime.ticks_ms()
+
+import network
+import uasyncio as asyncio
 from hardware import LCDDisplay, ButtonArray, RotaryEncoder
-from api import BabyBuddyAPI
+from inputbus import InputBus, RELEASE, LONG, DOUBLE, CHORD, ENCODER
+from api import BabyBuddyAPI, CHILD_FIELDS
+from journal import Journal
+from power import PowerManager, ACTIVE, IDLE
+from ui import select_from_list, select_with_arrow, select_index, show_pages
+from activities import Activities
+from home import HomeScreen
+from history import History, SENT, REJECTED
+from snapshot import Snapshot
+from perf import Perf
+from netsup import Breaker, Supervisor, transient
+from sync import TimerSync, format_time
+from clock import Clock, NTP_HOST, NTP_PORT
+from cache import ResponseCache
 
-# --- Connect to WiFi ---
-def connect_wifi(ssid, password, lcd):
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    lcd.show("Connecting WiFi", ssid)
-    wlan.connect(ssid, password)
-    for _ in range(30):
-        if wlan.isconnected():
-            lcd.show("WiFi Connected", wlan.ifconfig()[0])
-            utime.sleep(1)
-            lcd.clear()
-            return True
-        utime.sleep(1)
-    lcd.show("WiFi Error", "")
-    utime.sleep(2)
-    return False
-
-# --- Time Synchronization ---
-def sync_time(lcd, server="time.microsoft.com"):
-    """Synchronize RTC using NTP."""
-    try:
-        lcd.show("Syncing time", server)
-        ntptime.host = server
-        ntptime.settime()
-        lcd.clear()
+# Deadline for the roster and timer requests made at boot (s), and the
+# backoff range when the server refuses the roster (s).
+BOOT_DEADLINE = 5
+BOOT_RETRY_MIN = 2
+BOOT_RETRY_MAX = 300
+# Presses queued while a menu or message is up; extra presses are dropped.
+MAX_PRESSES = 4
+# Power: stay awake this long after the last press (s), check for idle this
+# often (s), and log the time spent per power state this often (s).
+LIGHTSLEEP = True
+IDLE_AFTER = 10
+IDLE_POLL = 0.25
+POWER_LOG_INTERVAL = 3600
+# Send journal posts and plain GETs, with their JSON work, from a worker
+# thread on the second core (networker.py). Lightsleep is off in this mode.
+NET_THREAD = False
+# Event kind whose age the idle home screen shows ("Ready Fed 2h10m").
+LAST_SHOWN = "feeding"
+# Period of the event loop lag probe (ms).
+LOOP_PROBE_MS = 100
+# Garbage is collected when the device goes idle, and before a lightsleep
+# once this much more heap is in use than after the last collection (B).
+GC_SLACK = 4096
+
+class Runtime:
+    """State shared by the input, display, clock, network and control tasks."""
+
+    def __init__(self, lcd, inputs, encoder, api, journal, power, perf, snapshot, net,
+                 history, clock):
+        self.lcd = lcd
+        self.inputs = inputs
+        self.encoder = encoder
+        self.api = api
+        self.journal = journal
+        self.power = power
+        self.perf = perf
+        self.snapshot = snapshot
+        self.net = net
+        self.history = history
+        self.clock = clock
+        self.booted = utime.time()
+
+        self.presses = []
+        self.fired = 0              # mask of buttons whose held press ran its action
+        self.pressed = asyncio.Event()
+        self.dirty = asyncio.Event()
+        self.queued = asyncio.Event()
+        self.tick = asyncio.Event()  # wakes the clock early
+        self.busy = False           # a menu owns the display
+        self.syncing = False        # a replay request is in flight
+        self.polling = False        # a timer sync request is in flight
+        self.last_input = utime.ticks_ms()
+        self.message_until = None   # ticks_ms deadline of a confirmation screen
+        self.activities = Activities()
+        self.home = HomeScreen(lcd, self.activities, lcd.cols, history, LAST_SHOWN)
+        self.gc_floor = -1          # heap in use after the last collection
+        self.sync = TimerSync(api, self.activities, journal)
+        self.resync = asyncio.Event()  # poll the server's timers now
+        self.api_error = None       # status the server refused the roster with
+
+    def notify(self, line1, line2="", seconds=2):
+        """Show a confirmation screen without blocking input."""
+        self.lcd.show(line1, line2)
+        self.message_until = utime.ticks_add(utime.ticks_ms(), int(seconds * 1000))
+        self.tick.set()  # the clock task also handles the message timeout
+
+    def next_tick_ms(self):
+        """Milliseconds until the home screen next changes."""
+        ms = (60 - utime.localtime()[5]) * 1000
+        timers = self.activities.next_change_ms(utime.time())
+        if timers is not None:
+            ms = min(ms, timers)
+        if self.message_until is not None:
+            ms = min(ms, max(0, utime.ticks_diff(self.message_until, utime.ticks_ms())))
+        return ms
+
+    # --- Tasks ---
+
+    async def input_task(self):
+        inputs = self.inputs
+        if inputs.flag is not None:
+            # Menus block on the encoder's own flag; the bus wakes this task.
+            self.encoder.flag = asyncio.ThreadSafeFlag()
+        while True:
+            inputs.poll()
+            event = inputs.get()
+            while event is not None:
+                self.last_input = utime.ticks_ms()
+                for btn in self.actions(event):
+                    if len(self.presses) < MAX_PRESSES:
+                        self.presses.append(btn)
+                        self.pressed.set()
+                event = inputs.get()
+            # Sleep until the next edge, or until a held press settles or
+            # turns into a long press.
+            ms = inputs.next_ms()
+            if ms is None:
+                self.power.cancel("input")
+            else:
+                self.power.wake_in("input", ms)
+            await inputs.wait(ms)
+
+    def actions(self, event):
+        """Indexes into BUTTONS of what an input event asks for.
+
+        A button runs its own action once per press: when it comes up after
+        a short press, or as soon as it is held into a long press or a chord
+        that is no gesture, so no press is lost.
+        """
+        kind, source, _, value = event
+        if kind == RELEASE and source < ENCODER:
+            self.fired &= ~(1 << source)
+            return (source,) if value else ()
+        if self.busy and (source & 1 << ENCODER if kind == CHORD else source == ENCODER):
+            btn = None  # the open menu reads the encoder itself
+        else:
+            btn = GESTURES.get((kind, source))
+        if btn is not None:
+            return (btn,)
+        if kind == LONG and source < ENCODER:
+            held = 1 << source
+        elif kind == CHORD:
+            held = source & ~(1 << ENCODER)
+        else:
+            return ()
+        held &= ~self.fired
+        self.fired |= held
+        return tuple(i for i in range(ENCODER) if held & 1 << i)
+
+    async def clock_task(self):
+        # Wakes only when the minute, a timer's minute or a message changes.
+        while True:
+            now = utime.localtime()
+            self.home.set_clock(now[3], now[4])
+            self.dirty.set()
+            ms = self.next_tick_ms()
+            self.power.wake_in("clock", ms)
+            self.tick.clear()
+            try:
+                await asyncio.wait_for(self.tick.wait(), ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+
+    async def display_task(self):
+        while True:
+            await self.dirty.wait()
+            self.dirty.clear()
+            if self.busy:
+                continue
+            if self.message_until is not None:
+                if utime.ticks_diff(self.message_until, utime.ticks_ms()) > 0:
+                    continue
+                self.message_until = None
+            mark = self.perf.heap_mark()
+            t0 = utime.ticks_ms()
+            self.render_home()
+            self.perf.render_done(t0, mark)
+            if self.perf.boot[0] < 0:
+                self.perf.boot_done(BOOT_T0)
+
+    async def network_task(self):
+        power = self.power
+        net = self.net
+        while True:
+            if self.journal.pending and net.ready():
+                power.radio(True)
+                self.syncing = True
+                try:
+                    sent = await self.api.areplay(limit=1)
+                finally:
+                    self.syncing = False
+                if sent:
+                    self.dirty.set()
+                    if not self.journal.pending:
+                        self.resync.set()  # pick up the ids the server gave
+                    continue
+            # Wait for a new entry, the link to come back (the supervisor
+            # sets queued) or the breaker's backoff to run out.
+            wait = None
+            if self.journal.pending and net.up:
+                wait = net.breaker.retry_in()
+                power.wake_in("sync", wait)
+            else:
+                power.cancel("sync")
+            power.radio(False)
+            self.dirty.set()  # the home screen shows the link state
+            self.queued.clear()
+            try:
+                await asyncio.wait_for(self.queued.wait(), None if wait is None else wait / 1000)
+            except asyncio.TimeoutError:
+                pass
+
+    async def perf_task(self):
+        # Measures how late the loop wakes a sleeping task; lightsleep
+        # stalls are intended, so only active periods are recorded.
+        perf = self.perf
+        while True:
+            t0 = utime.ticks_ms()
+            await asyncio.sleep(LOOP_PROBE_MS / 1000)
+            if self.power.state == ACTIVE:
+                perf.record("loop", utime.ticks_diff(utime.ticks_ms(), t0) - LOOP_PROBE_MS)
+            perf.sample_heap()
+
+    async def power_task(self):
+        power = self.power
+        last_log = utime.time()
+        while True:
+            await asyncio.sleep(IDLE_POLL)
+            if utime.time() - last_log >= POWER_LOG_INTERVAL:
+                power.log()
+                last_log = utime.time()
+            if (self.busy or self.presses or self.syncing or self.polling or self.clock.busy
+                    or utime.ticks_diff(utime.ticks_ms(), self.last_input) < IDLE_AFTER * 1000):
+                if power.state != ACTIVE:
+                    power.enter(ACTIVE)
+                continue
+            if power.state == ACTIVE:
+                power.enter(IDLE)
+                self.collect()
+            elif self.gc_floor >= 0 and self.perf.heap_mark() - self.gc_floor > GC_SLACK:
+                self.collect()
+            # Blocks the whole loop until the next deadline or a pin IRQ;
+            # the woken task runs as soon as this one yields again.
+            power.sleep()
+
+    def collect(self):
+        """Collect garbage now, while no press or request waits on the CPU,
+        so the allocator rarely has to stop for it in the middle of one."""
+        self.perf.collect()
+        self.gc_floor = self.perf.heap_mark()
+
+    async def control_task(self):
+        while True:
+            await self.pressed.wait()
+            self.pressed.clear()
+            while self.presses:
+                btn = self.presses.pop(0)
+                try:
+                    await self.handle(btn)
+                except Exception as e:
+                    # A failing action must not end run() and the other tasks.
+                    print(f"Action {btn} error: {e}")
+                    self.perf.faults += 1
+                    self.notify("Error", type(e).__name__)
+                if self.journal.pending:
+                    self.queued.set()
+                self.snapshot.save(self.api, self.activities)
+                self.sync.reset()
+                self.dirty.set()
+
+    async def sync_task(self):
+        """Follow timers started or stopped elsewhere; see sync.TimerSync.
+
+        Polls at the sync module's adaptive interval, or at once when
+        resync is set: after boot, on reconnect and once the journal drains.
+        """
+        sync = self.sync
+        await self.resync.wait()  # set by boot_task once the roster is in
+        while True:
+            self.resync.clear()
+            await self.net.wait_ready()
+            if not self.busy:
+                self.power.radio(True)
+                self.polling = True
+                try:
+                    changed = await sync.poll()
+                finally:
+                    self.polling = False
+                if changed:
+                    self.snapshot.save(self.api, self.activities)
+                    self.tick.set()  # the clock task reschedules for the new timers
+            self.power.wake_in("timers", sync.interval * 1000)
+            try:
+                await asyncio.wait_for(self.resync.wait(), sync.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def boot_task(self):
+        """Bring up the server behind the running UI."""
+        api = self.api
+        net = self.net
+        retry = BOOT_RETRY_MIN
+        while True:
+            await net.wait_ready()
+            children = await api.acollect("children", fields=CHILD_FIELDS, timeout=BOOT_DEADLINE)
+            if children is not None:
+                break
+            status = api.last_status
+            if status is None or transient(status):
+                continue  # the breaker backs off from these
+            # A wrong token or URL: the breaker counts it as an answer, so
+            # back off here and say so on the home screen.
+            print(f"API roster refused: HTTP {status}, retry in {retry} s")
+            self.api_error = status
+            self.dirty.set()
+            self.power.wake_in("boot", retry * 1000)
+            await asyncio.sleep(retry)
+            retry = min(BOOT_RETRY_MAX, retry * 2)
+        self.api_error = None
+        self.power.cancel("boot")
+        current = api.active_child()
+        api.children = children
+        api.child_index = 0
+        for i, child in enumerate(children):
+            if current is not None and child["id"] == current["id"]:
+                api.child_index = i
+        self.snapshot.save(api, self.activities)
+        self.resync.set()
+        self.queued.set()
+        self.dirty.set()
+
+    def clock_stepped(self, delta, first):
+        """Clock callback: the RTC moved by ``delta`` seconds."""
+        if first:
+            # Timers started before the clock was set used the unsynced
+            # RTC; move them by the same jump.
+            before = utime.time() - delta
+            for activity in self.activities.running():
+                if self.booted <= activity.start <= before:
+                    activity.start += delta
+        self.tick.set()
+
+    def link_changed(self, up):
+        """Supervisor callback: retry the journal as soon as the link is back."""
+        self.queued.set()
+        if up:
+            self.resync.set()
+        self.dirty.set()
+
+    # --- Rendering ---
+
+    def render_home(self):
+        child = self.api.active_child()
+        self.home.render(utime.time(), self.api.child_initials(), self.net.up, self.journal.pending,
+                         child["id"] if child else 0, self.api_error is not None)
+
+    async def menu(self, widget, *args, **kwargs):
+        """Run an async widget with exclusive use of the display."""
+        self.busy = True
+        self.message_until = None
+        self.encoder.skip_click()  # a gesture may still be holding it
+        try:
+            return await widget(self.lcd, *args, **kwargs)
+        finally:
+            self.busy = False
+            # The clicks that worked the menu are not home screen gestures.
+            self.inputs.ignore(ENCODER)
+
+    # --- History ---
+
+    def log_event(self, kind, start=None):
+        """Add an event for the active child to the history; returns the
+        tag that goes with its journal entry."""
+        child = self.api.active_child()
+        now = utime.time()
+        return self.history.add(kind, child["id"] if child else 0,
+                                now if start is None else start, now)
+
+    def logged(self, tag, res):
+        # Journaled entries are settled by the journal; a direct post
+        # (no journal) has succeeded or failed already.
+        if not res:
+            self.history.mark(tag, REJECTED)
+        elif not res.get("queued"):
+            self.history.mark(tag, SENT)
+
+    # --- Button actions ---
+
+    def no_child(self):
+        """True, after saying so, if there is no child to log for yet (first
+        boot before the server has answered)."""
+        if self.api.active_child():
+            return False
+        self.notify("No Child", "")
         return True
-    except Exception as e:
-        lcd.show("Time sync err", str(e)[:16])
-        utime.sleep(2)
-        lcd.clear()
-        return False
-
-# --- Feeding types/methods for selection ---
-FEED_TYPES = [
-    "breast milk", "formula", "fortified milk", "other"
-]
-FEED_METHODS = [
-    "both breasts", "left breast", "right breast", "bottle", "other"
-]
-
-def select_from_list(lcd, title, options, encoder):
-    idx = 0
-    encoder.reset(0)
-    lcd.show(title, options[idx])
-    while True:
-        diff = encoder.get()
-        if diff != 0:
-            idx = (idx + diff) % len(options)
-            lcd.show(title, options[idx])
-        if encoder.button_pressed():
-            utime.sleep(0.2)
-            return options[idx]
-        utime.sleep(0.05)
-
-def select_with_arrow(lcd, options, encoder):
-    """Display all options on one line with a moving arrow underneath."""
-    row = " ".join(options)
-    if len(row) > lcd.cols:
-        raise ValueError("Options string too long for display")
-    positions = []
-    pos = 0
-    for opt in options:
-        positions.append(pos)
-        pos += len(opt) + 1  # space after each option
-    if positions:
-        positions[-1] = min(positions[-1], lcd.cols - 1)  # ensure arrow in bounds
-    idx = 0
-    encoder.reset(0)
-    while True:
-        arrow = " " * lcd.cols
-        if positions[idx] < lcd.cols:
-            arrow = arrow[:positions[idx]] + "^" + arrow[positions[idx] + 1:]
-        lcd.show(row, arrow)
-        diff = encoder.get()
-        if diff != 0:
-            idx = (idx + diff) % len(options)
-        if encoder.button_pressed():
-            utime.sleep(0.2)
-            return options[idx]
-        utime.sleep(0.05)
-
-def input_number(lcd, title, encoder, initial=0, step=1, min_val=0, max_val=100):
-    """Simple numeric input using the rotary encoder."""
-    val = initial
-    encoder.reset(0)
-    lcd.show(title, str(val))
-    while True:
-        diff = encoder.get()
-        if diff != 0:
-            val += diff * step
-            if val < min_val:
-                val = min_val
-            if val > max_val:
-                val = max_val
-            lcd.show(title, str(val))
-        if encoder.button_pressed():
-            utime.sleep(0.2)
-            return val
-        utime.sleep(0.05)
 
-def main():
+    async def handle(self, btn):
+        if btn < len(BUTTONS):
+            action, arg = BUTTONS[btn]
+            await getattr(self, action)(arg)
+
+    async def toggle(self, name):
+        """Start the activity's timer, or stop it and log the entry."""
+        api = self.api
+        activity = self.activities.get(name)
+        if not activity.active:
+            if self.no_child():
+                return
+            data = activity.data
+            if self.clock.synced:
+                # The server keeps the press time, even if the start is
+                # only replayed much later.
+                data = dict(data or {}, start=format_time(utime.time()))
+            res = api.start_timer(name, data=data)
+            if res and "id" in res:
+                activity.begin(res["id"])
+            else:
+                self.notify("Error: Timer", "")
+            return
+        data = {}
+        for field, title, options in activity.prompts:
+            data[field] = await self.menu(select_from_list, title, options, self.encoder)
+        tag = self.log_event(name, activity.start)
+        res = api.finish_timer(name, activity.timer_id, data=data, tag=tag)
+        self.logged(tag, res)
+        if res:
+            self.notify(activity.done, "/".join(data[p[0]] for p in activity.prompts))
+        else:
+            self.notify("API Error", "")
+        activity.end()
+
+    async def diaper(self, _):
+        if self.no_child():
+            return
+        option = await self.menu(select_with_arrow, ["Wet", "Solid", "Both"], self.encoder)
+        wet = option in ("Wet", "Both")
+        solid = option in ("Solid", "Both")
+        tag = self.log_event("diaper")
+        res = self.api.log_diaper_change(wet=wet, solid=solid, tag=tag)
+        self.logged(tag, res)
+        if res:
+            self.notify("Diaper Logged", option)
+        else:
+            self.notify("API Error", "")
+
+    async def weight(self, _):
+        if self.no_child():
+            return
+        from numentry import input_number
+        weight = await self.menu(input_number, "Weight g?", self.encoder, initial=3500, step=10, min_val=0, max_val=20000)
+        tag = self.log_event("weight")
+        res = self.api.log_weight(weight, tag=tag)
+        self.logged(tag, res)
+        if res:
+            self.notify("Weight Logged", str(weight) + " g")
+        else:
+            self.notify("API Error", "")
+
+    async def temperature(self, _):
+        if self.no_child():
+            return
+        from numentry import input_number
+        temp = await self.menu(input_number, "Temp C?", self.encoder, initial=37, step=1, min_val=30, max_val=45)
+        tag = self.log_event("temperature")
+        res = self.api.log_temperature(temp, tag=tag)
+        self.logged(tag, res)
+        if res:
+            self.notify("Temp Logged", str(temp) + " C")
+        else:
+            self.notify("API Error", "")
+
+    async def switch_child(self, _):
+        """Cycle through two children; pick from a menu when there are more."""
+        api = self.api
+        if len(api.children) > 2:
+            names = ["%s %s" % (c.get("first_name", ""), c.get("last_name", "")) for c in api.children]
+            api.child_index = await self.menu(select_index, names, self.encoder, index=api.child_index)
+        else:
+            api.next_child()
+        self.notify("Active Child", api.child_initials(), seconds=1)
+        self.resync.set()  # adopt timers already running for this child
+
+    async def diagnostics(self, _):
+        import diag
+        diag.dump(self.perf)
+        await self.menu(show_pages, diag.pages(self.perf), self.encoder)
+
+
+# Button index -> (Runtime method, argument).
+BUTTONS = (
+    ("toggle", "feeding"),       # Button 1 - Feeding timer
+    ("toggle", "sleep"),         # Button 2 - Sleep timer
+    ("diaper", None),            # Button 3 - Diaper change
+    ("toggle", "tummy time"),    # Button 4 - Tummy time timer
+    ("weight", None),            # Button 5 - Weight entry
+    ("temperature", None),       # Button 6 - Temperature entry
+    ("toggle", "pumping"),       # Button 7 - Pumping timer
+    ("switch_child", None),      # Button 8 - Switch child
+    ("diagnostics", None),       # Gesture only (hidden)
+)
+SWITCH_CHILD = 7
+DIAGNOSTICS = 8
+
+# Gesture -> index into BUTTONS, for actions that need no button of their
+# own. Keys are (kind, source) as in inputbus; a chord's source is the mask
+# of what is held, e.g. (CHORD, 1 << 0 | 1 << 7) for buttons 1 and 8. A
+# short press runs the button's own action, and so does a long press or a
+# chord of buttons with no entry here.
+GESTURES = {
+    (LONG, ENCODER): DIAGNOSTICS,       # Hold the encoder on the home screen
+    (DOUBLE, ENCODER): SWITCH_CHILD,    # Double-click it
+}
+
+
+async def run():
     # --- Init hardware ---
     lcd = LCDDisplay()
     buttons = ButtonArray()
     encoder = RotaryEncoder()
 
-    # --- Load secrets and connect WiFi ---
+    # --- Restore the last state from flash ---
+    snapshot = Snapshot()
+    snapshot.load()
     try:
-        with open("secrets.json") as f:
-            secrets = json.load(f)
+        config = snapshot.config()
     except Exception as e:
         lcd.show("Error: Secrets", str(e))
         while True:
-            utime.sleep(1)
-
-    wifi = secrets["wifi"]
-    if not connect_wifi(wifi["ssid"], wifi["password"], lcd):
-        while True:
-            utime.sleep(1)
-
-    # --- Sync time via NTP ---
-    sync_time(lcd)
+            await asyncio.sleep(1)
 
-    # --- Init API now that WiFi is up ---
-    api = BabyBuddyAPI("secrets.json")
+    journal = Journal()
+    history = History()
+    journal.on_settle = history.settled
+    perf = Perf(lcd)
+    breaker = Breaker()
+    wlan = network.WLAN(network.STA_IF)
+    power = PowerManager(wlan, wake_pins=(encoder.button,), lightsleep=LIGHTSLEEP)
+    inputs = InputBus(buttons, encoder)  # its pin IRQs end a lightsleep too
+    ntp = config.get("ntp", {})
+    clock = Clock(ntp.get("host", NTP_HOST), ntp.get("port", NTP_PORT), power)
+    perf.clock = clock
+    cache = ResponseCache()
+    perf.cache = cache
+    api = BabyBuddyAPI(journal=journal, load=False, perf=perf, config=config, breaker=breaker,
+                       clock=clock, cache=cache)
+    mqtt = config.get("mqtt")
+    if mqtt:
+        # Posts go to the broker; tools/bridge.py forwards them to Baby Buddy.
+        from mqttclient import AsyncClient, DEFAULT_PORT
+        from transport import MqttTransport
+        device = mqtt.get("device", "babypad")
+        client = AsyncClient(mqtt["host"], mqtt.get("port", DEFAULT_PORT), device, mqtt.get("user"),
+                             mqtt.get("password"))
+        api.transport = MqttTransport(api, client, device)
+    wifi = config["wifi"]
+    net = Supervisor(wlan, wifi["ssid"], wifi["password"], breaker, power)
+    if NET_THREAD:
+        import networker
+        if networker.available():
+            api.worker = networker.NetWorker(api)
+            api.worker.start()
+            power.lightsleep = False  # core 1 keeps running
+    rt = Runtime(lcd, inputs, encoder, api, journal, power, perf, snapshot, net, history, clock)
+    net.on_change = rt.link_changed
+    clock.on_step = rt.clock_stepped
+    snapshot.restore(api, rt.activities)
 
-    # --- Baby Buddy API connect ---
-    lcd.show("Connecting...", "")
-    if not api.is_connected():
-        lcd.show("API Conn Error", "")
-        while True:
-            utime.sleep(2)
-
-    # --- App state ---
-    feeding_active = False
-    feeding_timer_id = None
-    feeding_start_time = None
-    sleep_active = False
-    sleep_timer_id = None
-    sleep_start_time = None
-    tummy_active = False
-    tummy_timer_id = None
-    tummy_start_time = None
-    pumping_active = False
-    pumping_timer_id = None
-    pumping_start_time = None
-
-    # --- Main loop ---
-    while True:
-        # --- Time + initials display ---
-        initials = api.child_initials()
-        now = utime.localtime()
-        timestr = "%02d:%02d" % (now[3], now[4])
-        if feeding_active:
-            elapsed = utime.time() - feeding_start_time
-            t_h = elapsed // 3600
-            t_m = (elapsed % 3600) // 60
-            lcd.show(f"{initials}   {timestr}", "Feed %02d:%02d" % (t_h, t_m))
-        elif sleep_active:
-            elapsed = utime.time() - sleep_start_time
-            t_h = elapsed // 3600
-            t_m = (elapsed % 3600) // 60
-            lcd.show(f"{initials}   {timestr}", "Sleep %02d:%02d" % (t_h, t_m))
-        elif tummy_active:
-            elapsed = utime.time() - tummy_start_time
-            t_h = elapsed // 3600
-            t_m = (elapsed % 3600) // 60
-            lcd.show(f"{initials}   {timestr}", "Tummy %02d:%02d" % (t_h, t_m))
-        elif pumping_active:
-            elapsed = utime.time() - pumping_start_time
-            t_h = elapsed // 3600
-            t_m = (elapsed % 3600) // 60
-            lcd.show(f"{initials}   {timestr}", "Pump %02d:%02d" % (t_h, t_m))
-        else:
-            lcd.show(f"{initials}   {timestr}", "Ready")
-
-        # --- Button 1: Feeding ---
-        btn = buttons.read()
-        if btn == 0:  # Button 1
-            # Start or stop feeding
-            if not feeding_active:
-                # Start feeding timer
-                res = api.start_timer("feeding", data={"type": "breast milk", "method": "both breasts"})
-                if res and "id" in res:
-                    feeding_active = True
-                    feeding_timer_id = res["id"]
-                    feeding_start_time = utime.time()
-                else:
-                    lcd.show("Error: Timer", "")
-                    utime.sleep(2)
-            else:
-                # Stop feeding timer and log details
-                # Select type
-                feed_type = select_from_list(lcd, "Feed Type?", FEED_TYPES, encoder)
-                feed_method = select_from_list(lcd, "Feed Method?", FEED_METHODS, encoder)
-                res = api.finish_timer("feeding", feeding_timer_id, data={"type": feed_type, "method": feed_method})
-                if res:
-                    lcd.show("Logged!", feed_type + "/" + feed_method)
-                else:
-                    lcd.show("API Error", "")
-                utime.sleep(2)
-                feeding_active = False
-                feeding_timer_id = None
-                feeding_start_time = None
-
-        elif btn == 1:  # Button 2 - Sleep timer
-            if not sleep_active:
-                res = api.start_timer("sleep")
-                if res and "id" in res:
-                    sleep_active = True
-                    sleep_timer_id = res["id"]
-                    sleep_start_time = utime.time()
-                else:
-                    lcd.show("Error: Timer", "")
-                    utime.sleep(2)
-            else:
-                res = api.finish_timer("sleep", sleep_timer_id)
-                if res:
-                    lcd.show("Sleep Logged", "")
-                else:
-                    lcd.show("API Error", "")
-                utime.sleep(2)
-                sleep_active = False
-                sleep_timer_id = None
-                sleep_start_time = None
-
-        elif btn == 2:  # Button 3 - Diaper change
-            lcd.show("Diaper Change", "")
-            utime.sleep(0.5)
-            option = select_with_arrow(lcd, ["Wet", "Solid", "Both"], encoder)
-            wet = option in ("Wet", "Both")
-            solid = option in ("Solid", "Both")
-            if api.log_diaper_change(wet=wet, solid=solid):
-                lcd.show("Diaper Logged", option)
-            else:
-                lcd.show("API Error", "")
-            utime.sleep(2)
-
-        elif btn == 3:  # Button 4 - Tummy time timer
-            if not tummy_active:
-                res = api.start_timer("tummy time")
-                if res and "id" in res:
-                    tummy_active = True
-                    tummy_timer_id = res["id"]
-                    tummy_start_time = utime.time()
-                else:
-                    lcd.show("Error: Timer", "")
-                    utime.sleep(2)
-            else:
-                res = api.finish_timer("tummy time", tummy_timer_id)
-                if res:
-                    lcd.show("Tummy Logged", "")
-                else:
-                    lcd.show("API Error", "")
-                utime.sleep(2)
-                tummy_active = False
-                tummy_timer_id = None
-                tummy_start_time = None
-
-        elif btn == 4:  # Button 5 - Weight entry
-            weight = input_number(lcd, "Weight g?", encoder, initial=3500, step=10, min_val=0, max_val=20000)
-            if api.log_weight(weight):
-                lcd.show("Weight Logged", str(weight) + " g")
-            else:
-                lcd.show("API Error", "")
-            utime.sleep(2)
+    # --- Home screen first; Wi-Fi, NTP and the server catch up behind it ---
+    tasks = [
+        asyncio.create_task(rt.input_task()),
+        asyncio.create_task(rt.clock_task()),
+        asyncio.create_task(rt.display_task()),
+        asyncio.create_task(rt.network_task()),
+        asyncio.create_task(rt.power_task()),
+        asyncio.create_task(rt.perf_task()),
+        asyncio.create_task(net.run()),
+        asyncio.create_task(rt.boot_task()),
+        asyncio.create_task(clock.run(net.online)),
+        asyncio.create_task(rt.sync_task()),
+    ]
+    try:
+        await rt.control_task()
+    finally:
+        for task in tasks:
+            task.cancel()
 
-        elif btn == 5:  # Button 6 - Temperature entry
-            temp = input_number(lcd, "Temp C?", encoder, initial=37, step=1, min_val=30, max_val=45)
-            if api.log_temperature(temp):
-                lcd.show("Temp Logged", str(temp) + " C")
-            else:
-                lcd.show("API Error", "")
-            utime.sleep(2)
-
-        elif btn == 6:  # Button 7 - Pumping timer
-            if not pumping_active:
-                res = api.start_timer("pumping")
-                if res and "id" in res:
-                    pumping_active = True
-                    pumping_timer_id = res["id"]
-                    pumping_start_time = utime.time()
-                else:
-                    lcd.show("Error: Timer", "")
-                    utime.sleep(2)
-            else:
-                res = api.finish_timer("pumping", pumping_timer_id)
-                if res:
-                    lcd.show("Pump Logged", "")
-                else:
-                    lcd.show("API Error", "")
-                utime.sleep(2)
-                pumping_active = False
-                pumping_timer_id = None
-                pumping_start_time = None
-
-        elif btn == 7:  # Button 8 - Switch child
-            api.next_child()
-            lcd.show("Active Child", api.child_initials())
-            utime.sleep(1)
 
-        utime.sleep(0.1)
+def main():
+    asyncio.run(run())
 
 if __name__ == "__main__":
     main()
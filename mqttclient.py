@@ -0,0 +1,258 @@
+# mqttclient.py
+
+import uasyncio as asyncio
+
+DEFAULT_PORT = 1883
+TIMEOUT = 10
+# Packet types (the high nibble of the first byte).
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+PINGRESP = 13
+DISCONNECT = 14
+
+
+class MQTTError(OSError):
+    """The broker refused the connection or a subscription."""
+
+
+def _length(n):
+    # Remaining length: 7 bits per byte, low bits first.
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        out.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(out)
+
+
+def _str(s):
+    if isinstance(s, str):
+        s = s.encode()
+    return bytes((len(s) >> 8, len(s) & 0xFF)) + s
+
+
+def _packet(first, body):
+    return bytes((first,)) + _length(len(body)) + body
+
+
+class AsyncClient:
+    """Minimal MQTT 3.1.1 client on one persistent uasyncio connection.
+
+    :meth:`publish` sends at QoS 0, or at QoS 1 and returns once the broker
+    has acknowledged the message. Topics in :attr:`subscriptions` (``(topic,
+    qos)`` pairs) are subscribed on every connect; messages on them go to
+    ``on_message(topic, payload, pid)`` from the reader task. ``pid`` is set
+    for QoS 1 messages, which are acknowledged only when the owner calls
+    :meth:`ack`, once it has handled them.
+
+    The connection is opened on demand and closed on any error, so the next
+    call reconnects. Keepalive is 0: no pings wake the radio, and a dead
+    connection shows up as a failed publish instead.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, client_id="babypad", user=None, password=None,
+                 clean=True, timeout=TIMEOUT):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.user = user
+        self.password = password
+        self.clean = clean
+        self.timeout = timeout
+        self.subscriptions = []
+        self.on_message = None
+        self.reader = None
+        self.writer = None
+        self.task = None
+        self.lock = asyncio.Lock()
+        self.pid = 0
+        self.pending = {}   # pid -> [Event, ack body] of a publish or subscribe in flight
+        self.session = False  # the broker kept our session from the last connection
+        self.connects = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    # --- Connection ---
+
+    async def connect(self):
+        await self.close()
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            flags = 0x02 if self.clean else 0
+            payload = _str(self.client_id)
+            if self.user is not None:
+                flags |= 0x80
+                payload += _str(self.user)
+            if self.password is not None:
+                flags |= 0x40
+                payload += _str(self.password)
+            await self._write(_packet(CONNECT << 4, _str("MQTT") + bytes((4, flags, 0, 0)) + payload))
+            kind, _, body = await asyncio.wait_for(self._read(self.reader), self.timeout)
+            if kind != CONNACK or len(body) < 2 or body[1]:
+                raise MQTTError("connection refused: %d" % (body[1] if kind == CONNACK else -1))
+            self.session = bool(body[0] & 1)
+            self.connects += 1
+            # A kept session may deliver queued messages before the SUBACK,
+            # so the reader runs from here on.
+            self.task = asyncio.create_task(self._run(self.reader))
+            for topic, qos in self.subscriptions:
+                pid = self._next_pid()
+                ack = await self._request(pid, _packet(SUBSCRIBE << 4 | 2, bytes((pid >> 8, pid & 0xFF))
+                                                       + _str(topic) + bytes((qos,))))
+                if ack[2] == 0x80:
+                    raise MQTTError("subscription to %s refused" % topic)
+        except Exception:
+            await self.close()
+            raise
+
+    async def close(self):
+        task = self.task
+        writer = self.writer
+        self.task = None
+        self.reader = None
+        self.writer = None
+        if task is not None:
+            task.cancel()
+        self._fail()
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def disconnect(self):
+        if self.writer is not None:
+            try:
+                await self._write(_packet(DISCONNECT << 4, b""))
+            except OSError:
+                pass
+        await self.close()
+
+    def connected(self):
+        return self.writer is not None
+
+    # --- Messages ---
+
+    async def publish(self, topic, payload, qos=0, dup=False):
+        """Send a message; at QoS 1, wait for the broker to take it.
+
+        Raises OSError or asyncio.TimeoutError and drops the connection if
+        it did not get through.
+        """
+        if self.writer is None:
+            await self.connect()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        body = _str(topic)
+        pid = 0
+        if qos:
+            pid = self._next_pid()
+            body += bytes((pid >> 8, pid & 0xFF))
+        packet = _packet(PUBLISH << 4 | (8 if dup else 0) | qos << 1, body + payload)
+        try:
+            if qos:
+                await self._request(pid, packet)
+            else:
+                await self._write(packet)
+        except Exception:
+            await self.close()
+            raise
+
+    async def ack(self, pid):
+        """Acknowledge a QoS 1 message handed to :attr:`on_message`."""
+        await self._write(_packet(PUBACK << 4, bytes((pid >> 8, pid & 0xFF))))
+
+    # --- Wire ---
+
+    def _next_pid(self):
+        self.pid = self.pid % 0xFFFF + 1
+        return self.pid
+
+    async def _request(self, pid, packet):
+        # Send a packet and wait for the acknowledgement carrying ``pid``.
+        slot = [asyncio.Event(), None]
+        self.pending[pid] = slot
+        try:
+            await self._write(packet)
+            await asyncio.wait_for(slot[0].wait(), self.timeout)
+        finally:
+            self.pending.pop(pid, None)
+        if slot[1] is None:
+            raise OSError("connection lost")
+        return slot[1]
+
+    def _fail(self):
+        # Wake everything still waiting for an acknowledgement.
+        for slot in self.pending.values():
+            slot[0].set()
+
+    async def _write(self, buf):
+        async with self.lock:
+            writer = self.writer
+            if writer is None:
+                raise OSError("not connected")
+            writer.write(buf)
+            await writer.drain()
+        self.bytes_out += len(buf)
+
+    async def _read(self, reader):
+        first = (await reader.readexactly(1))[0]
+        n = shift = 0
+        size = 2
+        while True:
+            b = (await reader.readexactly(1))[0]
+            n |= (b & 0x7F) << shift
+            if not b & 0x80:
+                break
+            shift += 7
+            size += 1
+        body = await reader.readexactly(n) if n else b""
+        self.bytes_in += size + n
+        return first >> 4, first & 0x0F, body
+
+    async def _run(self, reader):
+        try:
+            while True:
+                kind, flags, body = await self._read(reader)
+                if kind == PUBLISH:
+                    self._message(flags, body)
+                elif kind in (PUBACK, SUBACK):
+                    slot = self.pending.get(body[0] << 8 | body[1])
+                    if slot is not None:
+                        slot[1] = body
+                        slot[0].set()
+                # PINGRESP and anything else need nothing.
+        except Exception:
+            pass
+        if self.reader is reader:
+            # The broker went away; the next call reconnects.
+            writer = self.writer
+            self.task = None
+            self.reader = None
+            self.writer = None
+            self._fail()
+            writer.close()
+
+    def _message(self, flags, body):
+        n = body[0] << 8 | body[1]
+        topic = bytes(body[2:2 + n]).decode()
+        i = 2 + n
+        pid = None
+        if flags & 0x06:
+            pid = body[i] << 8 | body[i + 1]
+            i += 2
+        if self.on_message is None:
+            if pid is not None:
+                asyncio.create_task(self.ack(pid))
+            return
+        try:
+            self.on_message(topic, bytes(body[i:]), pid)
+        except Exception as e:
+            print(f"MQTT message on {topic} error: {e}")
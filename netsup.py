@@ -0,0 +1,152 @@
+# netsup.py
+
+import random
+import utime
+import uasyncio as asyncio
+
+# Backoff after a failed request: BASE doubled per consecutive failure, up to
+# MAX, with +-25% jitter so a fleet does not retry in lockstep (ms).
+BACKOFF_BASE = 2000
+BACKOFF_MAX = 300000
+# Consecutive failures after which requests fail fast until the backoff ends.
+TRIP_AFTER = 3
+# Wi-Fi watchdog: link check period while up (s), join timeout (s) and the
+# reconnect backoff range (s).
+WATCH_PERIOD = 5
+JOIN_TIMEOUT = 15
+RECONNECT_MIN = 2
+RECONNECT_MAX = 120
+
+
+def transient(status):
+    """True if a request outcome says the server or the path is in trouble."""
+    return status is None or status >= 500 or status in (408, 429)
+
+
+def _jitter(ms):
+    return ms * (96 + random.getrandbits(6)) // 128  # 75%..124%
+
+
+class Breaker:
+    """Circuit breaker with exponential backoff for the Baby Buddy server.
+
+    Every transient failure pushes the next attempt out by the backoff.
+    After :data:`TRIP_AFTER` failures in a row the breaker is open and
+    :meth:`allow` refuses requests until the backoff has passed; the next
+    request is then a probe whose outcome closes or reopens it.
+    """
+
+    def __init__(self, trip_after=TRIP_AFTER, base_ms=BACKOFF_BASE, max_ms=BACKOFF_MAX):
+        self.trip_after = trip_after
+        self.base_ms = base_ms
+        self.max_ms = max_ms
+        self.failures = 0
+        self.until = utime.ticks_ms()
+        self.rejected = 0    # requests refused while open
+        self.trips = 0
+
+    @property
+    def open(self):
+        return self.failures >= self.trip_after
+
+    def retry_in(self):
+        """Milliseconds until the next attempt is due (0 when it is now)."""
+        if not self.failures:
+            return 0
+        return max(0, utime.ticks_diff(self.until, utime.ticks_ms()))
+
+    def allow(self):
+        if self.open and self.retry_in() > 0:
+            self.rejected += 1
+            return False
+        return True
+
+    def record(self, status):
+        if not transient(status):
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures == self.trip_after:
+            self.trips += 1
+        delay = min(self.max_ms, self.base_ms << min(self.failures - 1, 16))
+        self.until = utime.ticks_add(utime.ticks_ms(), _jitter(delay))
+
+    def reset(self):
+        self.failures = 0
+
+
+class Supervisor:
+    """Keeps the WLAN joined and tells the runtime when the link changes.
+
+    :meth:`run` is a task: it rejoins with exponential backoff whenever the
+    link drops, resets the breaker when it comes back, and sets
+    :attr:`online` so waiting tasks resume at once.
+    """
+
+    def __init__(self, wlan, ssid, password, breaker, power=None, on_change=None):
+        self.wlan = wlan
+        self.ssid = ssid
+        self.password = password
+        self.breaker = breaker
+        self.power = power
+        self.on_change = on_change
+        self.online = asyncio.Event()
+        self.up = False
+        self.joins = 0
+        self.drops = 0
+
+    def ready(self):
+        """True if a request could be attempted right now."""
+        return self.up and self.breaker.retry_in() == 0
+
+    async def wait_ready(self):
+        while True:
+            await self.online.wait()
+            ms = self.breaker.retry_in()
+            if ms == 0:
+                return
+            await asyncio.sleep(ms / 1000)
+
+    def _set(self, up):
+        if up == self.up:
+            return
+        self.up = up
+        if up:
+            self.online.set()
+            self.breaker.reset()
+        else:
+            self.online.clear()
+            self.drops += 1
+        if self.on_change is not None:
+            self.on_change(up)
+
+    async def _join(self):
+        wlan = self.wlan
+        wlan.active(True)
+        wlan.connect(self.ssid, self.password)
+        self.joins += 1
+        for _ in range(JOIN_TIMEOUT * 4):
+            if wlan.isconnected():
+                return True
+            await asyncio.sleep(0.25)
+        wlan.disconnect()
+        return False
+
+    async def run(self):
+        backoff = RECONNECT_MIN
+        while True:
+            if self.wlan.isconnected():
+                self._set(True)
+                backoff = RECONNECT_MIN
+                if self.power is not None:
+                    self.power.cancel("wifi")
+                await asyncio.sleep(WATCH_PERIOD)
+                continue
+            self._set(False)
+            if await self._join():
+                continue
+            print("WiFi join failed, retry in %d s" % backoff)
+            if self.power is not None:
+                self.power.wake_in("wifi", backoff * 1000)
+            await asyncio.sleep(backoff)
+            backoff = min(RECONNECT_MAX, backoff * 2)
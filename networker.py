@@ -0,0 +1,196 @@
+# networker.py
+
+import ujson as json
+import uasyncio as asyncio
+import utime
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+# Requests queued, and answers waiting to be picked up, at most.
+QUEUE = 8
+# How often a waiting request looks for its answer (s); with a
+# ThreadSafeFlag this is only the fallback when a wake-up is shared.
+POLL = 0.005
+SETTLE = 0.1
+# Stack of the worker thread (B); TLS needs more than the default.
+STACK = 16 * 1024
+
+
+def available():
+    return _thread is not None
+
+
+class Ring:
+    """Fixed-size FIFO shared by the two cores, guarded by a lock.
+
+    The slots are allocated once; :meth:`put` fails instead of growing when
+    the ring is full. With ``wait`` False both :meth:`put` and :meth:`take`
+    also give up at once if the other core holds the lock, so the event
+    loop, which always passes it, never waits on it.
+    """
+
+    def __init__(self, size):
+        self.slots = [None] * size
+        self.head = 0
+        self.count = 0
+        self.lock = _thread.allocate_lock()
+
+    def put(self, item, wait=True):
+        """Append ``item``; False if the ring is full (or, with ``wait``
+        False, if the lock is busy)."""
+        if not self.lock.acquire(1 if wait else 0):
+            return False
+        try:
+            size = len(self.slots)
+            if self.count == size:
+                return False
+            self.slots[(self.head + self.count) % size] = item
+            self.count += 1
+            return True
+        finally:
+            self.lock.release()
+
+    def take(self, wait=True):
+        """The oldest item, or None if there is none (or, with ``wait``
+        False, if the lock is busy)."""
+        if not self.lock.acquire(1 if wait else 0):
+            return None
+        try:
+            if not self.count:
+                return None
+            item = self.slots[self.head]
+            self.slots[self.head] = None
+            self.head = (self.head + 1) % len(self.slots)
+            self.count -= 1
+            return item
+        finally:
+            self.lock.release()
+
+
+class NetWorker:
+    """Runs HTTP requests and their JSON work on the second core.
+
+    :meth:`call` puts ``(seq, method, url, data)`` in the command ring and
+    wakes the worker thread, which encodes the body, sends it on the API's
+    blocking session, parses the answer and puts ``(seq, result, status,
+    date)`` in the completion ring and sets :attr:`flag`. The caller polls
+    that ring when woken, so the UI core spends no time in sockets, TLS or
+    the JSON codec. Once started, the worker owns ``api.session``; the event
+    loop keeps using ``api.asession`` for streamed lists.
+    """
+
+    def __init__(self, api, size=QUEUE):
+        self.api = api
+        self.commands = Ring(size)
+        self.completions = Ring(size)
+        self.finished = {}          # seq -> (result, status, date), picked up
+        self.abandoned = set()      # seqs whose caller timed out; answers dropped
+        flag = getattr(asyncio, "ThreadSafeFlag", None)
+        self.flag = flag() if flag is not None else None
+        self.seq = 0
+        self.running = False
+        self.requests = 0
+        self.busy_ms = 0            # time the worker spent on requests
+        self._wake = _thread.allocate_lock()
+        self._wake.acquire()        # released when there is work
+
+    def start(self):
+        self.running = True
+        try:
+            _thread.stack_size(STACK)
+        except (AttributeError, ValueError):
+            pass  # ports with a fixed or larger minimum stack
+        _thread.start_new_thread(self._loop, ())
+
+    def stop(self):
+        self.running = False
+        self._kick()
+
+    def _kick(self):
+        try:
+            self._wake.release()
+        except RuntimeError:
+            pass  # already awake
+
+    # --- Worker core ---
+
+    def _loop(self):
+        while self.running:
+            cmd = self.commands.take()
+            if cmd is None:
+                self._wake.acquire()
+                continue
+            seq, method, url, data = cmd
+            t0 = utime.ticks_ms()
+            out = self._send(method, url, data)
+            self.busy_ms += utime.ticks_diff(utime.ticks_ms(), t0)
+            self.requests += 1
+            while not self.completions.put((seq,) + out):
+                utime.sleep_ms(1)  # the event loop is behind on answers
+            if self.flag is not None:
+                self.flag.set()
+
+    def _send(self, method, url, data):
+        api = self.api
+        try:
+            body = None if data is None else json.dumps(data)
+            resp = api.session.request(method, url, api.headers, body)
+            status = resp.status_code
+            res = resp.json() if status in (200, 201) else None
+            return res, status, resp.headers.get("date")
+        except Exception as e:
+            print(f"API {method} {url} error: {e}")
+            return None, None, None
+
+    # --- Event loop core ---
+
+    def collect(self):
+        """Move answers off the completion ring; never blocks."""
+        while True:
+            item = self.completions.take(False)
+            if item is None:
+                return
+            if item[0] in self.abandoned:
+                self.abandoned.discard(item[0])
+                continue
+            self.finished[item[0]] = item[1:]
+
+    async def call(self, method, url, data=None, timeout=None):
+        """Send a request from the worker; returns (result, status, date).
+
+        Raises asyncio.TimeoutError after ``timeout`` seconds. The worker
+        cannot be interrupted mid-request, so the request is abandoned:
+        it may still be sent, and its answer is dropped.
+        """
+        self.seq = seq = (self.seq + 1) & 0xFFFF
+        t0 = utime.ticks_ms()
+        queued = False
+        while True:
+            if not queued:
+                queued = self.commands.put((seq, method, url, data), False)
+                if queued:
+                    self._kick()
+            if queued:
+                self.collect()
+                out = self.finished.pop(seq, None)
+                if out is not None:
+                    return out
+            wait = SETTLE
+            if timeout is not None:
+                left = timeout - utime.ticks_diff(utime.ticks_ms(), t0) / 1000
+                if left <= 0:
+                    if queued:
+                        self.abandoned.add(seq)
+                    raise asyncio.TimeoutError()
+                wait = min(wait, left)
+            if self.flag is None or not queued:
+                await asyncio.sleep(min(POLL, wait))
+                continue
+            try:
+                # Concurrent calls share the flag; the timeout covers a
+                # wake-up taken by another waiter.
+                await asyncio.wait_for(self.flag.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
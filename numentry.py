@@ -0,0 +1,36 @@
+# numentry.py
+# Number entry for the weight and temperature buttons; imported on first use.
+
+from ui import accel, wait_input
+
+# Coarse steps are capped so the whole range takes at least this many detents.
+MIN_DETENTS = 20
+
+
+async def input_number(lcd, title, encoder, initial=0, step=1, min_val=0, max_val=100):
+    """Numeric input using the rotary encoder.
+
+    Turning slowly moves by ``step`` per detent; turning fast moves by a
+    multiple of it (see :data:`ui.ACCEL`) and lands on multiples of the
+    coarse step, so fast spins cover large ranges and slow ones fine-tune.
+    """
+    val = initial
+    most = max(1, (max_val - min_val) // (step * MIN_DETENTS))
+    encoder.reset(0)
+    lcd.show(title, str(val))
+    while True:
+        diff = encoder.get()
+        if diff != 0:
+            unit = step * min(accel(encoder.speed()), most)
+            val += diff * unit
+            off = val % unit
+            if off and unit > step:
+                val += unit - off if diff < 0 else -off
+            if val < min_val:
+                val = min_val
+            if val > max_val:
+                val = max_val
+            lcd.show(title, str(val))
+        if encoder.clicked():
+            return val
+        await wait_input(encoder)
@@ -0,0 +1,127 @@
+# perf.py
+
+import gc
+import utime
+from array import array
+
+# Upper bucket edges in ms; one extra bucket counts everything slower.
+EDGES = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+NBUCKETS = len(EDGES) + 1
+
+# Recorded series: one per API endpoint, "other" for any endpoint not
+# listed, then the event loop lag, the home screen render time and the
+# pauses of the scheduled garbage collections.
+SERIES = ("", "children", "timers", "feedings", "sleep", "tummy-times", "pumping",
+          "changes", "weight", "temperature", "other", "loop", "render", "gc")
+OTHER = SERIES.index("other")
+
+# Per series slots in Perf.stats.
+COUNT = 0
+ERRORS = 1
+TOTAL = 2
+MAX = 3
+NSTATS = 4
+
+
+class Perf:
+    """Latency histograms and heap marks held in preallocated arrays.
+
+    :meth:`record`, :meth:`request` and :meth:`sample_heap` only write to
+    arrays sized at construction, so measuring does not allocate. Reading
+    the data back lives in ``diag.py``, which is imported only when the
+    diagnostics screen or the serial dump is used.
+    """
+
+    def __init__(self, lcd=None, series=SERIES):
+        self.lcd = lcd
+        self.clock = None  # clock.Clock, if its state should be reported
+        self.cache = None  # cache.ResponseCache, likewise
+        self.series = series
+        self.slots = {name: i for i, name in enumerate(series)}
+        self.hist = array("I", [0] * (len(series) * NBUCKETS))
+        self.stats = array("I", [0] * (len(series) * NSTATS))
+        # mem_free low-water, largest free block low-water, worst
+        # fragmentation in percent; -1 until first measured.
+        self.heap = array("i", [-1, -1, -1])
+        # Boot time in ms and heap in use once the home screen is up.
+        self.boot = array("i", [-1, -1])
+        # Home screen renders measured, bytes they allocated in total and
+        # at most, and renders a collection ran in (so not measured).
+        self.churn = array("i", [0, 0, 0, 0])
+        self.faults = 0    # button actions that raised
+        self.since = utime.ticks_ms()
+
+    # --- Recording ---
+
+    def record(self, name, ms, ok=True):
+        slot = self.slots.get(name, OTHER)
+        if ms < 0:
+            ms = 0
+        b = 0
+        for edge in EDGES:
+            if ms <= edge:
+                break
+            b += 1
+        self.hist[slot * NBUCKETS + b] += 1
+        base = slot * NSTATS
+        stats = self.stats
+        stats[base + COUNT] += 1
+        if not ok:
+            stats[base + ERRORS] += 1
+        stats[base + TOTAL] += ms
+        if ms > stats[base + MAX]:
+            stats[base + MAX] = ms
+
+    def request(self, endpoint, t0, status):
+        """Record one API call started at ticks_ms ``t0``."""
+        self.record(endpoint, utime.ticks_diff(utime.ticks_ms(), t0),
+                    status is not None and status < 400)
+
+    def sample_heap(self):
+        """Update the free heap low-water mark."""
+        if not hasattr(gc, "mem_free"):
+            return
+        free = gc.mem_free()
+        if self.heap[0] < 0 or free < self.heap[0]:
+            self.heap[0] = free
+
+    def heap_mark(self):
+        """Bytes of heap in use, or -1 where the port cannot tell."""
+        return gc.mem_alloc() if hasattr(gc, "mem_alloc") else -1
+
+    def render_done(self, t0, mark):
+        """Record a render started at ticks_ms ``t0`` and :meth:`heap_mark` ``mark``."""
+        self.record("render", utime.ticks_diff(utime.ticks_ms(), t0))
+        if mark < 0:
+            return
+        used = gc.mem_alloc() - mark
+        churn = self.churn
+        if used < 0:
+            churn[3] += 1
+            return
+        churn[0] += 1
+        churn[1] += used
+        if used > churn[2]:
+            churn[2] = used
+
+    def collect(self):
+        """Run the garbage collector now and record the pause."""
+        t0 = utime.ticks_ms()
+        gc.collect()
+        self.record("gc", utime.ticks_diff(utime.ticks_ms(), t0))
+
+    def boot_done(self, t0):
+        """Record boot time since ticks_ms ``t0`` and the heap in use now."""
+        self.boot[0] = utime.ticks_diff(utime.ticks_ms(), t0)
+        if hasattr(gc, "mem_alloc"):
+            self.boot[1] = gc.mem_alloc()
+        print("Boot: %d ms, heap %d B" % (self.boot[0], self.boot[1]))
+
+    def reset(self):
+        for arr in (self.hist, self.stats, self.churn):
+            for i in range(len(arr)):
+                arr[i] = 0
+        for i in range(len(self.heap)):
+            self.heap[i] = -1
+        self.faults = 0
+        self.since = utime.ticks_ms()
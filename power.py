@@ -0,0 +1,122 @@
+# power.py
+
+import machine
+import network
+import utime
+import ujson as json
+
+ACTIVE = "active"   # UI in use or network traffic in flight
+IDLE = "idle"       # CPU waiting in the event loop, radio in power-save
+SLEEP = "sleep"     # machine.lightsleep
+STATES = (ACTIVE, IDLE, SLEEP)
+
+# Sleeps shorter than this are not worth the lightsleep entry/exit cost (ms).
+MIN_SLEEP_MS = 500
+
+
+class PowerManager:
+    """Idle scheduler for the runtime.
+
+    Tasks register the next moment they need the CPU with :meth:`wake_in`;
+    :meth:`sleep` then stays in ``machine.lightsleep`` until the earliest of
+    those deadlines or until a wake pin fires. Time spent in each state is
+    accumulated so battery runtime can be compared between builds.
+    """
+
+    def __init__(self, wlan=None, wake_pins=(), lightsleep=True, log_path="power.log"):
+        self.wlan = wlan
+        self.lightsleep = lightsleep
+        self.log_path = log_path
+        self.deadlines = {}
+        self.totals = {s: 0 for s in STATES}
+        self.state = ACTIVE
+        self.since = utime.ticks_ms()
+        self.wakes = 0
+        self.radio_fast = None
+        for pin in wake_pins:
+            # Any enabled GPIO interrupt ends a lightsleep; the handler
+            # itself has nothing to do.
+            pin.irq(handler=_wake, trigger=machine.Pin.IRQ_FALLING)
+
+    # --- Deadlines ---
+
+    def wake_in(self, name, ms):
+        self.deadlines[name] = utime.ticks_add(utime.ticks_ms(), int(ms))
+
+    def cancel(self, name):
+        self.deadlines.pop(name, None)
+
+    def until_next(self):
+        """Milliseconds until the earliest deadline, or None if there is none."""
+        now = utime.ticks_ms()
+        best = None
+        for t in self.deadlines.values():
+            d = utime.ticks_diff(t, now)
+            if best is None or d < best:
+                best = d
+        if best is not None and best < 0:
+            best = 0
+        return best
+
+    # --- States ---
+
+    def enter(self, state):
+        now = utime.ticks_ms()
+        self.totals[self.state] += utime.ticks_diff(now, self.since)
+        self.state = state
+        self.since = now
+
+    def radio(self, fast):
+        """Full-power radio while traffic is pending, power-save otherwise."""
+        if self.wlan is None or fast == self.radio_fast:
+            return
+        mode = "PM_PERFORMANCE" if fast else "PM_POWERSAVE"
+        pm = getattr(network.WLAN, mode, None)
+        if pm is not None:
+            try:
+                self.wlan.config(pm=pm)
+            except (OSError, ValueError):
+                pass
+        self.radio_fast = fast
+
+    def sleep(self, max_ms=None):
+        """Light-sleep until the next deadline; returns the ms slept."""
+        ms = self.until_next()
+        if max_ms is not None and (ms is None or ms > max_ms):
+            ms = max_ms
+        if not self.lightsleep or ms is None or ms < MIN_SLEEP_MS:
+            return 0
+        self.radio(False)
+        self.enter(SLEEP)
+        t0 = utime.ticks_ms()
+        machine.lightsleep(ms)
+        slept = utime.ticks_diff(utime.ticks_ms(), t0)
+        self.wakes += 1
+        self.enter(IDLE)
+        return slept
+
+    # --- Reporting ---
+
+    def stats(self):
+        self.enter(self.state)  # fold in the current stretch
+        out = dict(self.totals)
+        out["wakes"] = self.wakes
+        return out
+
+    def log(self):
+        """Print the totals and append them to the power log on flash."""
+        stats = self.stats()
+        stats["t"] = utime.time()
+        line = json.dumps(stats)
+        print("power", line)
+        if self.log_path:
+            try:
+                with open(self.log_path, "a") as f:
+                    f.write(line)
+                    f.write("\n")
+            except OSError as e:
+                print(f"Power log error: {e}")
+
+
+def _wake(pin):
+    pass
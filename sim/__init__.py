@@ -0,0 +1,60 @@
+# sim/__init__.py
+"""Run the firmware on a host against simulated hardware.
+
+:func:`install` puts fake ``machine``, ``network``, ``ntptime``,
+``machine_i2c_lcd``, ``rotary_irq`` and ``micropython`` modules in
+``sys.modules`` so ``hardware.py`` and ``main.py`` import unchanged, under
+CPython or the MicroPython unix port. Drive the result through the
+returned :class:`sim.board.Board`.
+"""
+
+import sys
+from sim import compat
+
+_MODULES = ("machine", "network", "ntptime", "machine_i2c_lcd", "rotary_irq", "micropython")
+
+
+def _thread_safe_flag(asyncio):
+    # Simulated IRQs fire on the event loop thread, so an Event that clears
+    # itself on wake-up behaves like the firmware's ThreadSafeFlag; a set()
+    # from another thread (networker.py) is handed to the loop.
+    class ThreadSafeFlag:
+        def __init__(self):
+            self._event = asyncio.Event()
+            self._loop = None
+
+        def set(self):
+            loop = self._loop
+            if loop is not None:
+                try:
+                    if asyncio.get_running_loop() is loop:
+                        loop = None
+                except RuntimeError:
+                    pass
+            if loop is None:
+                self._event.set()
+            else:
+                loop.call_soon_threadsafe(self._event.set)
+
+        def clear(self):
+            self._event.clear()
+
+        async def wait(self):
+            self._loop = asyncio.get_running_loop()
+            await self._event.wait()
+            self._event.clear()
+
+    return ThreadSafeFlag
+
+
+def install():
+    compat.install()
+    for name in _MODULES:
+        if name == "micropython" and sys.implementation.name == "micropython":
+            continue
+        sys.modules[name] = __import__("sim." + name, None, None, ["*"])
+    import uasyncio
+    if not hasattr(uasyncio, "ThreadSafeFlag"):
+        uasyncio.ThreadSafeFlag = _thread_safe_flag(uasyncio)
+    from sim.board import BOARD
+    return BOARD
@@ -0,0 +1,96 @@
+# sim/board.py
+"""The simulated Pico W: pins, I2C devices, the encoder and the radio.
+
+A single :data:`BOARD` is shared by the fake ``machine``, ``network`` and
+``rotary_irq`` modules. Scripts drive it with :meth:`Board.press`,
+:meth:`Board.click` and :meth:`Board.turn` and read the panel through
+``BOARD.lcd``. Simulated interrupts run synchronously on the caller's
+thread, so drive the board from the event loop that runs the app.
+"""
+
+import uasyncio as asyncio
+import utime
+from sim.lcd import HD44780
+
+# Pin numbers from hardware.py.
+BUTTON_PINS = (5, 6, 7, 8, 9, 10, 11, 12)
+ENC_CLK = 4
+ENC_DT = 3
+ENC_SW = 2
+LCD_ADDR = 0x27
+
+
+class Board:
+    def __init__(self):
+        self.pins = {}
+        self.lcd = HD44780()
+        self.i2c_devices = {LCD_ADDR: self.lcd}
+        self.encoders = []
+        self.wifi_up = True
+        self.wifi_delay_ms = 0
+        self.sleep_ms = 0          # total requested lightsleep
+        self.max_sleep_ms = 20     # cap on real time spent per lightsleep
+
+    # --- Pins ---
+
+    def pin(self, num):
+        return self.pins.get(num)
+
+    def set_level(self, num, level):
+        pin = self.pins.get(num)
+        if pin is not None:
+            pin.drive(level)
+
+    async def press(self, button, hold_ms=60):
+        """Press and release button 0-7 (pull-down inputs, high when pressed).
+
+        Returns the ticks_us of the release edge, which is when the app can
+        register the press.
+        """
+        num = BUTTON_PINS[button]
+        self.set_level(num, 1)
+        await asyncio.sleep(hold_ms / 1000)
+        self.set_level(num, 0)
+        return utime.ticks_us()
+
+    async def click(self, hold_ms=60):
+        """Click the encoder switch (pull-up, low while pressed)."""
+        self.set_level(ENC_SW, 0)
+        await asyncio.sleep(hold_ms / 1000)
+        self.set_level(ENC_SW, 1)
+        return utime.ticks_us()
+
+    def turn(self, detents):
+        for enc in self.encoders:
+            enc.turn(detents)
+        return utime.ticks_us()
+
+    async def spin(self, detents, rate):
+        """Turn ``detents`` one at a time at ``rate`` detents per second."""
+        step = 1 if detents > 0 else -1
+        for _ in range(abs(detents)):
+            await asyncio.sleep(1 / rate)
+            self.turn(step)
+        return utime.ticks_us()
+
+    # --- Screen ---
+
+    async def wait_for(self, text, since_us=None, timeout_ms=5000):
+        """Wait until ``text`` is on the panel after ``since_us``.
+
+        Returns the microseconds from ``since_us`` to the panel write that
+        made it appear (0 without ``since_us``), or None on timeout.
+        """
+        lcd = self.lcd
+        deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+        while utime.ticks_diff(deadline, utime.ticks_ms()) > 0:
+            if text in lcd.text():
+                if since_us is None:
+                    return 0
+                if utime.ticks_diff(lcd.changed_us, since_us) >= 0:
+                    return utime.ticks_diff(lcd.changed_us, since_us)
+            await asyncio.sleep(0.001)
+        return None
+
+
+BOARD = Board()
@@ -0,0 +1,95 @@
+# sim/compat.py
+"""Let the device modules import under CPython.
+
+The firmware uses MicroPython's ``u``-prefixed module names and ``ticks_*``
+helpers. On the MicroPython unix port :func:`install` does nothing; under
+CPython it registers thin aliases so host tools can import ``api``,
+``httpclient`` and friends unchanged.
+"""
+
+import sys
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+
+class RTC:
+    """The simulated real-time clock behind ``utime.time()``.
+
+    It starts at the host's time and loses :attr:`ppm` millionths of every
+    second that passes from then on (gains if negative), like a crystal off
+    frequency. ``machine.RTC().datetime()`` sets it.
+    """
+
+    def __init__(self):
+        import time
+        self._ppm = 0.0
+        self._at = time.time()
+        self._mono = time.monotonic()
+
+    def now(self):
+        import time
+        return self._at + (time.monotonic() - self._mono) * (1 - self._ppm * 1e-6)
+
+    def set(self, t):
+        import time
+        self._at = t
+        self._mono = time.monotonic()
+
+    @property
+    def ppm(self):
+        return self._ppm
+
+    @ppm.setter
+    def ppm(self, value):
+        self.set(self.now())
+        self._ppm = value
+
+
+rtc = RTC()
+
+
+def _utime():
+    import calendar
+    import time
+    import types
+
+    mod = types.ModuleType("utime")
+    for name in ("time", "localtime", "gmtime", "mktime", "sleep"):
+        setattr(mod, name, getattr(time, name))
+    mod.time = lambda: int(rtc.now() // 1)
+    # The board's RTC holds UTC (ntptime sets it so), and MicroPython's
+    # mktime() has no time zone either.
+    mod.localtime = lambda t=None: time.gmtime(rtc.now() // 1 if t is None else t)
+    mod.gmtime = mod.localtime
+    mod.mktime = lambda t: calendar.timegm(tuple(t))
+    mod.ticks_ms = lambda: int(time.monotonic() * 1000) % _TICKS_PERIOD
+    mod.ticks_us = lambda: int(time.monotonic() * 1000000) % _TICKS_PERIOD
+    mod.ticks_add = lambda t, delta: (t + delta) % _TICKS_PERIOD
+    mod.ticks_diff = lambda a, b: ((a - b + _TICKS_HALF) % _TICKS_PERIOD) - _TICKS_HALF
+    mod.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    mod.sleep_us = lambda us: time.sleep(us / 1000000)
+    return mod
+
+
+def install():
+    if sys.implementation.name == "micropython":
+        return
+    import asyncio
+    import json
+    import os
+    import socket
+    import ssl
+
+    sys.modules.setdefault("ujson", json)
+    sys.modules.setdefault("uos", os)
+    sys.modules.setdefault("usocket", socket)
+    sys.modules.setdefault("ussl", ssl)
+    sys.modules.setdefault("uasyncio", asyncio)
+    utime = _utime()
+    sys.modules.setdefault("utime", utime)
+    # hardware.py imports the ticks helpers from plain ``time``.
+    import time
+    for name in ("ticks_ms", "ticks_us", "ticks_add", "ticks_diff", "sleep_ms", "sleep_us"):
+        if not hasattr(time, name):
+            setattr(time, name, getattr(utime, name))
@@ -0,0 +1,82 @@
+# sim/lcd.py
+"""HD44780 character LCD model fed by the PCF8574 I2C expander bytes."""
+
+import utime
+
+_RS = 0x01
+_E = 0x04
+
+
+class HD44780:
+    def __init__(self, rows=2, cols=16):
+        self.rows = rows
+        self.cols = cols
+        self.ddram = bytearray(b" " * 128)
+        self.cgram = bytearray(64)
+        self.addr = 0
+        self.in_cgram = False
+        self.backlight = True
+        self.version = 0          # bumped on every visible change
+        self.changed_us = 0       # ticks_us of the last visible change
+        self._hi = None
+        self._e = 0
+
+    def expander(self, byte):
+        """Accept one byte written to the expander; data latches on E falling."""
+        self.backlight = bool(byte & 0x08)
+        e = byte & _E
+        if self._e and not e:
+            self._nibble(byte >> 4, byte & _RS)
+        self._e = e
+
+    def _nibble(self, nib, rs):
+        if self._hi is None:
+            self._hi = nib
+            return
+        value = (self._hi << 4) | nib
+        self._hi = None
+        if rs:
+            self._data(value)
+        else:
+            self._command(value)
+
+    def _command(self, cmd):
+        if cmd & 0x80:
+            self.addr = cmd & 0x7F
+            self.in_cgram = False
+        elif cmd & 0x40:
+            self.addr = cmd & 0x3F
+            self.in_cgram = True
+        elif cmd == 0x01:
+            for i in range(len(self.ddram)):
+                self.ddram[i] = 0x20
+            self.addr = 0
+            self.in_cgram = False
+            self._changed()
+        elif cmd in (0x02, 0x03):
+            self.addr = 0
+            self.in_cgram = False
+
+    def _data(self, value):
+        if self.in_cgram:
+            self.cgram[self.addr] = value
+            self.addr = (self.addr + 1) & 0x3F
+        else:
+            self.ddram[self.addr] = value
+            self.addr = (self.addr + 1) & 0x7F
+        self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self.changed_us = utime.ticks_us()
+
+    def line(self, row):
+        start = (0x40 if row & 1 else 0) + (self.cols if row & 2 else 0)
+        raw = self.ddram[start:start + self.cols]
+        return "".join(chr(b) if 32 <= b < 127 else "#" for b in raw)
+
+    def lines(self):
+        return [self.line(r) for r in range(self.rows)]
+
+    def text(self):
+        return "\n".join(self.lines())
@@ -0,0 +1,117 @@
+# sim/machine.py
+"""Simulated ``machine`` module: GPIO with edge IRQs, I2C, the RTC and sleep."""
+
+import utime
+from sim import compat
+from sim.board import BOARD
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, num, mode=IN, pull=None, value=None):
+        self.num = num
+        if value is not None:
+            self._level = value
+        else:
+            self._level = 1 if pull == Pin.PULL_UP else 0
+        self._handler = None
+        self._trigger = 0
+        BOARD.pins[num] = self
+
+    def value(self, v=None):
+        if v is None:
+            return self._level
+        self.drive(v)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False, wake=None):
+        self._handler = handler
+        self._trigger = trigger
+
+    def drive(self, level):
+        """Set the level from outside and fire the IRQ on a matching edge."""
+        level = 1 if level else 0
+        if level == self._level:
+            return
+        self._level = level
+        edge = Pin.IRQ_RISING if level else Pin.IRQ_FALLING
+        if self._handler is not None and self._trigger & edge:
+            self._handler(self)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+
+class I2C:
+    """Routes writes to the simulated devices and counts the traffic."""
+
+    def __init__(self, bus=0, sda=None, scl=None, freq=400000):
+        self.freq = freq
+        self.bytes = 0
+        self.writes = 0
+
+    def writeto(self, addr, buf):
+        self.writes += 1
+        self.bytes += len(buf) + 1  # address byte
+        dev = BOARD.i2c_devices.get(addr)
+        if dev is None:
+            raise OSError(19)  # ENODEV, as on the real bus
+        for b in bytes(buf):
+            dev.expander(b)
+        return len(buf)
+
+    def reset(self):
+        self.bytes = 0
+        self.writes = 0
+
+    def scan(self):
+        return list(BOARD.i2c_devices)
+
+
+class RTC:
+    """Reads and sets :data:`sim.compat.rtc`, the clock of ``utime.time()``."""
+
+    def datetime(self, dt=None):
+        if dt is None:
+            tm = utime.gmtime()
+            return (tm[0], tm[1], tm[2], tm[6], tm[3], tm[4], tm[5], 0)
+        compat.rtc.set(utime.mktime((dt[0], dt[1], dt[2], dt[4], dt[5], dt[6], 0, 0)))
+
+
+def idle():
+    pass
+
+
+def disable_irq():
+    # Simulated interrupts run on the thread that drives the pin.
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+def lightsleep(ms=None):
+    # Account the full request but only really sleep briefly so scripted
+    # input is not held up.
+    if ms is None:
+        ms = BOARD.max_sleep_ms
+    BOARD.sleep_ms += ms
+    utime.sleep_ms(min(ms, BOARD.max_sleep_ms))
+
+
+def deepsleep(ms=None):
+    raise SystemExit("deepsleep")
+
+
+def freq(hz=None):
+    return 125000000
+
+
+def reset():
+    raise SystemExit("reset")
@@ -0,0 +1,83 @@
+# sim/machine_i2c_lcd.py
+"""Byte-for-byte model of python_lcd's ``I2cLcd`` write path.
+
+Every nibble strobe is its own I2C transaction, as in the real driver, so
+traffic counts for code that still goes through the library are exact.
+"""
+
+_RS = 0x01
+_E = 0x04
+_BACKLIGHT = 0x08
+
+
+class I2cLcd:
+    def __init__(self, i2c, i2c_addr, num_lines, num_columns):
+        self.i2c = i2c
+        self.i2c_addr = i2c_addr
+        self.num_lines = num_lines
+        self.num_columns = num_columns
+        self.backlight = True
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self.hal_write_command(0x28)  # 4-bit, two lines
+        self.hal_write_command(0x0C)  # display on, cursor off
+        self.clear()
+
+    def _nibbles(self, byte, rs):
+        flags = rs | (_BACKLIGHT if self.backlight else 0)
+        for nib in ((byte >> 4) & 0x0F, byte & 0x0F):
+            b = flags | (nib << 4)
+            self.i2c.writeto(self.i2c_addr, bytes([b | _E]))
+            self.i2c.writeto(self.i2c_addr, bytes([b]))
+
+    def hal_write_command(self, cmd):
+        self._nibbles(cmd, 0)
+
+    def hal_write_data(self, data):
+        self._nibbles(data, _RS)
+
+    def clear(self):
+        self.hal_write_command(0x01)
+        self.hal_write_command(0x02)
+        self.cursor_x = 0
+        self.cursor_y = 0
+
+    def backlight_on(self):
+        self.backlight = True
+        self.i2c.writeto(self.i2c_addr, bytes([_BACKLIGHT]))
+
+    def backlight_off(self):
+        self.backlight = False
+        self.i2c.writeto(self.i2c_addr, bytes([0]))
+
+    def move_to(self, cursor_x, cursor_y):
+        self.cursor_x = cursor_x
+        self.cursor_y = cursor_y
+        addr = cursor_x & 0x3F
+        if cursor_y & 1:
+            addr += 0x40
+        if cursor_y & 2:
+            addr += self.num_columns
+        self.hal_write_command(0x80 | addr)
+
+    def putchar(self, char):
+        if char == "\n":
+            self.cursor_x = self.num_columns
+        else:
+            self.hal_write_data(ord(char))
+            self.cursor_x += 1
+        if self.cursor_x >= self.num_columns:
+            self.cursor_x = 0
+            self.cursor_y = (self.cursor_y + 1) % self.num_lines
+            self.move_to(self.cursor_x, self.cursor_y)
+
+    def putstr(self, string):
+        for char in string:
+            self.putchar(char)
+
+    def custom_char(self, location, charmap):
+        location &= 0x7
+        self.hal_write_command(0x40 | (location << 3))
+        for i in range(8):
+            self.hal_write_data(charmap[i])
+        self.move_to(self.cursor_x, self.cursor_y)
@@ -0,0 +1,19 @@
+# sim/micropython.py
+"""The bits of the ``micropython`` module the firmware touches."""
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def const(value):
+    return value
+
+
+def schedule(fn, arg):
+    fn(arg)
+    return True
+
+
+def mem_info(*args):
+    pass
@@ -0,0 +1,64 @@
+# sim/network.py
+"""Simulated ``network`` module; the link state comes from the board."""
+
+import utime
+from sim.board import BOARD
+
+STA_IF = 0
+AP_IF = 1
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_GOT_IP = 3
+
+
+class WLAN:
+    PM_NONE = 0x10
+    PM_PERFORMANCE = 0xA11142
+    PM_POWERSAVE = 0xA11C82
+
+    _instances = {}
+
+    def __new__(cls, interface=STA_IF):
+        # Like the firmware, every WLAN(STA_IF) is the same interface.
+        inst = cls._instances.get(interface)
+        if inst is None:
+            inst = super().__new__(cls)
+            inst._active = False
+            inst._ssid = None
+            inst._since = 0
+            inst._config = {"pm": WLAN.PM_PERFORMANCE}
+            cls._instances[interface] = inst
+        return inst
+
+    def __init__(self, interface=STA_IF):
+        pass
+
+    def active(self, state=None):
+        if state is None:
+            return self._active
+        self._active = bool(state)
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        self._ssid = ssid
+        self._since = utime.ticks_ms()
+
+    def disconnect(self):
+        self._ssid = None
+
+    def isconnected(self):
+        return (self._active and self._ssid is not None and BOARD.wifi_up
+                and utime.ticks_diff(utime.ticks_ms(), self._since) >= BOARD.wifi_delay_ms)
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -55
+        return STAT_GOT_IP if self.isconnected() else STAT_CONNECTING
+
+    def ifconfig(self, *args):
+        return ("192.168.1.50", "255.255.255.0", "192.168.1.1", "192.168.1.1")
+
+    def config(self, *args, **kwargs):
+        if kwargs:
+            self._config.update(kwargs)
+            return None
+        return self._config.get(args[0]) if args else None
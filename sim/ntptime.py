@@ -0,0 +1,15 @@
+# sim/ntptime.py
+"""Simulated ``ntptime``: the host clock is the true time."""
+
+host = "pool.ntp.org"
+timeout = 1
+
+
+def time():
+    import time
+    return int(time.time())
+
+
+def settime():
+    from sim import compat
+    compat.rtc.set(time())
@@ -0,0 +1,63 @@
+# sim/rotary_irq.py
+"""Simulated ``RotaryIRQ`` driven by :meth:`sim.board.Board.turn`."""
+
+from sim.board import BOARD
+
+
+class RotaryIRQ:
+    RANGE_UNBOUNDED = 1
+    RANGE_WRAP = 2
+    RANGE_BOUNDED = 3
+
+    def __init__(self, pin_num_clk, pin_num_dt, min_val=0, max_val=10, incr=1,
+                 reverse=False, range_mode=RANGE_UNBOUNDED, pull_up=False,
+                 half_step=False, invert=False):
+        self.min_val = min_val
+        self.max_val = max_val
+        self.incr = incr
+        self.reverse = reverse
+        self.range_mode = range_mode
+        self._value = min_val if range_mode != RotaryIRQ.RANGE_UNBOUNDED else 0
+        self._listeners = []
+        BOARD.encoders.append(self)
+
+    def value(self):
+        return self._value
+
+    def set(self, value=None, min_val=None, max_val=None, incr=None, reverse=None, range_mode=None):
+        if value is not None:
+            self._value = value
+        if min_val is not None:
+            self.min_val = min_val
+        if max_val is not None:
+            self.max_val = max_val
+        if incr is not None:
+            self.incr = incr
+        if range_mode is not None:
+            self.range_mode = range_mode
+
+    def reset(self):
+        self._value = 0
+
+    def close(self):
+        if self in BOARD.encoders:
+            BOARD.encoders.remove(self)
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        self._listeners.remove(fn)
+
+    def turn(self, detents):
+        step = -1 if (detents < 0) != self.reverse else 1
+        for _ in range(abs(detents)):
+            val = self._value + step * self.incr
+            if self.range_mode == RotaryIRQ.RANGE_WRAP:
+                span = self.max_val - self.min_val + 1
+                val = self.min_val + (val - self.min_val) % span
+            elif self.range_mode == RotaryIRQ.RANGE_BOUNDED:
+                val = max(self.min_val, min(self.max_val, val))
+            self._value = val
+            for fn in self._listeners:
+                fn()
@@ -0,0 +1,77 @@
+# snapshot.py
+
+import ujson as json
+import uos as os
+
+
+def _stamp(path):
+    # Size and mtime identify a secrets file without parsing it.
+    try:
+        st = os.stat(path)
+        return [st[6], st[8]]
+    except OSError:
+        return None
+
+
+class Snapshot:
+    """Boot state kept on flash so the UI can come up before the network.
+
+    Holds the parsed config, the children roster, the active child and the
+    running timers. It is rewritten whenever that state changes and read
+    once at boot; the server is reconciled in the background afterwards.
+    """
+
+    def __init__(self, path="snapshot.json", secrets_path="secrets.json"):
+        self.path = path
+        self.secrets_path = secrets_path
+        self.state = {}
+        self._saved = None
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self._saved = f.read()
+            self.state = json.loads(self._saved)
+        except (OSError, ValueError):
+            self.state = {}
+            self._saved = None
+        return self.state
+
+    def config(self):
+        """The config from ``secrets.json``, parsed only if it changed."""
+        stamp = _stamp(self.secrets_path)
+        cached = self.state.get("config")
+        if cached is not None and (stamp is None or stamp == self.state.get("stamp")):
+            return cached
+        with open(self.secrets_path) as f:
+            config = json.load(f)
+        self.state["config"] = config
+        self.state["stamp"] = stamp
+        return config
+
+    # --- Runtime state ---
+
+    def restore(self, api, activities):
+        """Put the saved roster and running timers back in place."""
+        api.children = self.state.get("children", [])
+        index = self.state.get("child", 0)
+        api.child_index = index if index < len(api.children) else 0
+        for name, (timer_id, start) in self.state.get("timers", {}).items():
+            if name in activities.by_name:
+                activities.get(name).begin(timer_id, start)
+
+    def save(self, api, activities):
+        """Write the current state if it differs from what is on flash."""
+        state = self.state
+        state["children"] = api.children
+        state["child"] = api.child_index
+        state["timers"] = {a.name: [a.timer_id, a.start] for a in activities.running()}
+        text = json.dumps(state)
+        if text == self._saved:
+            return False
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.rename(tmp, self.path)
+        self._saved = text
+        return True
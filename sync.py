@@ -0,0 +1,155 @@
+# sync.py
+
+import utime
+from api import TIMER_FIELDS, NOT_MODIFIED
+
+# Poll interval for the running timers (s): MIN after a change or a button
+# press, doubled after every unchanged answer up to MAX.
+SYNC_MIN = 15
+SYNC_MAX = 300
+# Deadline of one poll (s).
+SYNC_TIMEOUT = 5
+# A running timer whose start differs from the server's by at least this
+# much (s) is moved to the server's start.
+ANCHOR_SLACK = 2
+
+
+def parse_time(text):
+    """Epoch seconds (UTC) of an ISO 8601 time as Baby Buddy sends it.
+
+    Accepts ``YYYY-MM-DDTHH:MM:SS`` with optional fractional seconds and a
+    ``Z`` or ``+HH:MM`` offset; no offset is taken as UTC. Returns None if
+    the text does not parse.
+    """
+    try:
+        date, clock = text.split("T")
+        y, mo, d = date.split("-")
+        offset = 0
+        for sign in ("+", "-", "Z"):
+            if sign in clock:
+                clock, tz = clock.split(sign)
+                if tz:
+                    offset = int(tz[0:2]) * 3600 + int(tz[3:5]) * 60
+                    if sign == "-":
+                        offset = -offset
+                break
+        h, mi, s = clock.split(":")
+        t = utime.mktime((int(y), int(mo), int(d), int(h), int(mi), int(s.split(".")[0]), 0, 0))
+    except (ValueError, IndexError):
+        return None
+    return t - offset
+
+
+def format_time(t):
+    """ISO 8601 UTC text of epoch seconds ``t``, as :func:`parse_time` reads it."""
+    tm = utime.gmtime(t)
+    return "%04d-%02d-%02dT%02d:%02d:%02dZ" % tm[:6]
+
+
+class TimerSync:
+    """Keeps the running timers in step with the server.
+
+    :meth:`poll` asks for the active timers with the ETag of the last answer,
+    so an unchanged list costs one header-only 304. A changed list is merged:
+    timers started elsewhere (web app, another device) are adopted for the
+    active child, local timers the server no longer has are ended, and the
+    rest take the server's start, so the device and Baby Buddy count the
+    same elapsed time whatever either clock did in between.
+    """
+
+    def __init__(self, api, activities, journal):
+        self.api = api
+        self.activities = activities
+        self.journal = journal
+        self.etag = None
+        self.child = None       # id of the active child the tagged list was merged for
+        self.interval = SYNC_MIN
+        self.polls = 0
+        self.not_modified = 0
+        self.changes = 0
+
+    def _server_id(self, timer_id):
+        if timer_id < 0:
+            return self.journal.ids.get(timer_id)
+        return timer_id
+
+    async def poll(self):
+        """Fetch and merge the active timers; returns True if anything changed.
+
+        Skipped while journal entries are unsent, since the server is then
+        behind this device rather than ahead of it.
+        """
+        if self.journal.pending:
+            return False
+        child = self._child_id()
+        if child != self.child:
+            # A 304 would hide timers already running for the new child.
+            self.etag = None
+        self.polls += 1
+        timers = await self.api.acollect("timers", {"active": "true"}, TIMER_FIELDS,
+                                         timeout=SYNC_TIMEOUT, etag=self.etag, fresh=True)
+        if timers is None:
+            return False
+        if timers is NOT_MODIFIED:
+            self.not_modified += 1
+            self.interval = min(SYNC_MAX, self.interval * 2)
+            return False
+        if self.journal.pending:
+            # A button was pressed while the request was out; the answer
+            # predates it, so drop it and fetch again next time.
+            self.etag = None
+            return False
+        self.etag = self.api.last_etag
+        self.child = child
+        changed = self.merge(timers)
+        if changed:
+            self.changes += 1
+            self.interval = SYNC_MIN
+        else:
+            self.interval = min(SYNC_MAX, self.interval * 2)
+        return changed
+
+    def merge(self, timers):
+        """Apply the server's list of active timers to the activities."""
+        changed = False
+        live = {t["id"]: t for t in timers}
+        for activity in self.activities.running():
+            timer_id = activity.timer_id
+            server_id = self._server_id(timer_id)
+            if server_id not in live:
+                activity.end()  # finished elsewhere
+                changed = True
+                continue
+            if server_id != timer_id:
+                # The start has been replayed; use the server id from now on.
+                activity.timer_id = server_id
+                self.journal.ids.pop(timer_id, None)
+                self.journal.save_state()
+            start = parse_time(live[server_id].get("start") or "")
+            if start is not None and abs(start - activity.start) >= ANCHOR_SLACK:
+                activity.start = start
+                changed = True
+        child = self.api.active_child()
+        if child is None:
+            return changed
+        for t in timers:
+            if t.get("child") != child["id"] or t.get("end") is not None:
+                continue
+            activity = self.activities.by_name.get(t.get("name"))
+            if activity is None or activity.active:
+                continue
+            start = parse_time(t.get("start") or "")
+            activity.begin(t["id"], start)  # started elsewhere
+            changed = True
+        return changed
+
+    def reset(self):
+        """Poll soon again, e.g. after a button press; after a child switch
+        or a new roster the next poll fetches the whole list."""
+        self.interval = SYNC_MIN
+        if self._child_id() != self.child:
+            self.etag = None
+
+    def _child_id(self):
+        child = self.api.active_child()
+        return None if child is None else child["id"]
@@ -0,0 +1,77 @@
+# tests/conftest.py
+"""The tests run on the host: ``sim`` stands in for the board and
+``tools/mockserver.py`` for Baby Buddy. Run them from the repo root::
+
+    python -m pytest -q
+"""
+
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "tools")]
+
+import sim
+
+BOARD = sim.install()
+
+import pytest
+import uasyncio as asyncio
+import utime
+
+import mockserver
+from sim.board import LCD_ADDR
+from sim.lcd import HD44780
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """An empty working directory for the files the firmware writes."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def server():
+    server = mockserver.serve(port=0)
+    yield server
+    server.shutdown()
+
+
+def write_secrets(url, token=mockserver.TOKEN):
+    with open("secrets.json", "w") as f:
+        json.dump({"wifi": {"ssid": "sim", "password": "sim"},
+                   "api": {"url": url, "token": token, "timeout": 1}}, f)
+
+
+async def booted(timeout_ms=10000):
+    """Wait for the home screen with the server's children on it."""
+    deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+    while "Ready" not in BOARD.lcd.text() or "No Child" in BOARD.lcd.text():
+        if utime.ticks_diff(deadline, utime.ticks_ms()) <= 0:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+def run_app(script):
+    """Run ``main.run()`` on the simulated board while ``await script(app)``
+    drives it; returns what the script returns."""
+    import main
+
+    # A fresh panel, so nothing from an earlier run passes for this one's.
+    BOARD.lcd = BOARD.i2c_devices[LCD_ADDR] = HD44780()
+
+    async def go():
+        app = asyncio.create_task(main.run())
+        try:
+            return await script(app)
+        finally:
+            app.cancel()
+            try:
+                await app
+            except BaseException:
+                pass
+
+    return asyncio.run(go())
@@ -0,0 +1,89 @@
+# tests/test_cache.py
+
+import uasyncio as asyncio
+import utime
+import mockserver
+from api import BabyBuddyAPI, CHILD_FIELDS, NOT_MODIFIED
+from cache import ResponseCache
+
+
+def test_entries_expire_after_their_ttl():
+    cache = ResponseCache(ttls={"children": 0.05})
+    cache.put("children", "c", [1])
+    cache.put("timers", "t", [2])     # not cached at all
+    assert cache.get("c") == [1]
+    assert cache.get("t") is None
+    utime.sleep_ms(60)
+    assert cache.get("c") is None
+    assert cache.stats()["expired"] == 1 and cache.bytes == 0
+
+
+def test_least_recently_used_goes_first():
+    cache = ResponseCache(ttls={"children": 60}, max_entries=2, max_bytes=10)
+    cache.put("children", "a", "a", 4)
+    cache.put("children", "b", "b", 4)
+    cache.get("a")
+    cache.put("children", "c", "c", 4)  # over both bounds: b is the oldest use
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" and cache.get("c") == "c"
+    cache.put("children", "big", "x", 11)  # larger than the whole cache
+    assert cache.get("big") is None and cache.bytes == 8
+
+
+def test_writes_drop_related_answers():
+    cache = ResponseCache()
+    cache.put("timers", "t", [], 2)
+    cache.put("children", "c", [], 2)
+    cache.written("feedings")
+    assert cache.get("t") is None
+    assert cache.get("c") == []
+
+
+def _api(server):
+    url = "http://127.0.0.1:%d/api/" % server.server_address[1]
+    return BabyBuddyAPI(load=False, cache=ResponseCache(),
+                        config={"api": {"url": url, "token": mockserver.TOKEN}})
+
+
+def test_acollect_etag_and_fresh_skip_the_cache(server):
+    api = _api(server)
+    store = server.store
+
+    async def run():
+        first = await api.acollect("children", fields=CHILD_FIELDS)
+        tag = api.last_etag
+        n = store.requests
+        again = await api.acollect("children", fields=CHILD_FIELDS)
+        cached = store.requests - n
+        fresh = await api.acollect("children", fields=CHILD_FIELDS, fresh=True)
+        same = await api.acollect("children", fields=CHILD_FIELDS, etag=tag)
+        with store.lock:
+            store.children.append({"id": 2, "first_name": "Alan", "last_name": "Turing"})
+        stale = await api.acollect("children", fields=CHILD_FIELDS)
+        changed = await api.acollect("children", fields=CHILD_FIELDS, etag=tag)
+        await api.asession.close()
+        return first, tag, again, cached, fresh, same, stale, changed, store.requests - n
+
+    first, tag, again, cached, fresh, same, stale, changed, requests = asyncio.run(run())
+    assert tag and first == [{"id": 1, "first_name": "Ada", "last_name": "Lovelace"}]
+    assert again == first and cached == 0
+    assert fresh == first
+    assert same == NOT_MODIFIED
+    assert stale == first       # still fresh in the cache
+    assert len(changed) == 2 and api.last_etag != tag
+    assert requests == 3
+
+
+def test_post_drops_the_cached_timers(server):
+    api = _api(server)
+    api.children = [{"id": 1}]
+
+    async def run():
+        before = await api.acollect("timers", {"child": 1, "active": True})
+        api.start_timer("feeding")
+        after = await api.acollect("timers", {"child": 1, "active": True})
+        await api.asession.close()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before == [] and len(after) == 1
@@ -0,0 +1,21 @@
+# tests/test_history.py
+
+import history
+from history import History, SENT
+
+
+def test_large_child_id(workdir):
+    log = History()
+    seq = log.add("diaper", 70000, 1000)
+    assert log.mark(seq, SENT)
+    assert History().since("diaper", 70000, 1060) == 60
+
+
+def test_older_layout_starts_a_new_ring(workdir):
+    with open("history.bin", "wb") as f:
+        f.write(b"\xff" * 16 * history.SLOTS)
+    log = History()
+    assert log.seq == 1
+    assert log.since("feeding", 1, 0) == -1
+    with open("history.bin", "rb") as f:
+        assert f.read() == bytes(history.SIZE * history.SLOTS)
@@ -0,0 +1,41 @@
+# tests/test_input.py
+
+import utime
+from conftest import BOARD, booted, run_app, write_secrets
+from sim.board import BUTTON_PINS
+
+DIAPER = 2
+WEIGHT = 4
+
+
+def _url(server):
+    return "http://127.0.0.1:%d/api/" % server.server_address[1]
+
+
+def test_long_press_runs_the_button(workdir, server):
+    write_secrets(_url(server))
+
+    async def script(app):
+        assert await booted()
+        since = utime.ticks_us()
+        await BOARD.press(DIAPER, hold_ms=1000)
+        return await BOARD.wait_for("Wet Solid Both", since, 3000)
+
+    assert run_app(script) is not None
+
+
+def test_chord_runs_both_buttons(workdir, server):
+    write_secrets(_url(server))
+
+    async def script(app):
+        assert await booted()
+        since = utime.ticks_us()
+        BOARD.set_level(BUTTON_PINS[DIAPER], 1)
+        await BOARD.press(WEIGHT, hold_ms=100)
+        BOARD.set_level(BUTTON_PINS[DIAPER], 0)
+        if await BOARD.wait_for("Wet Solid Both", since, 3000) is None:
+            return False
+        since = await BOARD.click()
+        return await BOARD.wait_for("Weight g?", since, 3000) is not None
+
+    assert run_app(script)
@@ -0,0 +1,93 @@
+# tests/test_journal.py
+
+import uasyncio as asyncio
+from journal import Journal
+
+
+class FakeAPI:
+    """Answers posts from a script of ``(result, status)``; once it runs
+    out, every post succeeds with the next server id."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.posts = []
+        self.last_status = None
+        self.next_id = 100
+
+    def post(self, endpoint, data):
+        self.posts.append((endpoint, dict(data)))
+        if self.script:
+            res, self.last_status = self.script.pop(0)
+            return res
+        self.last_status = 201
+        self.next_id += 1
+        return {"id": self.next_id}
+
+    async def apost(self, endpoint, data):
+        return self.post(endpoint, data)
+
+
+def _journal():
+    journal = Journal()
+    journal.settled = []
+    journal.on_settle = lambda tag, accepted: journal.settled.append((tag, accepted))
+    return journal
+
+
+def test_replays_in_order_and_maps_local_timer_ids(workdir):
+    journal = _journal()
+    lid = journal.new_local_id()
+    journal.append("timers", {"child": 1, "name": "feeding"}, lid)
+    journal.append("changes", {"child": 1, "wet": 1}, tag=7)
+    journal.append("feedings", {"timer": lid, "type": "breast milk"}, tag=8)
+    api = FakeAPI()
+    assert journal.replay(api) == 3
+    assert [p[0] for p in api.posts] == ["timers", "changes", "feedings"]
+    assert api.posts[2][1]["timer"] == 101
+    assert journal.settled == [(7, True), (8, True)]
+    assert journal.pending == 0 and journal.ids == {}
+
+
+def test_transient_failure_keeps_the_entry(workdir):
+    journal = _journal()
+    journal.append("weight", {"child": 1, "weight": 3500}, tag=1)
+    journal.append("weight", {"child": 1, "weight": 3510}, tag=2)
+    api = FakeAPI((None, 503))
+    assert journal.replay(api) == 0
+    assert journal.pending == 2 and journal.settled == []
+    # Still there after a reboot, and sent in order.
+    journal = _journal()
+    assert journal.pending == 2
+    assert asyncio.run(journal.areplay(api)) == 2
+    assert [p[1]["weight"] for p in api.posts] == [3500, 3500, 3510]
+    assert journal.settled == [(1, True), (2, True)]
+
+
+def test_rejected_entry_is_dropped(workdir):
+    journal = _journal()
+    journal.append("temperature", {"child": 1, "temperature": 99}, tag=3)
+    journal.append("temperature", {"child": 1, "temperature": 37}, tag=4)
+    assert journal.replay(FakeAPI((None, 400))) == 2
+    assert journal.settled == [(3, False), (4, True)]
+
+
+def test_unknown_timer_settles_its_tag(workdir):
+    journal = _journal()
+    journal.append("feedings", {"timer": -5, "type": "breast milk"}, tag=9)
+    api = FakeAPI()
+    assert journal.replay(api) == 1
+    assert api.posts == []
+    assert journal.settled == [(9, False)]
+
+
+def test_torn_entry_is_skipped(workdir):
+    journal = _journal()
+    journal.append("changes", {"child": 1, "wet": 1}, tag=1)
+    with open("journal.log", "a") as f:
+        f.write('{"ep": "changes", "da')  # power cut mid-write
+    journal = _journal()
+    journal.append("changes", {"child": 1, "solid": 1}, tag=2)
+    api = FakeAPI()
+    assert journal.replay(api) == 3
+    assert [p[1] for p in api.posts] == [{"child": 1, "wet": 1}, {"child": 1, "solid": 1}]
+    assert journal.settled == [(1, True), (2, True)]
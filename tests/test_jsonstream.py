@@ -0,0 +1,51 @@
+# tests/test_jsonstream.py
+
+import ujson as json
+from jsonstream import ResultsParser
+
+PAGE = json.dumps({
+    "count": 3,
+    "next": "http://bb/api/timers/?limit=3&offset=3",
+    "previous": None,
+    "results": [
+        {"id": 1, "name": "feeding", "note": "has \"quotes\", {braces} and [brackets]"},
+        {"id": 2, "name": "sleep", "tags": [{"id": 9}], "end": None},
+        {"id": 3, "name": "say \\\"hi\\\"", "nested": {"results": [1, 2]}},
+    ],
+}).encode()
+
+
+def _parse(chunks, fields=None):
+    parser = ResultsParser(fields)
+    out = []
+    for chunk in chunks:
+        out.extend(parser.feed(chunk))
+    return out, parser.meta
+
+
+def test_whole_page():
+    out, meta = _parse([PAGE])
+    assert out == json.loads(PAGE)["results"]
+    assert meta == {"count": 3, "next": "http://bb/api/timers/?limit=3&offset=3"}
+
+
+def test_every_split_point():
+    expect = json.loads(PAGE)["results"]
+    for i in range(1, len(PAGE)):
+        out, meta = _parse([PAGE[:i], PAGE[i:]])
+        assert out == expect, i
+        assert meta["count"] == 3 and meta["next"].endswith("offset=3"), i
+
+
+def test_byte_at_a_time_with_fields():
+    out, meta = _parse([PAGE[i:i + 1] for i in range(len(PAGE))], fields=("id", "end"))
+    assert out == [{"id": 1}, {"id": 2, "end": None}, {"id": 3}]
+    assert meta["count"] == 3
+
+
+def test_results_before_meta_and_last_page():
+    body = b'{"results": [{"id": 5}], "next": null, "count": 1}'
+    for i in range(1, len(body)):
+        out, meta = _parse([body[:i], body[i:]])
+        assert out == [{"id": 5}], i
+        assert meta == {"count": 1, "next": None}, i
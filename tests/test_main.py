@@ -0,0 +1,77 @@
+# tests/test_main.py
+
+import uasyncio as asyncio
+import utime
+from conftest import BOARD, booted, run_app, write_secrets
+
+FEEDING = 0
+DIAPER = 2
+WEIGHT = 4
+TEMPERATURE = 5
+# Nothing listens here, so every request fails at once.
+NO_SERVER = "http://127.0.0.1:9/api/"
+
+
+async def _message(timeout_ms=3000):
+    # The rows of the next screen other than the home screen, or None.
+    deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+    while utime.ticks_diff(deadline, utime.ticks_ms()) > 0:
+        rows = [row.strip() for row in BOARD.lcd.lines()]
+        if not rows[1].startswith(("Ready", "Offline")):
+            return rows
+        await asyncio.sleep(0.01)
+    return None
+
+
+def test_no_child_before_the_roster(workdir):
+    write_secrets(NO_SERVER)
+
+    async def script(app):
+        assert await BOARD.wait_for("Ready", timeout_ms=10000) is not None
+        assert "No Child" in BOARD.lcd.line(0)
+        seen = []
+        for button in (DIAPER, WEIGHT, TEMPERATURE, FEEDING, DIAPER):
+            await BOARD.press(button)
+            seen.append(await _message())
+            assert await BOARD.wait_for("Ready", timeout_ms=5000) is not None
+        return seen, app.done()
+
+    seen, done = run_app(script)
+    assert seen == [["No Child", ""]] * 5
+    assert not done
+
+
+def test_failing_action_keeps_the_app(workdir, server, monkeypatch):
+    import main
+
+    async def broken(self, _):
+        raise RuntimeError("broken")
+
+    monkeypatch.setattr(main.Runtime, "weight", broken)
+    write_secrets("http://127.0.0.1:%d/api/" % server.server_address[1])
+
+    async def script(app):
+        assert await booted()
+        await BOARD.press(WEIGHT)
+        shown = await _message()
+        assert await BOARD.wait_for("Ready", timeout_ms=5000) is not None
+        since = await BOARD.press(DIAPER)
+        menu = await BOARD.wait_for("Wet Solid Both", since, 3000)
+        return shown, menu, app.done()
+
+    shown, menu, done = run_app(script)
+    assert shown == ["Error", "RuntimeError"]
+    assert menu is not None
+    assert not done
+
+
+def test_refused_roster_backs_off(workdir, server):
+    write_secrets("http://127.0.0.1:%d/api/" % server.server_address[1], token="wrong")
+
+    async def script(app):
+        shown = await BOARD.wait_for("API Conn Error", timeout_ms=5000)
+        await asyncio.sleep(3)
+        return shown
+
+    assert run_app(script) is not None
+    assert server.store.requests <= 4
@@ -0,0 +1,134 @@
+# tools/bench_cache.py
+"""Round trips saved by the response cache, and whether its answers stay right.
+
+Replays a session of ``BabyBuddyAPI`` calls against the stand-in server
+from ``tools/mockserver.py`` (started in-process, so CPython only), once
+without a cache and once with ``cache.ResponseCache``. Every round is what
+the blocking helpers do around a feed: load the children, look up each
+activity's running timer, ``start_feeding`` (which looks the timer up
+again), check it runs, stop it and check it is gone. Then the async
+helpers do the same lookups. Reported per mode: server requests, cache
+hits, misses and invalidations, and whether every answer matched the
+uncached run.
+
+A last check shows how stale a timer started elsewhere can get: the
+timers TTL is set to ``--ttl`` seconds and a timer is added on the server
+behind the client's back::
+
+    python tools/bench_cache.py --rounds 20 --ttl 1
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+from sim import compat
+
+compat.install()
+
+import ujson as json
+import uasyncio as asyncio
+import utime
+
+import mockserver
+from api import BabyBuddyAPI
+from cache import ResponseCache, TTLS
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+CHILDREN = [
+    {"id": 1, "first_name": "Ada", "last_name": "Lovelace"},
+    {"id": 2, "first_name": "Alan", "last_name": "Turing"},
+]
+TIMED = ("feeding", "sleep", "tummy time", "pumping")
+
+
+def _api(url, cache):
+    return BabyBuddyAPI(load=False, cache=cache, config={"api": {"url": url, "token": TOKEN}})
+
+
+def _server():
+    server = mockserver.serve(port=0, store=mockserver.Store(children=[dict(c) for c in CHILDREN]))
+    return server, "http://127.0.0.1:%d/api/" % server.server_address[1]
+
+
+def _id(res):
+    return None if not res else res.get("id")
+
+
+async def _async_rounds(api, rounds, answers):
+    for _ in range(rounds):
+        await api.aload_children()
+        answers.append(len(api.children))
+        for name in TIMED:
+            answers.append(_id(await api.aget_active_timer(name)))
+        answers.append(len((await api.aget("children")) or {}))
+    await api.asession.close()
+
+
+def _session(cache, rounds):
+    server, url = _server()
+    api = _api(url, cache)
+    answers = []
+    try:
+        for _ in range(rounds):
+            api.load_children()
+            answers.append(len(api.children))
+            for name in TIMED:
+                answers.append(_id(api.get_active_timer(name)))
+            timer = api.start_feeding()
+            answers.append(_id(api.get_active_timer("feeding")) == _id(timer))
+            api.stop_feeding(_id(timer), "breast milk", "left breast")
+            answers.append(api.get_active_timer("feeding"))
+        asyncio.run(_async_rounds(api, rounds, answers))
+        requests = server.store.requests
+    finally:
+        server.shutdown()
+    return {"requests": requests, "cache": cache.stats() if cache else None}, answers
+
+
+def _stale(ttl):
+    server, url = _server()
+    api = _api(url, ResponseCache(ttls=dict(TTLS, timers=ttl)))
+    api.load_children()
+    try:
+        api.get_active_timer("sleep")  # now cached: nothing runs
+        with server.store.lock:
+            server.store.timers.append({"id": server.store.new_id(), "child": 1, "name": "sleep",
+                                        "start": "2024-01-01T00:00:00Z", "end": None})
+        t0 = utime.ticks_ms()
+        while api.get_active_timer("sleep") is None:
+            utime.sleep_ms(50)
+        return utime.ticks_diff(utime.ticks_ms(), t0) / 1000
+    finally:
+        server.shutdown()
+
+
+def main():
+    rounds, ttl = 20, 1.0
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--rounds":
+            rounds = int(args.pop(0))
+        elif arg == "--ttl":
+            ttl = float(args.pop(0))
+    off, expect = _session(None, rounds)
+    on, answers = _session(ResponseCache(), rounds)
+    on["same_answers"] = answers == expect
+    stale = _stale(ttl)
+    results = {"rounds": rounds, "uncached": off, "cached": on, "stale_s": stale}
+
+    c = on["cache"]
+    print("%d rounds: %d requests without the cache, %d with it (%d saved)" % (
+        rounds, off["requests"], on["requests"], off["requests"] - on["requests"]))
+    print("cache: %d hits, %d misses, %d expired, %d invalidations, %d evictions, %d B in %d entries"
+          % (c["hits"], c["misses"], c["expired"], c["invalidations"], c["evictions"], c["bytes"],
+             c["entries"]))
+    print("answers match the uncached run:", on["same_answers"])
+    print("timer started elsewhere seen after %.2f s (timers TTL %.1f s)" % (stale, ttl))
+    print(json.dumps(results))
+    if not on["same_answers"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# tools/bench_clock.py
+"""Clock service: event loop stalls, drift tracking and the Date fallback.
+
+Runs ``clock.Clock`` on the simulated board against the SNTP responder of
+``tools/mockserver.py`` (CPython only). The simulated RTC can be set off
+and made to run slow (``sim.compat.rtc``), so three things are measured:
+
+* ``stall`` - the worst event loop lag while a time server does not answer:
+  the old boot path (a blocking exchange like ``ntptime``, 1 s timeout)
+  against ``Clock.sync``
+* ``drift`` - how far the RTC wanders after it was set once, with and
+  without drift correction. The RTC runs ``--ppm`` slow and the baselines
+  are scaled down to seconds so the run stays short
+* ``date`` - with no NTP answer at all, one Baby Buddy request sets an RTC
+  that is a year off from the answer's ``Date`` header
+
+::
+
+    python tools/bench_clock.py --ppm 100000 --seconds 20
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+import sim
+
+sim.install()
+
+import socket
+import struct
+import time
+
+import ujson as json
+import uasyncio as asyncio
+import utime
+import clock
+import mockserver
+from api import BabyBuddyAPI
+from benchutil import probe
+from sim import compat
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+
+
+def _legacy_ntp(port, timeout=1):
+    """What ``ntptime.time()`` does: one blocking exchange."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.settimeout(timeout)
+        query = bytearray(48)
+        query[0] = 0x1B
+        sock.sendto(query, ("127.0.0.1", port))
+        msg = sock.recv(48)
+    except OSError:
+        return None
+    finally:
+        sock.close()
+    return struct.unpack("!I", msg[40:44])[0] - clock.NTP_DELTA
+
+
+def _error():
+    """How far the simulated RTC is from the true time (s)."""
+    return compat.rtc.now() - time.time()
+
+
+async def _stalls(port):
+    out = {}
+    for name in ("old", "new"):
+        stop = asyncio.Event()
+        lags = []
+        prober = asyncio.create_task(probe(stop, lags))
+        await asyncio.sleep(0.1)
+        t0 = utime.ticks_ms()
+        if name == "old":
+            _legacy_ntp(port)
+        else:
+            await clock.Clock("127.0.0.1", port).sync()
+        took = utime.ticks_diff(utime.ticks_ms(), t0)
+        await asyncio.sleep(0.05)
+        stop.set()
+        await prober
+        out[name] = {"took_ms": took, "max_lag_ms": max(lags)}
+    return out
+
+
+async def _drift(port, ppm, seconds):
+    out = {}
+    for name in ("set once", "corrected"):
+        compat.rtc.ppm = 0
+        compat.rtc.set(time.time() - 3600)
+        c = clock.Clock("127.0.0.1", port)
+        await c.sync()
+        compat.rtc.ppm = ppm
+        # Let the RTC fall behind for one scaled baseline, then learn it.
+        await asyncio.sleep(clock.MIN_BASELINE * 1.5)
+        await c.sync()
+        worst = 0
+        task = asyncio.create_task(c.run(asyncio.Event())) if name == "corrected" else None
+        t_end = time.time() + seconds
+        while time.time() < t_end:
+            worst = max(worst, abs(_error()))
+            await asyncio.sleep(0.05)
+        if task is not None:
+            task.cancel()
+        out[name] = {"drift_ppm": c.drift, "steps": c.steps, "worst_error_s": worst,
+                     "error_at_end_s": _error()}
+    compat.rtc.ppm = 0
+    return out
+
+
+async def _date(url, port):
+    compat.rtc.set(time.time() - 365 * 86400)
+    c = clock.Clock("127.0.0.1", port)
+    before = _error()
+    await c.sync()  # nobody answers
+    api = BabyBuddyAPI(load=False, config={"api": {"url": url, "token": TOKEN}}, clock=c)
+    await api.aget("children")
+    return {"error_before_s": before, "ntp_failures": c.failures, "source": c.source,
+            "error_after_s": _error()}
+
+
+def main():
+    ppm, seconds = 100000, 20
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--ppm":
+            ppm = float(args.pop(0))
+        elif arg == "--seconds":
+            seconds = float(args.pop(0))
+    # Hours of drift in seconds of bench.
+    clock.MIN_BASELINE = 5
+    clock.MAX_PPM = 2 * ppm
+    clock.RESYNC = 3600
+    server = mockserver.serve(port=0)
+    url = "http://127.0.0.1:%d/api/" % server.server_address[1]
+    ntp = mockserver.serve_ntp(port=0)
+    mute = mockserver.serve_ntp(port=0, drop_rate=1.0)
+    try:
+        results = {
+            "stall": asyncio.run(_stalls(mute.port)),
+            "drift": asyncio.run(_drift(ntp.port, ppm, seconds)),
+            "date": asyncio.run(_date(url, mute.port)),
+        }
+    finally:
+        server.shutdown()
+        ntp.close()
+        mute.close()
+        compat.rtc.set(time.time())
+
+    print("time server not answering:")
+    for name, r in results["stall"].items():
+        print("  %-4s took %5d ms, worst loop lag %5d ms" % (name, r["took_ms"], r["max_lag_ms"]))
+    print("RTC %d ppm slow, %d s after the drift was learnt:" % (ppm, seconds))
+    for name, r in results["drift"].items():
+        print("  %-9s estimate %s ppm, %d steps, worst error %.3f s, at the end %.3f s" % (
+            name, "-" if r["drift_ppm"] is None else "%.0f" % r["drift_ppm"], r["steps"],
+            r["worst_error_s"], r["error_at_end_s"]))
+    d = results["date"]
+    print("no NTP, RTC off by %.0f s: %d NTP failures, set from %s, now off by %.3f s" % (
+        d["error_before_s"], d["ntp_failures"], d["source"], d["error_after_s"]))
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# tools/bench_cores.py
+"""Journal replay on one core vs. the network worker: throughput and frame time.
+
+Replays ``--entries`` journal posts to the stand-in server while a UI task
+redraws the home screen every ``--frame`` ms on the simulated board, two
+ways:
+
+* ``single`` - ``api.apost`` on the event loop: JSON encoding, the socket
+  and parsing the answer all run on the UI core
+* ``worker`` - ``networker.NetWorker`` sends them from a ``_thread``; the
+  event loop only polls for answers
+
+Throughput is posts per second; frame time is how late each frame woke
+plus its render, the delay a press or a clock tick would see. The server
+runs as a separate process. Under CPython the two threads share one
+interpreter lock, so the worker can only hide waiting, not the JSON work;
+on the Pico W it has a core of its own (and the TLS work goes with it)::
+
+    python tools/bench_cores.py --entries 200 --notes 400
+    micropython tools/bench_cores.py --url http://127.0.0.1:8000/api/
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+import sim
+
+sim.install()
+
+import ujson as json
+import uasyncio as asyncio
+import uos as os
+import utime
+import networker
+from activities import Activities
+from api import BabyBuddyAPI
+from benchutil import quantile
+from hardware import LCDDisplay
+from home import HomeScreen
+from journal import Journal
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+ENDPOINTS = ("changes", "weight", "temperature")
+
+
+def _start_server(latency):
+    """The stand-in in a child process; returns (process, url)."""
+    import socket
+    import subprocess
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    root = (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".")
+    proc = subprocess.Popen([sys.executable, root + "/mockserver.py", "--host", "127.0.0.1",
+                             "--port", str(port), "--latency", str(latency)],
+                            stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.1).close()
+            break
+        except OSError:
+            utime.sleep_ms(50)
+    return proc, "http://127.0.0.1:%d/api/" % port
+
+
+def _fill(journal, entries, notes):
+    text = ("Slept well, ate a lot. " * (notes // 23 + 1))[:notes]
+    for i in range(entries):
+        ep = ENDPOINTS[i % len(ENDPOINTS)]
+        data = {"child": 1, "notes": text}
+        if ep == "changes":
+            data.update(wet=1, solid=0)
+        elif ep == "weight":
+            data["weight"] = 3500 + i
+        else:
+            data["temperature"] = 37
+        journal.append(ep, data)
+
+
+async def _ui(home, frame_ms, stop, frames):
+    now = 1000000
+    while not stop.is_set():
+        t0 = utime.ticks_us()
+        await asyncio.sleep(frame_ms / 1000)
+        t1 = utime.ticks_us()
+        now += 1
+        home.set_clock((now // 3600) % 24, (now // 60) % 60)
+        home.render(now, "AL", True, 0)
+        late = utime.ticks_diff(t1, t0) - frame_ms * 1000
+        frames.append((max(0, late) + utime.ticks_diff(utime.ticks_us(), t1)) / 1000)
+
+
+async def _run(mode, url, work, entries, notes, frame_ms):
+    journal = Journal("%s/journal-%s.log" % (work, mode), "%s/journal-%s.json" % (work, mode))
+    _fill(journal, entries, notes)
+    api = BabyBuddyAPI(load=False, journal=journal, config={"api": {"url": url, "token": TOKEN}})
+    if mode == "worker":
+        api.worker = networker.NetWorker(api)
+        api.worker.start()
+    activities = Activities()
+    activities.get("feeding").begin(1, 1000000 - 3725)
+    home = HomeScreen(LCDDisplay(), activities)
+    stop = asyncio.Event()
+    frames = []
+    ui = asyncio.create_task(_ui(home, frame_ms, stop, frames))
+    await asyncio.sleep(0.2)  # a few idle frames first
+    t0 = utime.ticks_ms()
+    sent = 0
+    while journal.pending:
+        n = await api.areplay(limit=1)
+        if not n:
+            break
+        sent += n
+    ms = utime.ticks_diff(utime.ticks_ms(), t0)
+    stop.set()
+    await ui
+    if api.worker is not None:
+        api.worker.stop()
+    await api.asession.close()
+    return {
+        "mode": mode,
+        "sent": sent,
+        "seconds": ms / 1000,
+        "posts_per_s": sent * 1000 / ms if ms else None,
+        "frames": len(frames),
+        "frame_p50_ms": quantile(frames, 0.5),
+        "frame_p95_ms": quantile(frames, 0.95),
+        "frame_max_ms": max(frames),
+    }
+
+
+def main():
+    url = None
+    entries, notes, frame_ms, latency = 200, 400, 20, 0.0
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--url":
+            url = args.pop(0)
+        elif arg == "--entries":
+            entries = int(args.pop(0))
+        elif arg == "--notes":
+            notes = int(args.pop(0))
+        elif arg == "--frame":
+            frame_ms = int(args.pop(0))
+        elif arg == "--latency":
+            latency = float(args.pop(0))
+    if not networker.available():
+        raise SystemExit("no _thread on this port")
+    proc = None
+    if url is None:
+        proc, url = _start_server(latency)
+    work = "/tmp/bbcores-%d" % utime.ticks_ms()
+    os.mkdir(work)
+    try:
+        results = [asyncio.run(_run(mode, url, work, entries, notes, frame_ms))
+                   for mode in ("single", "worker")]
+    finally:
+        if proc is not None:
+            proc.terminate()
+
+    print("%-7s %6s %8s %8s %8s %8s %8s" % (
+        "mode", "sent", "s", "posts/s", "frames", "p95 ms", "max ms"))
+    for r in results:
+        print("%-7s %6d %8.2f %8.1f %8d %8.2f %8.2f" % (
+            r["mode"], r["sent"], r["seconds"], r["posts_per_s"], r["frames"],
+            r["frame_p95_ms"], r["frame_max_ms"]))
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
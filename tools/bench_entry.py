@@ -0,0 +1,110 @@
+# tools/bench_entry.py
+"""Detents and seconds needed to dial a value into the number entry.
+
+Runs ``numentry.input_number`` (the weight screen: 3500 g, 10 g steps) on
+the simulated board with a scripted user who reads the panel after every
+detent, spins fast while far from the target and slowly once close, and
+clicks when the panel shows it. Two encoder paths are compared:
+
+* ``old`` - ``RotaryEncoder.get()`` clamped to +-1 and no acceleration
+* ``new`` - the true delta and velocity-scaled steps (``ui.ACCEL``)
+
+::
+
+    python tools/bench_entry.py --fast 30 --slow 5
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+import sim
+
+BOARD = sim.install()
+
+import ujson as json
+import uasyncio as asyncio
+import utime
+import ui
+from hardware import LCDDisplay, RotaryEncoder
+from numentry import input_number
+
+TARGETS = (5200, 2800, 3650, 4130, 3500)
+# Give up on a target after this many detents.
+MAX_DETENTS = 400
+
+
+class LegacyEncoder(RotaryEncoder):
+    """RotaryEncoder.get() before it reported the true delta."""
+
+    def get(self):
+        diff = super().get()
+        return (diff > 0) - (diff < 0)
+
+
+def _shown():
+    try:
+        return int(BOARD.lcd.line(1).strip())
+    except ValueError:
+        return None
+
+
+async def _dial(lcd, encoder, target, fast, slow, step=10):
+    entry = asyncio.create_task(input_number(lcd, "Weight g?", encoder, initial=3500,
+                                             step=step, min_val=0, max_val=20000))
+    await asyncio.sleep(ui.POLL * 2)  # the entry screen is up
+    detents = 0
+    t0 = utime.ticks_ms()
+    while detents < MAX_DETENTS:
+        value = _shown()
+        if value == target:
+            break
+        away = target - value
+        # Users spin while the number is far off and slow down near it.
+        rate = fast if abs(away) > 10 * step else slow
+        await BOARD.spin(1 if away > 0 else -1, rate)
+        detents += 1
+        await asyncio.sleep(ui.POLL * 1.5)  # the panel catches up
+    ms = utime.ticks_diff(utime.ticks_ms(), t0)
+    await BOARD.click()
+    result = await entry
+    return {"target": target, "result": result, "detents": detents, "seconds": ms / 1000}
+
+
+async def bench(fast, slow):
+    results = {}
+    saved = ui.ACCEL
+    for name, cls, accel in (("old", LegacyEncoder, ()), ("new", RotaryEncoder, saved)):
+        ui.ACCEL = accel
+        lcd = LCDDisplay()
+        encoder = cls()
+        results[name] = [await _dial(lcd, encoder, t, fast, slow) for t in TARGETS]
+        encoder.encoder.close()
+    ui.ACCEL = saved
+    return results
+
+
+def main():
+    fast, slow = 30, 5
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--fast":
+            fast = float(args.pop(0))
+        elif arg == "--slow":
+            slow = float(args.pop(0))
+    results = asyncio.run(bench(fast, slow))
+    print("%-8s %8s %12s %12s %12s %12s" % (
+        "target", "from", "old detents", "old s", "new detents", "new s"))
+    for old, new in zip(results["old"], results["new"]):
+        print("%-8d %8d %12d %12.1f %12d %12.1f" % (
+            old["target"], 3500, old["detents"], old["seconds"], new["detents"], new["seconds"]))
+    for name in ("old", "new"):
+        rows = results[name]
+        print("%s: %d detents, %.1f s in total, %d/%d reached" % (
+            name, sum(r["detents"] for r in rows), sum(r["seconds"] for r in rows),
+            sum(1 for r in rows if r["result"] == r["target"]), len(rows)))
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
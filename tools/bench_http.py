@@ -0,0 +1,136 @@
+# tools/bench_http.py
+"""Compare per-request latency and heap use of the HTTP paths.
+
+Modes:
+
+* ``urequests`` - the old path, a new socket per call (only if installed)
+* ``oneshot``   - :class:`httpclient.Session` with ``keep_alive=False``,
+  i.e. the same connection pattern as urequests
+* ``keepalive`` - :class:`httpclient.Session` reusing one connection
+
+Under CPython the stand-in server from ``tools/mockserver.py`` is started
+in-process. On the MicroPython unix port pass ``--url`` to a stand-in
+running elsewhere (``python tools/mockserver.py``)::
+
+    micropython tools/bench_http.py --url http://127.0.0.1:8000/api/
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+from sim import compat
+
+compat.install()
+
+import gc
+import ujson as json
+import utime
+import httpclient
+from benchutil import quantile
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+
+
+class Heap:
+    """Bytes allocated by one call: tracemalloc peak or gc.mem_alloc delta."""
+
+    def __init__(self):
+        try:
+            import tracemalloc
+            self.tm = tracemalloc
+        except ImportError:
+            self.tm = None
+
+    def measure(self, fn):
+        gc.collect()
+        if self.tm is not None:
+            self.tm.start()
+            fn()
+            peak = self.tm.get_traced_memory()[1]
+            self.tm.stop()
+            return peak
+        gc.disable()
+        before = gc.mem_alloc()
+        fn()
+        used = gc.mem_alloc() - before
+        gc.enable()
+        return used
+
+
+def run_mode(name, fn, n, heap):
+    fn()  # warm up DNS, imports and the first connection
+    times = []
+    for _ in range(n):
+        t0 = utime.ticks_us()
+        fn()
+        times.append(utime.ticks_diff(utime.ticks_us(), t0))
+    alloc = heap.measure(fn)
+    return {
+        "mode": name,
+        "n": n,
+        "mean_ms": sum(times) / len(times) / 1000,
+        "p50_ms": quantile(times, 0.5) / 1000,
+        "p95_ms": quantile(times, 0.95) / 1000,
+        "heap_bytes": alloc,
+    }
+
+
+def bench(url, n, endpoint="children"):
+    headers = {"Authorization": "Token " + TOKEN, "Content-Type": "application/json"}
+    path = httpclient.split_url(url)[2] + endpoint + "/"
+    full = url + endpoint + "/"
+    heap = Heap()
+    results = []
+
+    try:
+        import urequests
+
+        def old():
+            r = urequests.get(full, headers=headers)
+            r.json()
+            r.close()
+        results.append(run_mode("urequests", old, n, heap))
+    except ImportError:
+        pass
+
+    for name, keep_alive in (("oneshot", False), ("keepalive", True)):
+        session = httpclient.Session(url, keep_alive=keep_alive)
+
+        def call():
+            session.request("GET", path, headers).json()
+        res = run_mode(name, call, n, heap)
+        res["connects"] = session.connects
+        session.close()
+        results.append(res)
+    return results
+
+
+def main():
+    url = None
+    n = 200
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--url":
+            url = args.pop(0)
+        elif arg == "-n":
+            n = int(args.pop(0))
+    server = None
+    if url is None:
+        import mockserver
+        server = mockserver.serve(port=0)
+        url = "http://127.0.0.1:%d/api/" % server.server_address[1]
+    try:
+        results = bench(url, n)
+    finally:
+        if server is not None:
+            server.shutdown()
+    print("%-10s %6s %9s %9s %9s %9s %10s" % ("mode", "n", "mean ms", "p50 ms", "p95 ms", "connects", "heap B"))
+    for r in results:
+        print("%-10s %6d %9.2f %9.2f %9.2f %9s %10d" % (
+            r["mode"], r["n"], r["mean_ms"], r["p50_ms"], r["p95_ms"], r.get("connects", "-"), r["heap_bytes"]))
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# tools/bench_input.py
+"""Input event bus: gesture classification and event loop stalls.
+
+Runs ``inputbus.InputBus`` on the simulated board with a consumer task that
+does what ``Runtime.input_task`` does, and measures two things:
+
+* ``gestures`` - scripted contact patterns (clean clicks, bouncing
+  contacts, a glitch, holds, double clicks, a chord, a fast spin) and the
+  events they produce, against the events expected
+* ``stall`` - the worst event loop lag while the encoder is held for
+  ``--hold`` ms: the old home screen path (the blocking
+  ``RotaryEncoder.button_pressed`` polled every 20 ms, which spins until
+  the release) against the bus.
+  The old path blocks the loop, so its release is driven from a thread
+
+On the MicroPython unix port the bytes the interrupt handlers allocate are
+counted too (they should be 0)::
+
+    python tools/bench_input.py --hold 1500
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+import sim
+
+BOARD = sim.install()
+
+import gc
+import ujson as json
+import uasyncio as asyncio
+import utime
+import inputbus
+from benchutil import probe, quantile
+from hardware import ButtonArray, RotaryEncoder
+from inputbus import InputBus, KINDS, ENCODER
+from sim.board import BUTTON_PINS, ENC_SW
+
+# Quiet time between cases, longer than the double-click window (ms).
+GAP_MS = 600
+
+# (name, script, events expected). A script step is (source, level, ms to
+# wait after it); levels are 1 for closed. ("turn", n) turns the knob.
+CASES = (
+    ("click", ((0, 1, 80), (0, 0, 0)), ("press 0", "release 0")),
+    ("bouncing click", ((0, 1, 2), (0, 0, 1), (0, 1, 2), (0, 0, 1), (0, 1, 100),
+                        (0, 0, 2), (0, 1, 1), (0, 0, 0)), ("press 0", "release 0")),
+    ("glitch", ((3, 1, 10), (3, 0, 0)), ()),
+    ("encoder hold", ((ENCODER, 1, 1000), (ENCODER, 0, 0)),
+     ("press 8", "long 8", "release 8")),
+    ("double click", ((ENCODER, 1, 60), (ENCODER, 0, 150), (ENCODER, 1, 60), (ENCODER, 0, 0)),
+     ("press 8", "release 8", "press 8", "release 8", "double 8")),
+    ("slow double", ((ENCODER, 1, 60), (ENCODER, 0, 500), (ENCODER, 1, 60), (ENCODER, 0, 0)),
+     ("press 8", "release 8", "press 8", "release 8")),
+    ("chord 1+8", ((0, 1, 50), (7, 1, 100), (7, 0, 20), (0, 0, 0)),
+     ("press 0", "press 7", "chord 129", "release 7", "release 0")),
+    ("spin", (("turn", 5),), ("turn 8",)),
+)
+
+
+def _set(source, level):
+    if source == ENCODER:
+        BOARD.set_level(ENC_SW, 1 - level)  # pull-up: low while pressed
+    else:
+        BOARD.set_level(BUTTON_PINS[source], level)
+
+
+def _name(event):
+    kind, source, _, value = event
+    return "%s %d" % (KINDS[kind], source)
+
+
+async def _consume(bus, events, delays):
+    while True:
+        bus.poll()
+        event = bus.get()
+        while event is not None:
+            events.append(event)
+            if event[0] == inputbus.RELEASE:
+                delays.append(utime.ticks_diff(utime.ticks_ms(), event[2]))
+            event = bus.get()
+        await bus.wait(bus.next_ms())
+
+
+async def _gestures():
+    bus = InputBus(ButtonArray(), RotaryEncoder())
+    events = []
+    delays = []
+    task = asyncio.create_task(_consume(bus, events, delays))
+    out = []
+    for name, script, expect in CASES:
+        del events[:]
+        for step in script:
+            if step[0] == "turn":
+                BOARD.turn(step[1])
+                continue
+            source, level, ms = step
+            _set(source, level)
+            if ms:
+                await asyncio.sleep(ms / 1000)
+        await asyncio.sleep(GAP_MS / 1000)
+        got = tuple(_name(e) for e in events)
+        turned = [e[3] for e in events if e[0] == inputbus.TURN]
+        out.append({"case": name, "ok": got == expect, "events": got,
+                    "detents": sum(turned) if turned else None})
+    task.cancel()
+    return out, delays, bus
+
+
+def _alloc(bus):
+    """Bytes allocated per interrupt handler call, or None on CPython."""
+    if not hasattr(gc, "mem_alloc"):
+        return None
+    pin = BOARD.pin(BUTTON_PINS[0])
+    gc.collect()
+    before = gc.mem_alloc()
+    for _ in range(8):
+        bus._edge(0, 1)
+        bus._switch(pin)
+    used = gc.mem_alloc() - before
+    bus.poll()
+    while bus.get() is not None:
+        pass
+    return used // 16
+
+
+async def _old_home(encoder, seen):
+    # main.py's home screen check before the bus, with the blocking
+    # RotaryEncoder.button_pressed it called.
+    button = encoder.button
+    while True:
+        if button.value() == 0:
+            while button.value() == 0:
+                utime.sleep_ms(10)
+            utime.sleep_ms(30)
+            seen.append(utime.ticks_ms())
+        await asyncio.sleep(0.02)
+
+
+async def _new_home(bus, seen):
+    while True:
+        bus.poll()
+        event = bus.get()
+        while event is not None:
+            if event[0] == inputbus.RELEASE and event[1] == ENCODER:
+                seen.append(utime.ticks_ms())
+            event = bus.get()
+        await bus.wait(bus.next_ms())
+
+
+async def _stall(mode, hold_ms):
+    import _thread
+    encoder = RotaryEncoder()
+    if mode == "old":
+        task = asyncio.create_task(_old_home(encoder, []))
+    else:
+        task = asyncio.create_task(_new_home(InputBus(ButtonArray(), encoder), []))
+    stop = asyncio.Event()
+    lags = []
+    prober = asyncio.create_task(probe(stop, lags))
+    await asyncio.sleep(0.1)
+
+    def release():
+        utime.sleep_ms(hold_ms)
+        _set(ENCODER, 0)
+
+    _set(ENCODER, 1)
+    _thread.start_new_thread(release, ())
+    await asyncio.sleep(hold_ms / 1000 + 0.2)
+    stop.set()
+    await prober
+    task.cancel()
+    return {"max_lag_ms": max(lags), "p50_lag_ms": quantile(lags, 0.5)}
+
+
+async def bench(hold_ms):
+    gestures, delays, bus = await _gestures()
+    stall = {mode: await _stall(mode, hold_ms) for mode in ("old", "new")}
+    return {"gestures": gestures, "release_delay_ms": max(delays) if delays else None,
+            "alloc_per_irq": _alloc(bus), "overflows": bus.overflows, "dropped": bus.dropped,
+            "stall": stall}
+
+
+def main():
+    hold_ms = 1500
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--hold":
+            hold_ms = int(args.pop(0))
+    r = asyncio.run(bench(hold_ms))
+    for g in r["gestures"]:
+        print("%-15s %-4s %s" % (g["case"], "ok" if g["ok"] else "FAIL", ", ".join(g["events"])))
+    print("release to event: at most %s ms; %s B allocated per interrupt; %d edges and %d events lost"
+          % (r["release_delay_ms"], r["alloc_per_irq"], r["overflows"], r["dropped"]))
+    print("encoder held %d ms:" % hold_ms)
+    for mode, s in r["stall"].items():
+        print("  %-3s worst loop lag %5d ms, median %3d ms" % (mode, s["max_lag_ms"], s["p50_lag_ms"]))
+    print(json.dumps(r))
+    if not all(g["ok"] for g in r["gestures"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
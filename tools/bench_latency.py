@@ -0,0 +1,223 @@
+# tools/bench_latency.py
+"""End-to-end press-to-ack latency of every button action.
+
+Runs the unmodified ``main.run()`` on the simulated board from ``sim/``
+and scripts the buttons and the encoder like a user would. Each step is
+timed from the release edge (when ``ButtonArray`` accepts a press, or
+when the encoder click is seen) to the LCD write that puts the expected
+text on the panel. Entries are posted to the stand-in server from
+``tools/mockserver.py``, started in-process under CPython; on the
+MicroPython unix port pass ``--url`` to one running elsewhere::
+
+    python tools/bench_latency.py -n 5 --latency 0.05
+    micropython tools/bench_latency.py --url http://127.0.0.1:8000/api/
+
+Options: ``-n`` repeats per action, ``--latency`` seconds of server delay,
+``--fail-rate``/``--drop-rate`` failure injection (in-process server only).
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+import sim
+
+BOARD = sim.install()
+
+import ujson as json
+import uos as os
+import utime
+import uasyncio as asyncio
+from benchutil import quantile
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+# Time to wait for each expected screen before counting the step as lost.
+STEP_TIMEOUT_MS = 5000
+
+# (name, steps); a step is (action, argument, text expected on the LCD).
+# Actions: "press" button 0-7, "click" the encoder, "turn" it n detents.
+ACTIONS = (
+    ("feed start", (("press", 0, "Feed 00:0"),)),
+    ("feed stop", (("press", 0, "Feed Type?"),
+                   ("click", None, "Feed Method?"),
+                   ("click", None, "Logged!"))),
+    ("sleep start", (("press", 1, "Sleep 00:0"),)),
+    ("sleep stop", (("press", 1, "Sleep Logged"),)),
+    ("diaper", (("press", 2, "Wet Solid Both"),
+                ("turn", 1, "    ^"),
+                ("click", None, "Diaper Logged"))),
+    ("tummy start", (("press", 3, "Tummy 00:0"),)),
+    ("tummy stop", (("press", 3, "Tummy Logged"),)),
+    ("weight", (("press", 4, "Weight g?"),
+                ("turn", 1, "3510"),
+                ("click", None, "Weight Logged"))),
+    ("temp", (("press", 5, "Temp C?"),
+              ("click", None, "Temp Logged"))),
+    ("pump start", (("press", 6, "Pump 00:0"),)),
+    ("pump stop", (("press", 6, "Pump Logged"),)),
+    ("child", (("press", 7, "Active Child"),)),
+)
+# Entries one pass of ACTIONS leaves on the server.
+EXPECTED = {"feedings": 1, "sleep": 1, "tummy-times": 1, "pumping": 1,
+            "changes": 1, "weight": 1, "temperature": 1}
+
+
+def _home():
+    line = BOARD.lcd.line(1)
+    return line.startswith(("Ready", "Offline", "Feed ", "Sleep ", "Tummy ", "Pump "))
+
+
+async def _wait_home(timeout_ms=10000):
+    # Confirmation screens stay up for a second or two; start the next
+    # action from the home screen like a user reading the panel would.
+    deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+    while not _home():
+        if utime.ticks_diff(deadline, utime.ticks_ms()) <= 0:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def _step(action, arg, expect):
+    if action == "press":
+        since = await BOARD.press(arg)
+    elif action == "click":
+        since = await BOARD.click()
+    else:
+        since = BOARD.turn(arg)
+    return await BOARD.wait_for(expect, since, STEP_TIMEOUT_MS)
+
+
+async def _script(repeats, results):
+    if await BOARD.wait_for("Ready", timeout_ms=30000) is None:
+        raise RuntimeError("no home screen: " + repr(BOARD.lcd.lines()))
+    for _ in range(repeats):
+        for name, steps in ACTIONS:
+            await _wait_home()
+            times = []
+            for action, arg, expect in steps:
+                us = await _step(action, arg, expect)
+                if us is None:
+                    print("lost:", name, expect, BOARD.lcd.lines())
+                    break
+                times.append(us)
+            results.setdefault(name, []).append(times)
+
+
+async def _drain(timeout_ms=30000):
+    # The journal has emptied once the home screen stops counting entries.
+    await _wait_home()
+    deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+    while "queued" in BOARD.lcd.line(1):
+        if utime.ticks_diff(deadline, utime.ticks_ms()) <= 0:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def bench(repeats):
+    import main
+
+    app = asyncio.create_task(main.run())
+    results = {}
+    try:
+        await _script(repeats, results)
+        drained = await _drain()
+    finally:
+        app.cancel()
+        try:
+            await app
+        except BaseException:
+            pass
+    return results, drained
+
+
+def _write_secrets(url, ntp_port=None):
+    config = {"wifi": {"ssid": "sim", "password": "sim"},
+              "api": {"url": url, "token": TOKEN}}
+    if ntp_port is not None:
+        config["ntp"] = {"host": "127.0.0.1", "port": ntp_port}
+    with open("secrets.json", "w") as f:
+        json.dump(config, f)
+
+
+def _summary(results):
+    rows = []
+    for name, _ in ACTIONS:
+        runs = results.get(name, [])
+        ok = [r for r in runs if len(r) == len(dict(ACTIONS)[name])]
+        ack = sorted(r[0] for r in runs if r)
+        done = [r[-1] for r in ok]
+        row = {"action": name, "runs": len(runs), "lost": len(runs) - len(ok)}
+        if ack:
+            row["ack_min_ms"] = ack[0] / 1000
+            row["ack_p50_ms"] = quantile(ack, 0.5) / 1000
+            row["ack_max_ms"] = ack[-1] / 1000
+        if done:
+            row["done_p50_ms"] = quantile(done, 0.5) / 1000
+        rows.append(row)
+    return rows
+
+
+def main():
+    url = None
+    repeats = 3
+    latency = fail_rate = drop_rate = 0.0
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--url":
+            url = args.pop(0)
+        elif arg == "-n":
+            repeats = int(args.pop(0))
+        elif arg == "--latency":
+            latency = float(args.pop(0))
+        elif arg == "--fail-rate":
+            fail_rate = float(args.pop(0))
+        elif arg == "--drop-rate":
+            drop_rate = float(args.pop(0))
+
+    server = None
+    ntp_port = None
+    if url is None:
+        import mockserver
+        server = mockserver.serve(port=0, latency=latency, fail_rate=fail_rate, drop_rate=drop_rate)
+        url = "http://127.0.0.1:%d/api/" % server.server_address[1]
+        ntp_port = mockserver.serve_ntp(port=0).port
+
+    # main.py reads and writes its files in the working directory, so pin
+    # the repo path before leaving it.
+    root = os.getcwd()
+    if not sys.path[0].startswith("/"):
+        sys.path[0] = root + "/" + sys.path[0]
+    work = "/tmp/bbsim-%d" % utime.ticks_ms()
+    os.mkdir(work)
+    os.chdir(work)
+    try:
+        _write_secrets(url, ntp_port)
+        results, drained = asyncio.run(bench(repeats))
+    finally:
+        os.chdir(root)
+        if server is not None:
+            server.shutdown()
+
+    rows = _summary(results)
+    print("%-12s %5s %5s %9s %9s %9s %10s" % (
+        "action", "runs", "lost", "ack min", "ack p50", "ack max", "final p50"))
+    for r in rows:
+        print("%-12s %5d %5d %9.1f %9.1f %9.1f %10.1f" % (
+            r["action"], r["runs"], r["lost"], r.get("ack_min_ms", 0), r.get("ack_p50_ms", 0),
+            r.get("ack_max_ms", 0), r.get("done_p50_ms", 0)))
+    print("journal drained:", drained)
+    if server is not None:
+        store = server.store
+        counts = {ep: len(store.entries[ep]) for ep in EXPECTED}
+        short = [ep for ep in EXPECTED if counts[ep] < EXPECTED[ep] * repeats]
+        print("server entries:", counts, "requests:", store.requests,
+              "connections:", store.connections, "failures:", store.failures)
+        if short:
+            print("missing entries:", short)
+    print(json.dumps(rows))
+
+
+if __name__ == "__main__":
+    main()
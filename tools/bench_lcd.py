@@ -0,0 +1,122 @@
+# tools/bench_lcd.py
+"""Count I2C traffic per LCD frame for the old and the framebuffer display.
+
+The legacy path is the pre-framebuffer ``LCDDisplay.show``: blank the row,
+rewrite it through ``I2cLcd.putstr``, one I2C transaction per nibble
+strobe. The new path is ``hardware.LCDDisplay``. Both run against the
+counting I2C bus of the simulated board, so the numbers are exact for the
+byte stream; bus time assumes 100 kHz with 9 bits per byte plus start/stop per transaction.
+The last table walks a twelve-entry ``ui.Menu`` one detent at a time and
+compares it with the old one-option-per-screen list on the legacy display.
+
+    python tools/bench_lcd.py
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+import sim
+
+sim.install()
+
+from machine import I2C
+from machine_i2c_lcd import I2cLcd
+
+
+class LegacyDisplay:
+    """The LCDDisplay show path before the framebuffer."""
+
+    def __init__(self, i2c, rows=2, cols=16):
+        self.lcd = I2cLcd(i2c, 0x27, rows, cols)
+        self.rows = rows
+        self.cols = cols
+        self._lines = ["", ""]
+
+    def show(self, line1, line2=""):
+        lines = [line1[:self.cols], line2[:self.cols]]
+        for row in range(min(self.rows, 2)):
+            if self._lines[row] != lines[row]:
+                self.show_line(row, lines[row])
+
+    def show_line(self, row, text):
+        self.lcd.move_to(0, row)
+        self.lcd.putstr(" " * self.cols)
+        self.lcd.move_to(0, row)
+        self.lcd.putstr(text[:self.cols])
+        self._lines[row] = text[:self.cols]
+
+
+def _arrow(pos):
+    return " " * pos + "^" + " " * (15 - pos)
+
+
+SCENARIOS = {
+    "clock tick": [("AL   12:%02d" % m, "Ready") for m in range(30, 50)],
+    "timer tick": [("AL   12:%02d" % m, "Feed 00:%02d" % m) for m in range(30, 50)],
+    "arrow move": [("Wet Solid Both", _arrow(p)) for p in (0, 4, 10, 4) * 5],
+    "list scroll": [("Feed Type?", o) for o in
+                    ("breast milk", "formula", "fortified milk", "other") * 5],
+    "number spin": [("Weight g?", str(v)) for v in range(3500, 3700, 10)],
+    "full change": [("AL   12:30", "Ready"), ("Logged!", "breast milk/both")] * 10,
+}
+
+
+def measure(display, bus, frames):
+    display.show(*frames[0])
+    bus.reset()
+    for frame in frames[1:]:
+        display.show(*frame)
+    n = len(frames) - 1
+    return bus.bytes / n, bus.writes / n
+
+
+def bus_ms(nbytes, writes, freq=100000):
+    return (nbytes * 9 + writes * 2) * 1000 / freq
+
+
+MENU_OPTIONS = ["Child %d" % i for i in range(1, 13)]
+MENU_WALK = [1] * 14 + [-1] * 14
+
+
+def measure_menu():
+    from hardware import LCDDisplay
+    from ui import Menu
+
+    old_bus = I2C(0)
+    old = LegacyDisplay(old_bus)
+    idx = 0
+    old.show("Child?", MENU_OPTIONS[idx])
+    old_bus.reset()
+    for d in MENU_WALK:
+        idx = (idx + d) % len(MENU_OPTIONS)
+        old.show("Child?", MENU_OPTIONS[idx])
+    new_disp = LCDDisplay()
+    menu = Menu(new_disp, MENU_OPTIONS)
+    menu.draw()
+    new_disp.i2c.reset()
+    for d in MENU_WALK:
+        menu.move(d)
+    n = len(MENU_WALK)
+    return ((old_bus.bytes / n, old_bus.writes / n),
+            (new_disp.i2c.bytes / n, new_disp.i2c.writes / n))
+
+
+def main():
+    from hardware import LCDDisplay
+
+    print("%-12s %12s %12s %10s %12s %12s %10s" % (
+        "scenario", "old B/frame", "old xfers", "old ms", "new B/frame", "new xfers", "new ms"))
+    for name, frames in SCENARIOS.items():
+        old_bus = I2C(0)
+        old = measure(LegacyDisplay(old_bus), old_bus, frames)
+        new_disp = LCDDisplay()
+        new = measure(new_disp, new_disp.i2c, frames)
+        print("%-12s %12.1f %12.1f %10.2f %12.1f %12.1f %10.2f" % (
+            name, old[0], old[1], bus_ms(*old), new[0], new[1], bus_ms(*new)))
+    old, new = measure_menu()
+    print("%-12s %12.1f %12.1f %10.2f %12.1f %12.1f %10.2f" % (
+        "menu detent", old[0], old[1], bus_ms(*old), new[0], new[1], bus_ms(*new)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+# tools/bench_mqtt.py
+"""Journal posts over REST against posts over MQTT and the bridge.
+
+Logs the same script of events (timer starts and stops, diapers, weights,
+temperatures) through ``BabyBuddyAPI`` with a journal, replaying each one
+as ``Runtime.network_task`` does, in three ways:
+
+* ``rest``        - ``RestTransport`` on one keep-alive connection
+* ``rest sparse`` - the same, reconnecting for every event, as when events
+  are further apart than ``httpclient.MAX_IDLE``
+* ``mqtt``        - ``MqttTransport`` through ``tools/mockbroker.py`` and
+  ``tools/bridge.py`` (its connection stays up however far apart events
+  are)
+
+Everything runs in-process (CPython only) against the stand-in server from
+``tools/mockserver.py``. The device's side of the link is a relay that
+holds every chunk for half of ``--rtt`` ms (a new connection's first one
+for a round trip more, for the handshake), counts what crosses it and,
+with ``--cut``, drops that fraction of connections right after passing a
+request on, before its answer. Reported per mode: latency from logging an
+event to its journal entry settling, radio-on time (time spent in
+``areplay``; the radio sleeps between retries), bytes each way per event,
+connections, an estimate of what goes on air, and whether the server ended
+up with every entry exactly once::
+
+    python tools/bench_mqtt.py --cycles 5 --rtt 40 --latency 0.15 --cut 0.1
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+from sim import compat
+
+compat.install()
+
+import random
+import socket
+import threading
+import time
+
+import ujson as json
+import uasyncio as asyncio
+import uos as os
+import utime
+
+import bridge
+import mockbroker
+import mockserver
+from api import BabyBuddyAPI
+from benchutil import quantile
+from journal import Journal
+from mqttclient import AsyncClient
+from transport import MqttTransport
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+CHILD = {"id": 1, "first_name": "Ada", "last_name": "Lovelace"}
+DEVICE = "pad1"
+# One cycle of events, and the entries each leaves on the server.
+SCRIPT = ("start feeding", "diaper", "stop feeding", "weight", "start sleep", "stop sleep",
+          "temperature")
+EXPECT = {"feedings": 1, "sleep": 1, "changes": 1, "weight": 1, "temperature": 1}
+# Device request timeout (s), and the wait before replaying a failed entry.
+TIMEOUT = 2
+RETRY = 0.2
+# Give up on an event that has not settled after this long (ms).
+DRAIN_MS = 30000
+# On-air estimate: IP, TCP and 802.11 framing per packet (B); every chunk
+# counts as one packet plus its ACK, every connection as 7 more (handshake
+# and close).
+PER_PACKET = 60
+PER_CONNECTION = 7
+
+
+class Relay:
+    """TCP relay standing for the device's radio link to ``port``."""
+
+    def __init__(self, port, rtt_ms=0, cut=0.0, seed=1):
+        self.target = port
+        self.delay = rtt_ms / 2000
+        self.cut = cut
+        self.random = random.Random(seed)
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(8)
+        self.port = self.sock.getsockname()[1]
+        self.up = 0             # bytes from the device
+        self.down = 0
+        self.chunks = 0
+        self.connections = 0
+        self.cuts = 0
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                device, _ = self.sock.accept()
+            except OSError:
+                return
+            far = socket.create_connection(("127.0.0.1", self.target))
+            for s in (device, far):
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections += 1
+            pair = (device, far)
+            threading.Thread(target=self._pipe, args=(device, far, True, pair), daemon=True).start()
+            threading.Thread(target=self._pipe, args=(far, device, False, pair), daemon=True).start()
+
+    def _pipe(self, src, dst, up, pair):
+        handshake = 2 * self.delay if up else 0
+        try:
+            while True:
+                data = src.recv(4096)
+                if not data:
+                    break
+                time.sleep(self.delay + handshake)
+                handshake = 0
+                dst.sendall(data)
+                self.chunks += 1
+                if up:
+                    self.up += len(data)
+                else:
+                    self.down += len(data)
+                if up and self.cut and self.random.random() < self.cut:
+                    self.cuts += 1
+                    break  # passed on, but the answer never makes it back
+        except OSError:
+            pass
+        for s in pair:
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self.sock.close()
+
+
+def _log(api, step, timers, i):
+    if step == "start feeding":
+        timers["feeding"] = api.start_timer("feeding")["id"]
+    elif step == "stop feeding":
+        api.finish_timer("feeding", timers.pop("feeding"), {"type": "breast milk", "method": "left breast"})
+    elif step == "start sleep":
+        timers["sleep"] = api.start_timer("sleep")["id"]
+    elif step == "stop sleep":
+        api.finish_timer("sleep", timers.pop("sleep"))
+    elif step == "diaper":
+        api.log_diaper_change(wet=True, solid=i % 2 == 0)
+    elif step == "weight":
+        api.log_weight(3500 + i)
+    else:
+        api.log_temperature(36.8)
+
+
+async def _device(api, journal, events, gap):
+    timers = {}
+    latencies = []
+    radio = 0
+    lost = 0
+    for i in range(events):
+        _log(api, SCRIPT[i % len(SCRIPT)], timers, i)
+        t0 = utime.ticks_ms()
+        while journal.pending:
+            t1 = utime.ticks_ms()
+            sent = await api.areplay(limit=1)
+            radio += utime.ticks_diff(utime.ticks_ms(), t1)
+            if sent:
+                continue
+            if utime.ticks_diff(utime.ticks_ms(), t0) > DRAIN_MS:
+                lost += 1
+                break
+            await asyncio.sleep(RETRY)
+        latencies.append(utime.ticks_diff(utime.ticks_ms(), t0))
+        await asyncio.sleep(gap)
+    return latencies, radio, lost
+
+
+def _count(store):
+    with store.lock:
+        return {ep: len(store.entries[ep]) for ep in EXPECT}, len(store.timers)
+
+
+async def _settled(store, cycles, ms):
+    # Entries settled on PUBACK may still be on their way through the bridge.
+    t0 = utime.ticks_ms()
+    while utime.ticks_diff(utime.ticks_ms(), t0) < ms:
+        counts, _ = _count(store)
+        if all(counts[ep] >= n * cycles for ep, n in EXPECT.items()):
+            return
+        await asyncio.sleep(0.05)
+
+
+async def run(mode, cycles, gap, rtt, latency, cut, work):
+    server = mockserver.serve(port=0, latency=latency, store=mockserver.Store(children=[dict(CHILD)]))
+    server_port = server.server_address[1]
+    broker = relay = side = thread = None
+    try:
+        journal = Journal("%s/journal-%s.log" % (work, mode), "%s/journal-%s.json" % (work, mode))
+        if mode == "mqtt":
+            broker = mockbroker.serve_broker(port=0)
+            side = bridge.make_bridge("127.0.0.1:%d" % broker.port,
+                                      "http://127.0.0.1:%d/api/" % server_port)
+            thread = threading.Thread(target=asyncio.run, args=(side.run(),), daemon=True)
+            thread.start()
+            while not side.client.connected():
+                await asyncio.sleep(0.02)
+            relay = Relay(broker.port, rtt, cut)
+            url = "http://127.0.0.1:%d/api/" % server_port
+        else:
+            relay = Relay(server_port, rtt, cut)
+            url = "http://127.0.0.1:%d/api/" % relay.port
+        api = BabyBuddyAPI(load=False, journal=journal,
+                           config={"api": {"url": url, "token": TOKEN, "timeout": TIMEOUT}})
+        api.children = [dict(CHILD)]
+        if mode == "rest sparse":
+            api.asession.max_idle = -1
+        if mode == "mqtt":
+            api.transport = MqttTransport(api, AsyncClient("127.0.0.1", relay.port, DEVICE,
+                                                           timeout=TIMEOUT), DEVICE)
+        latencies, radio, lost = await _device(api, journal, cycles * len(SCRIPT), gap)
+        if mode == "mqtt":
+            await _settled(server.store, cycles, 10000)
+            await api.transport.client.disconnect()
+        else:
+            await api.asession.close()
+        counts, running = _count(server.store)
+        events = len(latencies)
+        latencies.sort()
+        up, down = relay.up, relay.down
+        air = up + down + PER_PACKET * (2 * relay.chunks + PER_CONNECTION * relay.connections)
+        out = {
+            "mode": mode,
+            "events": events,
+            "lost": lost,
+            "p50_ms": quantile(latencies, 0.5),
+            "p95_ms": quantile(latencies, 0.95),
+            "max_ms": latencies[-1],
+            "radio_ms": radio,
+            "up_b": up / events,
+            "down_b": down / events,
+            "air_b": air / events,
+            "connections": relay.connections,
+            "cuts": relay.cuts,
+            "missing": sum(max(0, n * cycles - counts[ep]) for ep, n in EXPECT.items()),
+            "duplicates": sum(max(0, counts[ep] - n * cycles) for ep, n in EXPECT.items()),
+            "stray_timers": running,
+            "requests": server.store.requests,
+        }
+        if mode == "mqtt":
+            out["transport"] = api.transport.stats()
+            out["bridge"] = side.stats()
+            out["broker_device"] = broker.client_stats(DEVICE)
+        return out
+    finally:
+        if side is not None:
+            side.running = False
+            thread.join(2)
+        for s in (relay, broker):
+            if s is not None:
+                s.close()
+        server.shutdown()
+
+
+def main():
+    cycles, gap, rtt, latency, cut = 5, 0.05, 40, 0.1, 0.0
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--cycles":
+            cycles = int(args.pop(0))
+        elif arg == "--gap":
+            gap = float(args.pop(0))
+        elif arg == "--rtt":
+            rtt = int(args.pop(0))
+        elif arg == "--latency":
+            latency = float(args.pop(0))
+        elif arg == "--cut":
+            cut = float(args.pop(0))
+    work = "/tmp/bbmqtt-%d" % utime.ticks_ms()
+    os.mkdir(work)
+    results = [asyncio.run(run(mode, cycles, gap, rtt, latency, cut, work))
+               for mode in ("rest", "rest sparse", "mqtt")]
+
+    print("%d events, %d ms RTT, %.0f ms server time, %.0f%% of connections cut" % (
+        results[0]["events"], rtt, latency * 1000, cut * 100))
+    print("%-12s %6s %6s %6s %9s %6s %6s %7s %5s %5s %9s" % (
+        "mode", "p50 ms", "p95 ms", "max ms", "radio ms", "up B", "down B", "~air B", "conns",
+        "lost", "dup/miss"))
+    for r in results:
+        print("%-12s %6d %6d %6d %9d %6.0f %6.0f %7.0f %5d %5d %5d/%-3d" % (
+            r["mode"], r["p50_ms"], r["p95_ms"], r["max_ms"], r["radio_ms"], r["up_b"],
+            r["down_b"], r["air_b"], r["connections"], r["lost"], r["duplicates"], r["missing"]))
+    print(json.dumps(results))
+    mqtt = results[-1]
+    if any(r["missing"] or r["lost"] for r in results) or mqtt["duplicates"] or mqtt["stray_timers"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
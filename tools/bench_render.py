@@ -0,0 +1,154 @@
+# tools/bench_render.py
+"""Heap churn and GC cost of the home screen render, old path vs. new.
+
+The old path is the render from before ``home.py``: initials rebuilt with
+split/join/upper, an f-string header, ``%`` formatting of the timer line
+and ``LCDDisplay.show``. The new path is ``home.HomeScreen`` writing into
+its preallocated rows and ``LCDDisplay.show_codes``. Both draw the same
+frames (a clock tick with two timers cycling) on the simulated board.
+
+On MicroPython (unix port) the allocation is exact: the collector is off
+and ``gc.mem_alloc()`` is read around each render. The GC column is the
+``gc.collect()`` pause after 1000 renders' worth of garbage. Under CPython
+the allocation is tracemalloc's peak per render and there is no GC column::
+
+    micropython tools/bench_render.py
+    python tools/bench_render.py -n 2000
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+import sim
+
+sim.install()
+
+import gc
+import ujson as json
+import utime
+from activities import Activities
+from hardware import LCDDisplay
+from home import HomeScreen
+
+CHILD = {"id": 1, "first_name": "Ada", "last_name": "Lovelace"}
+
+
+class LegacyRender:
+    """The render_home and child_initials of main.py/api.py before home.py."""
+
+    def __init__(self, lcd, activities):
+        self.lcd = lcd
+        self.activities = activities
+        self.timestr = ""
+
+    def set_clock(self, hour, minute):
+        self.timestr = "%02d:%02d" % (hour, minute)
+
+    def child_initials(self, child):
+        name = child.get("first_name", "") + " " + child.get("last_name", "")
+        return "".join([n[0].upper() for n in name.split() if n])[:4]
+
+    def render(self, now):
+        header = f"{self.child_initials(CHILD)}   {self.timestr}"
+        running = self.activities.running()
+        idx = (now // 3) % len(running)
+        activity = running[idx]
+        line = activity.line(now)
+        if len(running) > 1:
+            line += "  %d/%d" % (idx + 1, len(running))
+        self.lcd.show(header, line)
+
+
+class NewRender:
+    def __init__(self, lcd, activities):
+        self.home = HomeScreen(lcd, activities, lcd.cols)
+        self.initials = "AL"  # cached by BabyBuddyAPI.child_initials
+
+    def set_clock(self, hour, minute):
+        self.home.set_clock(hour, minute)
+
+    def render(self, now):
+        self.home.render(now, self.initials, True, 0)
+
+
+def _frames(n, t0=1000000):
+    # One frame a second: the clock minute and the cycling timers move.
+    return [(t0 + i, (i // 3600) % 24, (i // 60) % 60) for i in range(n)]
+
+
+def _measure(renderer, frames):
+    mp = hasattr(gc, "mem_alloc")
+    tm = None
+    if not mp:
+        import tracemalloc as tm
+    allocs = []
+    t_us = 0
+    for now, hour, minute in frames:
+        if mp:
+            gc.disable()
+            before = gc.mem_alloc()
+        else:
+            tm.start()
+        t0 = utime.ticks_us()
+        renderer.set_clock(hour, minute)
+        renderer.render(now)
+        t_us += utime.ticks_diff(utime.ticks_us(), t0)
+        if mp:
+            allocs.append(gc.mem_alloc() - before)
+            gc.enable()
+        else:
+            allocs.append(tm.get_traced_memory()[1])
+            tm.stop()
+    pause = None
+    if mp:
+        # The pause left behind by 1000 renders' worth of garbage.
+        gc.collect()
+        gc.disable()
+        for now, hour, minute in frames[:1000]:
+            renderer.set_clock(hour, minute)
+            renderer.render(now)
+        gc.enable()
+        t0 = utime.ticks_us()
+        gc.collect()
+        pause = utime.ticks_diff(utime.ticks_us(), t0)
+    allocs.sort()
+    return {
+        "render_us": t_us / len(frames),
+        "alloc_mean_b": sum(allocs) / len(allocs),
+        "alloc_max_b": allocs[-1],
+        "alloc_zero_pct": 100 * sum(1 for a in allocs if a == 0) / len(allocs),
+        "gc_us_per_1000": pause,
+    }
+
+
+def main():
+    n = 1000
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "-n":
+            n = int(args.pop(0))
+    frames = _frames(n)
+    results = {}
+    for name, cls in (("old", LegacyRender), ("new", NewRender)):
+        activities = Activities()
+        activities.get("feeding").begin(1, frames[0][0] - 3725)
+        activities.get("sleep").begin(2, frames[0][0] - 125)
+        lcd = LCDDisplay()
+        renderer = cls(lcd, activities)
+        renderer.set_clock(0, 0)
+        renderer.render(frames[0][0])  # warm up caches and the panel
+        results[name] = _measure(renderer, frames)
+
+    print("%-5s %10s %12s %11s %9s %14s" % (
+        "path", "render us", "alloc B avg", "alloc B max", "zero %", "gc us / 1000"))
+    for name, r in results.items():
+        gc_us = r["gc_us_per_1000"]
+        print("%-5s %10.1f %12.1f %11d %9.1f %14s" % (
+            name, r["render_us"], r["alloc_mean_b"], r["alloc_max_b"], r["alloc_zero_pct"],
+            "-" if gc_us is None else "%d" % gc_us))
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
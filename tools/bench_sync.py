@@ -0,0 +1,127 @@
+# tools/bench_sync.py
+"""Cost of following remote timer changes: naive polling vs. sync.TimerSync.
+
+Runs :class:`sync.TimerSync` against the stand-in server from
+``tools/mockserver.py`` (started in-process, so CPython only) over a
+simulated stretch of time in which someone else starts or stops a timer
+every ``--change-every`` seconds. Two strategies are compared:
+
+* ``naive``       - full list every ``SYNC_MIN`` seconds, no ETags
+* ``conditional`` - ETag/If-None-Match and the adaptive interval
+
+Polls stand for radio wakeups; bytes are what the server sent, headers
+included. The delay column is how long a remote change took to show::
+
+    python tools/bench_sync.py --hours 8 --change-every 900
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+from sim import compat
+
+compat.install()
+
+import ujson as json
+import uasyncio as asyncio
+import uos as os
+import utime
+
+import mockserver
+from activities import Activities
+from api import BabyBuddyAPI
+from journal import Journal
+import sync
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+CHILDREN = [
+    {"id": 1, "first_name": "Ada", "last_name": "Lovelace"},
+    {"id": 2, "first_name": "Alan", "last_name": "Turing"},
+]
+
+
+def _remote(store, step):
+    """Every other step starts a feeding for child 1, the next one ends it."""
+    with store.lock:
+        if step % 2 == 0:
+            store.timers.append({"id": store.new_id(), "child": 1, "name": "feeding",
+                                 "start": mockserver._now(), "end": None, "active": True})
+        else:
+            store.timers = [t for t in store.timers if t["name"] != "feeding"]
+
+
+async def run(strategy, server, url, seconds, change_every, work):
+    store = server.store = mockserver.Store(children=list(CHILDREN))
+    # A timer for the other child keeps the list from being trivially empty.
+    store.timers.append({"id": store.new_id(), "child": 2, "name": "sleep",
+                         "start": mockserver._now(), "end": None, "active": True})
+    server.etags = strategy == "conditional"
+    journal = Journal(work + "/journal-%s.log" % strategy, work + "/journal-%s.json" % strategy)
+    api = BabyBuddyAPI(load=False, journal=journal,
+                       config={"api": {"url": url, "token": TOKEN}})
+    api.children = [dict(c) for c in CHILDREN]
+    activities = Activities()
+    ts = sync.TimerSync(api, activities, journal)
+
+    clock = 0          # simulated seconds
+    step = 0
+    changed_at = None  # simulated time of the change not yet seen
+    delays = []
+    while clock < seconds:
+        if changed_at is None and clock >= (step + 1) * change_every:
+            _remote(store, step)
+            step += 1
+            changed_at = step * change_every  # happened between two polls
+        await ts.poll()
+        running = activities.get("feeding").active
+        if changed_at is not None and running == (step % 2 == 1):
+            delays.append(clock - changed_at)
+            changed_at = None
+        if strategy == "naive":
+            ts.interval = sync.SYNC_MIN
+        clock += ts.interval
+    await api.asession.close()
+    return {
+        "strategy": strategy,
+        "polls": ts.polls,
+        "not_modified": ts.not_modified,
+        "changes": step,
+        "seen": len(delays),
+        "bytes": store.bytes_out,
+        "delay_mean_s": sum(delays) / len(delays) if delays else None,
+        "delay_max_s": max(delays) if delays else None,
+    }
+
+
+def main():
+    hours = 1.0
+    change_every = 600
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--hours":
+            hours = float(args.pop(0))
+        elif arg == "--change-every":
+            change_every = int(args.pop(0))
+
+    server = mockserver.serve(port=0)
+    url = "http://127.0.0.1:%d/api/" % server.server_address[1]
+    work = "/tmp/bbsync-%d" % utime.ticks_ms()
+    os.mkdir(work)
+    try:
+        results = [asyncio.run(run(s, server, url, int(hours * 3600), change_every, work))
+                   for s in ("naive", "conditional")]
+    finally:
+        server.shutdown()
+
+    print("%-12s %6s %6s %8s %10s %9s %9s" % (
+        "strategy", "polls", "304s", "seen", "bytes", "delay s", "max s"))
+    for r in results:
+        print("%-12s %6d %6d %4d/%-3d %10d %9.0f %9d" % (
+            r["strategy"], r["polls"], r["not_modified"], r["seen"], r["changes"],
+            r["bytes"], r["delay_mean_s"] or 0, r["delay_max_s"] or 0))
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
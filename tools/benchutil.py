@@ -0,0 +1,30 @@
+# tools/benchutil.py
+"""Helpers shared by the benchmarks in ``tools/``.
+
+Import after ``sim.install()`` or ``sim.compat.install()``; runs under
+CPython and the MicroPython unix port.
+"""
+
+import uasyncio as asyncio
+import utime
+
+# Event loop lag probe period (s).
+PROBE = 0.01
+
+
+def quantile(values, q):
+    """The ``q`` quantile (0 to 1) of ``values`` by nearest rank, or None
+    if there are none."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def probe(stop, lags, period=PROBE):
+    """Append how late (ms) each ``period`` s sleep wakes up to ``lags``
+    until the event ``stop`` is set."""
+    while not stop.is_set():
+        t0 = utime.ticks_ms()
+        await asyncio.sleep(period)
+        lags.append(utime.ticks_diff(utime.ticks_ms(), t0) - period * 1000)
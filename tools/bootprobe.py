@@ -0,0 +1,67 @@
+# tools/bootprobe.py
+"""Time and heap cost of importing the device modules (MicroPython only).
+
+Imports the modules in the order ``main.py`` pulls them in, on the
+simulated board, with the garbage collector off so the allocation count
+includes everything compiling and loading left behind. Prints one JSON
+line. ``tools/build.py`` runs it against the source tree and the build::
+
+    micropython tools/bootprobe.py .
+    micropython tools/bootprobe.py build
+"""
+
+import sys
+
+ROOT = (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/.."
+TREE = sys.argv[1] if len(sys.argv) > 1 else ROOT
+sys.path.insert(0, ROOT)
+sys.path.insert(0, TREE)
+import sim
+
+sim.install()
+
+import gc
+import ujson as json
+import utime
+
+# Dependencies first, so each line is the cost of that module alone.
+MODULES = ("httpclient", "jsonstream", "activities", "transport", "api", "hardware", "journal",
+           "power", "ui", "history", "home", "snapshot", "perf", "netsup", "sync", "clock",
+           "inputbus", "cache", "mqttclient")
+
+
+def probe(name):
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    t0 = utime.ticks_us()
+    __import__(name)
+    us = utime.ticks_diff(utime.ticks_us(), t0)
+    alloc = gc.mem_alloc() - before
+    gc.enable()
+    gc.collect()
+    return {"module": name, "us": us, "alloc": alloc}
+
+
+def main():
+    rows = [probe(name) for name in MODULES]
+    # main.py itself; a build ships it as babypad.mpy behind a stub main.py.
+    app = "babypad" if "babypad" in _listing(TREE) else "main"
+    rows.append(probe(app))
+    gc.collect()
+    print(json.dumps({
+        "tree": TREE,
+        "modules": rows,
+        "total_us": sum(r["us"] for r in rows),
+        "peak_alloc": sum(r["alloc"] for r in rows),
+        "retained": gc.mem_alloc(),
+    }))
+
+
+def _listing(path):
+    import uos as os
+    return [n.split(".")[0] for n in os.listdir(path)]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# tools/bridge.py
+"""Forwards the device's MQTT event messages to Baby Buddy's REST API.
+
+The counterpart of ``transport.MqttTransport``, run next to the broker
+(CPython, or the MicroPython unix port). It subscribes to
+``bb/+/+`` at QoS 1 with a persistent session, so events published while
+it is down wait at the broker, and posts each ``{"n": seq, "d": data}``
+to ``<url><endpoint>/`` with ``api.BabyBuddyAPI``, one message at a time
+in the order they came. Messages asking for an answer (``"r": 1``, timer
+starts) get ``{"n": seq, "s": status, "id": id}`` on ``bbr/<device>``.
+
+A message is acknowledged only once Baby Buddy gave a final answer (2xx or
+4xx); while the server is down or failing it is retried with backoff. The
+last answers are kept per ``(device, seq)``, so a message the device or
+the broker sends again is answered without a second post::
+
+    python tools/bridge.py --broker 127.0.0.1:1883 --url http://127.0.0.1:8000/api/ \\
+        --token YOUR_BABYBUDDY_API_TOKEN
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+from sim import compat
+
+compat.install()
+
+import ujson as json
+import uasyncio as asyncio
+
+from api import BabyBuddyAPI
+from mqttclient import AsyncClient, DEFAULT_PORT
+from transport import EVENTS, REPLIES
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+CLIENT_ID = "babybuddy-bridge"
+# Answers remembered for dropping duplicates.
+KEEP = 256
+# Backoff between tries of a post Baby Buddy did not answer for good (s).
+RETRY_MIN = 1
+RETRY_MAX = 60
+
+
+def _final(status):
+    return status is not None and status < 500 and status not in (408, 429)
+
+
+class Bridge:
+    def __init__(self, api, client, keep=KEEP):
+        self.api = api
+        self.client = client
+        self.keep = keep
+        client.clean = False
+        client.subscriptions.append((EVENTS + "/+/+", 1))
+        client.on_message = self._received
+        self.inbox = []         # (topic, payload, pid) not handled yet
+        self.wake = asyncio.Event()
+        self.answers = {}       # (device, seq) -> (status, id), oldest first
+        self.running = True
+        self.forwarded = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.retries = 0
+
+    def _received(self, topic, payload, pid):
+        self.inbox.append((topic, payload, pid))
+        self.wake.set()
+
+    async def run(self):
+        delay = RETRY_MIN
+        while self.running:
+            if not self.client.connected():
+                try:
+                    await self.client.connect()
+                    delay = RETRY_MIN
+                except Exception as e:
+                    print(f"Bridge: broker connection failed: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, RETRY_MAX)
+                    continue
+            if not self.inbox:
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), 1)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            topic, payload, pid = self.inbox.pop(0)
+            try:
+                await self.handle(topic, payload, pid)
+            except Exception as e:
+                # Not acknowledged: the broker sends it again on reconnect.
+                print(f"Bridge: {topic} error: {e}")
+                await self.client.close()
+                self.inbox = []
+
+    async def handle(self, topic, payload, pid):
+        _, device, endpoint = topic.split("/", 2)
+        try:
+            msg = json.loads(payload)
+            seq = msg["n"]
+            data = msg["d"]
+        except (ValueError, KeyError, TypeError):
+            print(f"Bridge: dropping malformed message on {topic}")
+            if pid is not None:
+                await self.client.ack(pid)
+            return
+        key = (device, seq)
+        answer = self.answers.get(key)
+        if answer is None:
+            answer = await self._forward(endpoint, data)
+            self.answers[key] = answer
+            while len(self.answers) > self.keep:
+                del self.answers[next(iter(self.answers))]
+        else:
+            self.duplicates += 1
+        if msg.get("r"):
+            await self.client.publish(REPLIES + "/" + device,
+                                      json.dumps({"n": seq, "s": answer[0], "id": answer[1]}))
+        if pid is not None:
+            await self.client.ack(pid)
+
+    async def _forward(self, endpoint, data):
+        delay = RETRY_MIN
+        while True:
+            res = await self.api.apost(endpoint, data)
+            status = self.api.last_status
+            if _final(status):
+                break
+            self.retries += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX)
+        self.forwarded += 1
+        if res is None:
+            self.rejected += 1
+            print(f"Bridge: Baby Buddy rejected {endpoint}: {status}")
+        return status, res.get("id") if res else None
+
+    def stats(self):
+        return {"forwarded": self.forwarded, "duplicates": self.duplicates,
+                "rejected": self.rejected, "retries": self.retries}
+
+
+def make_bridge(broker, url, token=TOKEN, client_id=CLIENT_ID):
+    """A :class:`Bridge` for ``broker`` ("host" or "host:port") and the API at ``url``."""
+    host, _, port = broker.partition(":")
+    api = BabyBuddyAPI(load=False, config={"api": {"url": url, "token": token}})
+    return Bridge(api, AsyncClient(host, int(port) if port else DEFAULT_PORT, client_id))
+
+
+def main():
+    broker, url, token = "127.0.0.1", "http://127.0.0.1:8000/api/", TOKEN
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--broker":
+            broker = args.pop(0)
+        elif arg == "--url":
+            url = args.pop(0)
+        elif arg == "--token":
+            token = args.pop(0)
+    bridge = make_bridge(broker, url, token)
+    print("Bridge: %s -> %s" % (broker, url))
+    asyncio.run(bridge.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# tools/build.py
+"""Precompile the device modules to .mpy, optionally as a frozen manifest.
+
+Writes ``build/`` ready to copy to the board: every module as ``.mpy``
+(cross-compiled with ``mpy-cross``) and ``main.py`` compiled as
+``babypad.mpy`` behind a two-line stub, since MicroPython only runs a
+``main.py`` source file at boot. ``--manifest`` also writes
+``build/manifest.py`` for a firmware build with the modules frozen in
+(``make BOARD=RPI_PICO_W FROZEN_MANIFEST=.../build/manifest.py``).
+
+With ``--micropython`` pointing at a unix port binary, the import time and
+heap of the source tree and the build are compared via
+``tools/bootprobe.py``. On the board itself ``main.py`` prints
+``Boot: <ms> ms, heap <bytes> B`` once the home screen is up, for either
+layout::
+
+    python tools/build.py
+    python tools/build.py --manifest --micropython ~/micropython/ports/unix/build-standard/micropython
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Modules copied to the board; main.py is handled separately.
+MODULES = ("activities", "api", "cache", "clock", "diag", "hardware", "history", "home", "httpclient",
+           "inputbus", "journal", "jsonstream", "mqttclient", "netsup", "networker", "numentry", "perf",
+           "power", "snapshot", "sync", "transport", "ui")
+APP = "babypad"
+STUB = """# main.py
+# The application is precompiled in %s.mpy.
+import %s
+%s.main()
+""" % (APP, APP, APP)
+
+
+def find_mpy_cross(path=None):
+    if path:
+        return [path]
+    if shutil.which("mpy-cross"):
+        return ["mpy-cross"]
+    try:
+        import mpy_cross  # noqa: F401  (pip install mpy-cross)
+        return [sys.executable, "-m", "mpy_cross"]
+    except ImportError:
+        return None
+
+
+def compile_all(out, mpy_cross, arch, opt):
+    sources = [(name, os.path.join(ROOT, name + ".py")) for name in MODULES]
+    sources.append((APP, os.path.join(ROOT, "main.py")))
+    rows = []
+    for name, src in sources:
+        dst = os.path.join(out, name + ".mpy")
+        cmd = mpy_cross + ["-march=" + arch, "-O%d" % opt, "-s", name + ".py", "-o", dst, src]
+        subprocess.run(cmd, check=True)
+        rows.append((name, os.path.getsize(src), os.path.getsize(dst)))
+    with open(os.path.join(out, "main.py"), "w") as f:
+        f.write(STUB)
+    return rows
+
+
+def write_manifest(out, board):
+    # Frozen modules are compiled by the firmware build, so freeze sources;
+    # main.py goes in under the application name next to the stub.
+    frozen = os.path.join(out, "frozen")
+    os.makedirs(frozen, exist_ok=True)
+    shutil.copy(os.path.join(ROOT, "main.py"), os.path.join(frozen, APP + ".py"))
+    lines = [
+        "# Generated by tools/build.py",
+        'include("$(PORT_DIR)/boards/%s/manifest.py")' % board,
+    ]
+    for name in MODULES:
+        lines.append('module("%s.py", base_path="%s")' % (name, ROOT))
+    lines.append('module("%s.py", base_path="%s")' % (APP, frozen))
+    lines.append("# machine_i2c_lcd, lcd_api and rotary_irq can be frozen the same way")
+    path = os.path.join(out, "manifest.py")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def probe(micropython, tree):
+    script = os.path.join(ROOT, "tools", "bootprobe.py")
+    res = subprocess.run([micropython, script, tree], check=True, capture_output=True, text=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=os.path.join(ROOT, "build"))
+    parser.add_argument("--mpy-cross", help="mpy-cross binary (default: PATH or the pip package)")
+    parser.add_argument("--arch", default="armv6m", help="native arch for mpy-cross (RP2040: armv6m)")
+    parser.add_argument("-O", dest="opt", type=int, default=1,
+                        help="mpy-cross optimisation level; 1+ strips asserts")
+    parser.add_argument("--manifest", action="store_true", help="also write a frozen-module manifest")
+    parser.add_argument("--board", default="RPI_PICO_W")
+    parser.add_argument("--micropython", help="unix port binary for the import time/heap comparison")
+    args = parser.parse_args()
+
+    mpy_cross = find_mpy_cross(args.mpy_cross)
+    if mpy_cross is None:
+        sys.exit("mpy-cross not found; install it with 'pip install mpy-cross' or pass --mpy-cross")
+    if os.path.isdir(args.out):
+        shutil.rmtree(args.out)
+    os.makedirs(args.out)
+
+    rows = compile_all(args.out, mpy_cross, args.arch, args.opt)
+    print("%-12s %9s %9s" % ("module", "source B", "mpy B"))
+    for name, src, mpy in rows:
+        print("%-12s %9d %9d" % (name, src, mpy))
+    print("%-12s %9d %9d" % ("total", sum(r[1] for r in rows), sum(r[2] for r in rows)))
+    print("wrote", args.out)
+    if args.manifest:
+        print("wrote", write_manifest(args.out, args.board))
+
+    if args.micropython:
+        src = probe(args.micropython, ROOT)
+        mpy = probe(args.micropython, args.out)
+        print("%-8s %10s %12s %10s" % ("tree", "import ms", "alloc B", "retained B"))
+        for name, r in (("source", src), ("mpy", mpy)):
+            print("%-8s %10.1f %12d %10d" % (name, r["total_us"] / 1000, r["peak_alloc"], r["retained"]))
+        print(json.dumps({"source": src, "mpy": mpy}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+# tools/loadtest.py
+"""Server load from a fleet of BabyPads sharing one Baby Buddy.
+
+Runs ``--devices`` simulated devices in one event loop against the
+stand-in server from ``tools/mockserver.py`` (started in-process, so
+CPython only). Each device is the firmware's own network stack - a
+``BabyBuddyAPI`` with its journal and a ``sync.TimerSync`` - doing what
+``main.py`` does with it: fetch the roster at boot, follow the running
+timers, and log button presses from a random script (feeds, sleeps,
+diapers, ...; one every ``--every`` seconds on average), replaying the
+journal after each. Two client profiles can be run:
+
+* ``current`` - keep-alive connection, ETag polls at the adaptive interval
+* ``naive``   - a new connection per request, the roster and the full timer
+  list every ``SYNC_MIN`` seconds
+
+Time is compressed ``--speed`` times, so requests per device-hour and
+bytes per device-hour are the numbers to size a server with. Request
+latency is per client, as ``BabyBuddyAPI`` sees it (streamed lists to the
+response headers). ``--save`` writes the summary as JSON and ``--compare``
+fails (exit 1) if requests, connections or bytes per device-hour grew by
+more than ``--tolerance`` against a saved one::
+
+    python tools/loadtest.py --devices 10 --minutes 60 --speed 60
+    python tools/loadtest.py --devices 10 --profile naive
+    python tools/loadtest.py --compare base.json --tolerance 0.1
+"""
+
+import sys
+
+sys.path.insert(0, (__file__.rsplit("/", 1)[0] if "/" in __file__ else ".") + "/..")
+from sim import compat
+
+compat.install()
+
+import random
+
+import ujson as json
+import uasyncio as asyncio
+import uos as os
+import utime
+
+import mockserver
+import sync
+from activities import Activities
+from api import BabyBuddyAPI, CHILD_FIELDS
+from benchutil import quantile
+from journal import Journal
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+CHILDREN = [
+    {"id": 1, "first_name": "Ada", "last_name": "Lovelace"},
+    {"id": 2, "first_name": "Alan", "last_name": "Turing"},
+]
+# Button script: (action, weight). Timed activities start or stop their
+# timer, whichever device started it.
+SCRIPT = (
+    ("feeding", 30),
+    ("diaper", 30),
+    ("sleep", 20),
+    ("tummy time", 10),
+    ("pumping", 4),
+    ("weight", 3),
+    ("temperature", 3),
+)
+PROFILES = ("current", "naive")
+
+
+class Recorder:
+    """Stands in for perf.Perf: keeps every request's latency in ms."""
+
+    def __init__(self):
+        self.ms = []
+        self.errors = 0
+
+    def request(self, endpoint, t0, status):
+        self.ms.append(utime.ticks_diff(utime.ticks_ms(), t0))
+        if status is None or status >= 400:
+            self.errors += 1
+
+
+class Device:
+    def __init__(self, n, url, profile, work, speed, every, rng):
+        self.n = n
+        self.profile = profile
+        self.speed = speed
+        self.every = every
+        self.rng = rng
+        self.perf = Recorder()
+        journal = Journal("%s/journal-%d.log" % (work, n), "%s/journal-%d.json" % (work, n))
+        self.api = BabyBuddyAPI(load=False, journal=journal, perf=self.perf, config={
+            "api": {"url": url, "token": TOKEN, "keep_alive": profile != "naive"}})
+        self.activities = Activities()
+        self.sync = sync.TimerSync(self.api, self.activities, journal)
+        self.resync = asyncio.Event()
+        self.presses = 0
+
+    async def _sleep(self, seconds):
+        await asyncio.sleep(seconds / self.speed)
+
+    async def boot(self):
+        api = self.api
+        while True:
+            children = await api.acollect("children", fields=CHILD_FIELDS)
+            if children is not None:
+                break
+            await self._sleep(5)
+        api.children = children
+        api.child_index = self.n % len(children)
+
+    async def sync_task(self):
+        ts = self.sync
+        naive = self.profile == "naive"
+        while True:
+            self.resync.clear()
+            if naive:
+                ts.etag = None
+                await self.api.acollect("children", fields=CHILD_FIELDS)
+            await ts.poll()
+            if naive:
+                ts.interval = sync.SYNC_MIN
+            try:
+                await asyncio.wait_for(self.resync.wait(), ts.interval / self.speed)
+            except asyncio.TimeoutError:
+                pass
+
+    async def script_task(self):
+        rng = self.rng
+        total = sum(w for _, w in SCRIPT)
+        while True:
+            await self._sleep(rng.expovariate(1 / self.every))
+            pick = rng.uniform(0, total)
+            for action, weight in SCRIPT:
+                pick -= weight
+                if pick <= 0:
+                    break
+            self.press(action)
+            self.presses += 1
+            self.sync.reset()
+            while self.api.journal.pending:
+                if not await self.api.areplay(limit=1):
+                    await self._sleep(5)
+            self.resync.set()
+
+    def press(self, action):
+        """What the Runtime button handlers hand to the API."""
+        api = self.api
+        activity = self.activities.by_name.get(action)
+        if activity is None:
+            if action == "diaper":
+                api.log_diaper_change(wet=self.rng.random() < 0.8, solid=self.rng.random() < 0.4)
+            elif action == "weight":
+                api.log_weight(3500 + self.rng.randrange(-50, 50) * 10)
+            else:
+                api.log_temperature(37)
+            return
+        if not activity.active:
+            data = dict(activity.data or {}, start=sync.format_time(utime.time()))
+            res = api.start_timer(action, data=data)
+            if res and "id" in res:
+                activity.begin(res["id"])
+            return
+        data = {field: options[0] for field, _, options in activity.prompts}
+        api.finish_timer(action, activity.timer_id, data=data)
+        activity.end()
+
+    async def run(self):
+        await self.boot()
+        tasks = [asyncio.create_task(self.sync_task()), asyncio.create_task(self.script_task())]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.api.asession.close()
+
+
+async def _fleet(devices, seconds):
+    tasks = [asyncio.create_task(d.run()) for d in devices]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except BaseException:
+            pass
+
+
+def run(devices=5, minutes=30.0, speed=60.0, every=600.0, profile="current", latency=0.0,
+        seed=1):
+    """Run one fleet and return its summary dict."""
+    server = mockserver.serve(port=0, latency=latency, store=mockserver.Store(
+        children=[dict(c) for c in CHILDREN]))
+    server.etags = True
+    url = "http://127.0.0.1:%d/api/" % server.server_address[1]
+    work = "/tmp/bbload-%d" % utime.ticks_ms()
+    os.mkdir(work)
+    rng = random.Random(seed)
+    fleet = [Device(n, url, profile, work, speed, every, random.Random(rng.random()))
+             for n in range(devices)]
+    seconds = minutes * 60 / speed
+    t0 = utime.ticks_ms()
+    try:
+        asyncio.run(_fleet(fleet, seconds))
+    finally:
+        server.shutdown()
+    wall = utime.ticks_diff(utime.ticks_ms(), t0) / 1000
+    store = server.store
+    device_hours = devices * minutes / 60
+    clients = []
+    every_ms = []
+    for d in fleet:
+        ms = d.perf.ms
+        every_ms.extend(ms)
+        clients.append({"device": d.n, "requests": len(ms), "errors": d.perf.errors,
+                        "presses": d.presses, "p50_ms": quantile(ms, 0.5),
+                        "p95_ms": quantile(ms, 0.95), "p99_ms": quantile(ms, 0.99),
+                        "max_ms": max(ms) if ms else None})
+    return {
+        "profile": profile,
+        "devices": devices,
+        "minutes": minutes,
+        "speed": speed,
+        "wall_s": wall,
+        "server": {
+            "requests": store.requests,
+            "requests_per_s": store.requests / wall,
+            "connections": store.connections,
+            "not_modified": store.not_modified,
+            "failures": store.failures,
+            "bytes_in": store.bytes_in,
+            "bytes_out": store.bytes_out,
+        },
+        "per_device_hour": {
+            "requests": store.requests / device_hours,
+            "connections": store.connections / device_hours,
+            "bytes": (store.bytes_in + store.bytes_out) / device_hours,
+        },
+        "latency": {"p50_ms": quantile(every_ms, 0.5), "p95_ms": quantile(every_ms, 0.95),
+                    "p99_ms": quantile(every_ms, 0.99)},
+        "clients": clients,
+    }
+
+
+def _report(r):
+    s = r["server"]
+    print("%s profile, %d devices, %.0f simulated min in %.1f s" % (
+        r["profile"], r["devices"], r["minutes"], r["wall_s"]))
+    print("%-6s %8s %6s %8s %8s %8s %8s" % ("device", "requests", "errors", "presses", "p50 ms",
+                                            "p95 ms", "p99 ms"))
+    for c in r["clients"]:
+        print("%-6d %8d %6d %8d %8s %8s %8s" % (c["device"], c["requests"], c["errors"],
+                                                c["presses"], c["p50_ms"], c["p95_ms"], c["p99_ms"]))
+    print("server: %d requests (%.1f/s), %d connections, %d 304s, %d failures, %d B in, %d B out" % (
+        s["requests"], s["requests_per_s"], s["connections"], s["not_modified"], s["failures"],
+        s["bytes_in"], s["bytes_out"]))
+    h = r["per_device_hour"]
+    print("per device-hour: %.0f requests, %.0f connections, %.0f B" % (
+        h["requests"], h["connections"], h["bytes"]))
+    lat = r["latency"]
+    print("all clients: p50 %s ms, p95 %s ms, p99 %s ms" % (lat["p50_ms"], lat["p95_ms"],
+                                                            lat["p99_ms"]))
+
+
+def _compare(r, path, tolerance):
+    """Regressions against a saved summary; returns a list of messages."""
+    with open(path) as f:
+        base = json.load(f)
+    out = []
+    for key in ("requests", "connections", "bytes"):
+        was = base["per_device_hour"][key]
+        now = r["per_device_hour"][key]
+        if was and now > was * (1 + tolerance):
+            out.append("%s per device-hour: %.0f -> %.0f (+%.0f%%)" % (
+                key, was, now, 100 * (now - was) / was))
+    return out
+
+
+def main():
+    opts = {"devices": 5, "minutes": 30.0, "speed": 60.0, "every": 600.0, "profile": "current",
+            "latency": 0.0, "seed": 1}
+    save = compare = None
+    tolerance = 0.1
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--save":
+            save = args.pop(0)
+        elif arg == "--compare":
+            compare = args.pop(0)
+        elif arg == "--tolerance":
+            tolerance = float(args.pop(0))
+        elif arg == "--profile":
+            opts["profile"] = args.pop(0)
+            if opts["profile"] not in PROFILES:
+                raise SystemExit("profile must be one of " + ", ".join(PROFILES))
+        elif arg in ("--devices", "--seed"):
+            opts[arg[2:]] = int(args.pop(0))
+        elif arg in ("--minutes", "--speed", "--every", "--latency"):
+            opts[arg[2:]] = float(args.pop(0))
+    result = run(**opts)
+    _report(result)
+    print(json.dumps(result))
+    if save:
+        with open(save, "w") as f:
+            json.dump(result, f)
+    if compare:
+        worse = _compare(result, compare, tolerance)
+        for line in worse:
+            print("REGRESSION", line)
+        if worse:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# tools/mockbroker.py
+"""Local stand-in for an MQTT broker such as Mosquitto (CPython only).
+
+MQTT 3.1.1 over plain TCP, with just what ``mqttclient.py`` and
+``tools/bridge.py`` use: QoS 0 and 1, ``+``/``#`` subscriptions and
+persistent sessions. A client that connects with clean session off keeps
+its subscriptions, and its QoS 1 messages queue while it is away and are
+sent again, marked DUP, until it acknowledges them. No retained messages,
+wills, QoS 2, keepalive timeouts or authentication. Bytes and packets are
+counted per client id. Run it directly::
+
+    python tools/mockbroker.py --port 1883
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+
+def _length(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        out.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(out)
+
+
+def _str(s):
+    s = s.encode()
+    return len(s).to_bytes(2, "big") + s
+
+
+def _packet(first, body):
+    return bytes((first,)) + _length(len(body)) + body
+
+
+def matches(pattern, topic):
+    """Whether a subscription pattern (with ``+`` and ``#``) covers ``topic``."""
+    want = pattern.split("/")
+    have = topic.split("/")
+    for i, part in enumerate(want):
+        if part == "#":
+            return True
+        if i >= len(have) or part not in ("+", have[i]):
+            return False
+    return len(want) == len(have)
+
+
+class Session:
+    """What the broker keeps for one client id."""
+
+    def __init__(self, client_id, clean):
+        self.client_id = client_id
+        self.clean = clean
+        self.subs = {}          # pattern -> QoS granted
+        self.conn = None
+        self.queue = []         # (topic, payload) QoS 1 messages held while away
+        self.inflight = {}      # pid -> (topic, payload) sent, not acknowledged
+        self.pid = 0
+
+    def next_pid(self):
+        self.pid = self.pid % 0xFFFF + 1
+        while self.pid in self.inflight:
+            self.pid = self.pid % 0xFFFF + 1
+        return self.pid
+
+
+class Stats:
+    def __init__(self):
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.packets_in = 0
+        self.packets_out = 0
+        self.connections = 0
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+class Connection:
+    """One client connection, served by its own thread."""
+
+    def __init__(self, broker, sock):
+        self.broker = broker
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+        self.wlock = threading.Lock()
+        self.session = None
+        self.stats = Stats()
+
+    def send(self, buf):
+        with self.wlock:
+            self.sock.sendall(buf)
+        self.stats.bytes_out += len(buf)
+        self.stats.packets_out += 1
+
+    def read(self):
+        head = self.rfile.read(1)
+        if not head:
+            return None
+        n = shift = 0
+        size = 2
+        while True:
+            b = self.rfile.read(1)
+            if not b:
+                return None
+            n |= (b[0] & 0x7F) << shift
+            if not b[0] & 0x80:
+                break
+            shift += 7
+            size += 1
+        body = self.rfile.read(n) if n else b""
+        if len(body) < n:
+            return None
+        self.stats.bytes_in += size + n
+        self.stats.packets_in += 1
+        return head[0] >> 4, head[0] & 0x0F, body
+
+    def drop(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def serve(self):
+        broker = self.broker
+        try:
+            packet = self.read()
+            if packet is None or packet[0] != CONNECT:
+                return
+            self._connect(packet[2])
+            while True:
+                packet = self.read()
+                if packet is None:
+                    break
+                kind, flags, body = packet
+                if kind == PUBLISH:
+                    self._publish(flags, body)
+                elif kind == PUBACK:
+                    with broker.lock:
+                        self.session.inflight.pop(int.from_bytes(body[:2], "big"), None)
+                elif kind == SUBSCRIBE:
+                    self._subscribe(body)
+                elif kind == PINGREQ:
+                    self.send(_packet(PINGRESP << 4, b""))
+                elif kind == DISCONNECT:
+                    break
+        except OSError:
+            pass
+        finally:
+            with broker.lock:
+                if self.session is not None and self.session.conn is self:
+                    self.session.conn = None
+                    if self.session.clean:
+                        broker.sessions.pop(self.session.client_id, None)
+                broker.conns.discard(self)
+            self.sock.close()
+
+    def _connect(self, body):
+        broker = self.broker
+        i = 2 + int.from_bytes(body[:2], "big")   # protocol name
+        flags = body[i + 1]
+        i += 4                                    # level, flags, keepalive
+        n = int.from_bytes(body[i:i + 2], "big")
+        client_id = body[i + 2:i + 2 + n].decode() or "anon-%d" % id(self)
+        clean = bool(flags & 0x02)
+        with broker.lock:
+            session = broker.sessions.get(client_id)
+            if session is not None and session.conn is not None:
+                session.conn.drop()               # taken over by the new connection
+            present = session is not None and not clean
+            if not present:
+                session = Session(client_id, clean)
+                broker.sessions[client_id] = session
+            session.clean = clean
+            session.conn = self
+            self.session = session
+            stats = broker.stats.setdefault(client_id, Stats())
+            stats.bytes_in += self.stats.bytes_in       # the CONNECT
+            stats.packets_in += self.stats.packets_in
+            stats.connections += 1
+            self.stats = stats
+            self.send(_packet(CONNACK << 4, bytes((1 if present else 0, 0))))
+            for pid, (topic, payload) in sorted(session.inflight.items()):
+                self._deliver(topic, payload, 1, pid, dup=True)
+            queued, session.queue = session.queue, []
+            for topic, payload in queued:
+                broker.deliver(session, topic, payload, 1)
+
+    def _subscribe(self, body):
+        broker = self.broker
+        pid = body[:2]
+        i = 2
+        granted = bytearray()
+        with broker.lock:
+            while i < len(body):
+                n = int.from_bytes(body[i:i + 2], "big")
+                pattern = body[i + 2:i + 2 + n].decode()
+                qos = min(body[i + 2 + n], 1)
+                self.session.subs[pattern] = qos
+                granted.append(qos)
+                i += 3 + n
+        self.send(_packet(SUBACK << 4, pid + bytes(granted)))
+
+    def _publish(self, flags, body):
+        broker = self.broker
+        n = int.from_bytes(body[:2], "big")
+        topic = body[2:2 + n].decode()
+        i = 2 + n
+        qos = (flags >> 1) & 3
+        if qos:
+            pid = body[i:i + 2]
+            i += 2
+        payload = body[i:]
+        with broker.lock:
+            broker.messages += 1
+            for session in list(broker.sessions.values()):
+                granted = [q for p, q in session.subs.items() if matches(p, topic)]
+                if granted:
+                    broker.deliver(session, topic, payload, min(qos, max(granted)))
+        if qos:
+            self.send(_packet(PUBACK << 4, pid))
+
+    def _deliver(self, topic, payload, qos, pid=None, dup=False):
+        body = _str(topic)
+        if qos:
+            body += pid.to_bytes(2, "big")
+        first = PUBLISH << 4 | (8 if dup else 0) | qos << 1
+        try:
+            self.send(_packet(first, body + payload))
+        except OSError:
+            self.drop()
+
+
+class Broker:
+    """Accepts connections in a background thread; see :func:`serve_broker`."""
+
+    def __init__(self, host="127.0.0.1", port=1883):
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.conns = set()
+        self.stats = {}         # client id -> Stats, across its connections
+        self.messages = 0
+        self.running = True
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while self.running:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = Connection(self, sock)
+            with self.lock:
+                self.conns.add(conn)
+            threading.Thread(target=conn.serve, daemon=True).start()
+
+    def deliver(self, session, topic, payload, qos):
+        # Called with the lock held.
+        conn = session.conn
+        if conn is None:
+            if qos and not session.clean:
+                session.queue.append((topic, payload))
+            return
+        pid = None
+        if qos:
+            pid = session.next_pid()
+            session.inflight[pid] = (topic, payload)
+        conn._deliver(topic, payload, qos, pid)
+
+    def client_stats(self, client_id):
+        stats = self.stats.get(client_id)
+        return stats.as_dict() if stats else Stats().as_dict()
+
+    def close(self):
+        self.running = False
+        self.sock.close()
+        with self.lock:
+            conns = list(self.conns)
+        for conn in conns:
+            conn.drop()
+
+
+def serve_broker(host="127.0.0.1", port=1883):
+    """Start the stand-in broker in a background thread and return it;
+    ``port=0`` picks a free port (see :attr:`Broker.port`)."""
+    return Broker(host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+    broker = serve_broker(args.host, args.port)
+    print("MQTT broker stand-in on %s:%d" % (args.host, broker.port))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        broker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# tools/mockserver.py
+"""Local stand-in for a Baby Buddy server (CPython only).
+
+Implements just enough of the REST API for the device code: the API root,
+``children``, ``timers`` and the entry endpoints the buttons post to. Data
+lives in memory. :func:`serve_ntp` adds an SNTP responder. Run it
+directly::
+
+    python tools/mockserver.py --port 8000 --ntp-port 1123
+
+and point ``secrets.json`` at ``http://<host>:8000/api/`` (and ``"ntp":
+{"host": "<host>", "port": 1123}``).
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import socket
+import ssl
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode
+
+TOKEN = "YOUR_BABYBUDDY_API_TOKEN"
+TIMER_ENTRIES = ("feedings", "sleep", "tummy-times", "pumping")
+# Seconds from 1900, the NTP epoch, to 1970.
+NTP_DELTA = 2208988800
+PLAIN_ENTRIES = ("changes", "weight", "temperature")
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+
+class Store:
+    """In-memory Baby Buddy data plus request counters."""
+
+    def __init__(self, children=None):
+        self.lock = threading.Lock()
+        self.children = children or [
+            {"id": 1, "first_name": "Ada", "last_name": "Lovelace", "slug": "ada-lovelace"},
+        ]
+        self.timers = []
+        self.entries = {name: [] for name in TIMER_ENTRIES + PLAIN_ENTRIES}
+        self.next_id = 1
+        self.requests = 0
+        self.connections = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.failures = 0
+        self.not_modified = 0
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server_version = "BabyBuddyStub/1.0"
+
+    def setup(self):
+        super().setup()
+        with self.server.store.lock:
+            self.server.store.connections += 1
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _reply(self, status, body=None, tagged=False):
+        data = json.dumps(body).encode() if body is not None else b""
+        tag = None
+        if tagged and self.server.etags:
+            # Like Django's ConditionalGetMiddleware: a hash of the body.
+            tag = '"%s"' % hashlib.md5(data).hexdigest()
+            if self.headers.get("If-None-Match") == tag:
+                status = 304
+                data = b""
+        self.send_response(status)
+        if tag:
+            self.send_header("ETag", tag)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+        head = sum(len(h) for h in self._headers_buffer)
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server.store.lock:
+            store = self.server.store
+            store.bytes_out += head + 2 + len(data)
+            if status >= 500:
+                store.failures += 1
+            elif status == 304:
+                store.not_modified += 1
+
+    def _begin(self):
+        store = self.server.store
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        with store.lock:
+            store.requests += 1
+            store.bytes_in += length
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.drop_rate and random.random() < self.server.drop_rate:
+            # Hang up without answering, like a dropped Wi-Fi link.
+            self.close_connection = True
+            return None
+        if self.server.fail_rate and random.random() < self.server.fail_rate:
+            self._reply(503, {"detail": "Service unavailable."})
+            return None
+        if self.headers.get("Authorization") != "Token " + self.server.token:
+            self._reply(401, {"detail": "Invalid token."})
+            return None
+        return body
+
+    def _route(self):
+        path = self.path.split("?", 1)[0]
+        prefix = self.server.prefix
+        if not path.startswith(prefix):
+            return None
+        return path[len(prefix):].strip("/")
+
+    def _page(self, results):
+        """Filter and paginate like Baby Buddy's LimitOffsetPagination."""
+        path, _, qs = self.path.partition("?")
+        query = {k: v[-1] for k, v in parse_qs(qs).items()}
+        for key in ("child", "name"):
+            if key in query:
+                results = [r for r in results if str(r.get(key)) == query[key]]
+        if "active" in query:
+            active = query["active"].lower() in ("true", "1")
+            results = [r for r in results if (r.get("end") is None) == active]
+        count = len(results)
+        offset = int(query.get("offset", 0))
+        if "limit" not in query:
+            return {"count": count, "next": None, "previous": None, "results": results[offset:]}
+        limit = int(query["limit"])
+        nxt = None
+        if offset + limit < count:
+            query["offset"] = offset + limit
+            nxt = "http://%s%s?%s" % (self.headers.get("Host"), path, urlencode(query))
+        return {"count": count, "next": nxt, "previous": None,
+                "results": results[offset:offset + limit]}
+
+    def do_GET(self):
+        if self._begin() is None:
+            return
+        store = self.server.store
+        route = self._route()
+        with store.lock:
+            if route == "":
+                body = {name: self.server.prefix + name + "/" for name in ("children", "timers")}
+            elif route == "children":
+                body = self._page(list(store.children))
+            elif route == "timers":
+                body = self._page(list(store.timers))
+            else:
+                body = None
+        if body is None:
+            self._reply(404, {"detail": "Not found."})
+        else:
+            self._reply(200, body, tagged=True)
+
+    def do_POST(self):
+        raw = self._begin()
+        if raw is None:
+            return
+        try:
+            data = json.loads(raw or b"{}")
+        except ValueError:
+            self._reply(400, {"detail": "JSON parse error"})
+            return
+        store = self.server.store
+        route = self._route()
+        with store.lock:
+            status, body = self._create(store, route, data)
+        self._reply(status, body)
+
+    def _create(self, store, route, data):
+        if route == "timers":
+            if "child" not in data:
+                return 400, {"child": ["This field is required."]}
+            # Baby Buddy takes the start from the client if it sends one.
+            timer = {"id": store.new_id(), "child": data["child"], "name": data.get("name"),
+                     "start": data.get("start") or _now(), "end": None, "active": True}
+            store.timers.append(timer)
+            return 201, timer
+        if route in TIMER_ENTRIES:
+            timer = next((t for t in store.timers if t["id"] == data.get("timer")), None)
+            if timer is None:
+                return 400, {"timer": ["Invalid pk - object does not exist."]}
+            # Baby Buddy deletes the timer once its entry is saved.
+            store.timers.remove(timer)
+            entry = dict(data, id=store.new_id(), child=timer["child"],
+                         start=timer["start"], end=_now())
+            store.entries[route].append(entry)
+            return 201, entry
+        if route in PLAIN_ENTRIES:
+            entry = dict(data, id=store.new_id(), time=_now())
+            store.entries[route].append(entry)
+            return 201, entry
+        return 404, {"detail": "Not found."}
+
+
+def serve(host="127.0.0.1", port=8000, latency=0.0, store=None, prefix="/api/",
+          token=TOKEN, certfile=None, keyfile=None, verbose=False, fail_rate=0.0,
+          drop_rate=0.0, etags=True):
+    """Start the stand-in in a background thread and return the server.
+
+    ``fail_rate`` is the fraction of requests answered with a 503 and
+    ``drop_rate`` the fraction whose connection is closed with no answer.
+    ``etags`` adds ETags to GET answers and honours If-None-Match.
+    """
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.store = store or Store()
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.drop_rate = drop_rate
+    server.etags = etags
+    server.prefix = prefix
+    server.token = token
+    server.verbose = verbose
+    if certfile:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(certfile, keyfile)
+        server.socket = ctx.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class NTPServer:
+    """SNTP responder on a UDP socket, answering from a background thread.
+
+    Replies carry the host clock plus ``offset`` seconds; ``drop_rate`` is
+    the fraction of queries left unanswered. ``answers`` counts replies.
+    """
+
+    def __init__(self, host="127.0.0.1", port=1123, offset=0.0, drop_rate=0.0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+        self.offset = offset
+        self.drop_rate = drop_rate
+        self.answers = 0
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            try:
+                msg, addr = self.sock.recvfrom(512)
+            except OSError:
+                return
+            if len(msg) < 48 or (self.drop_rate and random.random() < self.drop_rate):
+                continue
+            now = time.time() + self.offset + NTP_DELTA
+            sec = int(now)
+            frac = int((now - sec) * (1 << 32))
+            reply = bytearray(48)
+            reply[0] = 0x1C  # version 3, server
+            reply[1] = 2     # stratum
+            reply[24:32] = msg[40:48]  # originate = the client's transmit
+            struct.pack_into("!IIII", reply, 32, sec, frac, sec, frac)
+            self.sock.sendto(reply, addr)
+            self.answers += 1
+
+    def close(self):
+        self.sock.close()
+
+
+def serve_ntp(host="127.0.0.1", port=1123, offset=0.0, drop_rate=0.0):
+    """Start an :class:`NTPServer`; ``port=0`` picks a free port."""
+    return NTPServer(host, port, offset, drop_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="fraction of requests dropped without a response")
+    parser.add_argument("--no-etag", dest="etags", action="store_false",
+                        help="no ETags or 304 answers, like a stock Baby Buddy")
+    parser.add_argument("--ntp-port", type=int, help="also answer SNTP on this UDP port")
+    parser.add_argument("--token", default=TOKEN)
+    parser.add_argument("--certfile", help="serve HTTPS with this certificate")
+    parser.add_argument("--keyfile")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency, token=args.token,
+                   certfile=args.certfile, keyfile=args.keyfile, verbose=args.verbose,
+                   fail_rate=args.fail_rate, drop_rate=args.drop_rate, etags=args.etags)
+    print("Baby Buddy stand-in on %s:%d" % server.server_address)
+    if args.ntp_port:
+        serve_ntp(args.host, args.ntp_port)
+        print("SNTP on %s:%d" % (args.host, args.ntp_port))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
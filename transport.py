@@ -0,0 +1,159 @@
+# transport.py
+
+import ujson as json
+import random
+import uasyncio as asyncio
+
+# Status an MQTT post settles with once the broker has the message: the
+# bridge delivers it to Baby Buddy from there.
+ACCEPTED = 202
+# Endpoints whose posts wait for the bridge's answer: a timer start needs
+# the server's id before later entries can refer to it.
+WAIT_FOR = ("timers",)
+# Topics: events go to <EVENTS>/<device>/<endpoint>, the bridge answers on
+# <REPLIES>/<device>.
+EVENTS = "bb"
+REPLIES = "bbr"
+
+
+class RestTransport:
+    """Each write is its own HTTP POST on the API's sessions, or from the
+    network worker when there is one.
+
+    A transport's ``post``/``apost`` return ``(result, status, date)`` and
+    never raise; ``status`` is None when the write may not have arrived.
+    """
+
+    name = "rest"
+
+    def __init__(self, api):
+        self.api = api
+
+    def post(self, endpoint, data):
+        api = self.api
+        url = api.base_path + endpoint + "/"
+        status = date = None
+        try:
+            resp = api.session.request("POST", url, api.headers, json.dumps(data))
+            status = resp.status_code
+            date = resp.headers.get("date")
+            return (resp.json() if status in (200, 201) else None), status, date
+        except Exception as e:
+            print(f"API POST {url} error: {e}")
+            return None, status, date
+
+    async def apost(self, endpoint, data, timeout=None):
+        api = self.api
+        url = api.base_path + endpoint + "/"
+        if api.worker is not None:
+            try:
+                return await api.worker.call("POST", url, data, timeout)
+            except asyncio.TimeoutError as e:
+                print(f"API POST {url} error: {e}")
+                return None, None, None
+        status = date = None
+        try:
+            resp = await api.asession.request("POST", url, api.headers, json.dumps(data),
+                                              timeout=timeout)
+            status = resp.status_code
+            date = resp.headers.get("date")
+            return (resp.json() if status in (200, 201) else None), status, date
+        except Exception as e:
+            print(f"API POST {url} error: {e}")
+            return None, status, date
+
+
+class MqttTransport:
+    """Publishes each write as a compact message on one persistent MQTT
+    connection; ``tools/bridge.py`` posts it to Baby Buddy.
+
+    A message is ``{"n": seq, "d": data}`` at QoS 1 and counts as sent once
+    the broker has it. Posts to :data:`WAIT_FOR` endpoints add ``"r": 1``
+    and wait for the bridge's ``{"n": seq, "s": status, "id": id}``. An
+    entry that is tried again keeps its ``seq``, so the bridge can drop the
+    copies; the numbers start at random on every boot. Blocking posts (boot,
+    the REPL) have no event loop for the connection and go over REST.
+    """
+
+    name = "mqtt"
+
+    def __init__(self, api, client, device, wait_for=WAIT_FOR):
+        self.rest = RestTransport(api)
+        self.client = client
+        self.topic = EVENTS + "/" + device + "/"
+        self.wait_for = wait_for
+        client.subscriptions.append((REPLIES + "/" + device, 0))
+        client.on_message = self._message
+        self.seq = random.getrandbits(30)
+        self.last = None        # (endpoint, body, seq) of the entry not settled yet
+        self.waiting = None     # seq whose answer apost() waits for
+        self.reply = None
+        self.replied = asyncio.Event()
+        self.published = 0
+        self.retries = 0        # entries published again
+        self.timeouts = 0       # answers that did not come in time
+
+    def post(self, endpoint, data):
+        return self.rest.post(endpoint, data)
+
+    async def apost(self, endpoint, data, timeout=None):
+        body = json.dumps(data)
+        last = self.last
+        dup = last is not None and last[0] == endpoint and last[1] == body
+        if dup:
+            seq = last[2]
+            self.retries += 1
+        else:
+            self.seq = seq = (self.seq + 1) & 0x3FFFFFFF
+            self.last = (endpoint, body, seq)
+        wait = endpoint in self.wait_for
+        payload = '{"n":%d,%s"d":%s}' % (seq, '"r":1,' if wait else "", body)
+        topic = self.topic + endpoint
+        client = self.client
+        self.waiting = seq if wait else None  # the answer may come in right behind the PUBACK
+        self.reply = None
+        self.replied.clear()
+        try:
+            # Like httpclient, a connection found dead is reopened once.
+            reused = client.connected()
+            try:
+                await client.publish(topic, payload, 1, dup)
+            except OSError:
+                if not reused:
+                    raise
+                await client.publish(topic, payload, 1, True)
+            self.published += 1
+            if not wait:
+                self.last = None
+                return {"n": seq}, ACCEPTED, None
+            if self.reply is None:
+                try:
+                    await asyncio.wait_for(self.replied.wait(),
+                                           client.timeout if timeout is None else timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    print(f"MQTT {topic}: no answer from the bridge")
+                    return None, None, None
+        except Exception as e:
+            print(f"MQTT publish {topic} error: {e}")
+            return None, None, None
+        finally:
+            self.waiting = None
+        self.last = None
+        reply = self.reply
+        status = reply.get("s")
+        return ({"id": reply.get("id")} if status in (200, 201) else None), status, None
+
+    def _message(self, topic, payload, pid):
+        try:
+            reply = json.loads(payload)
+        except ValueError:
+            return
+        if self.waiting is not None and reply.get("n") == self.waiting:
+            self.reply = reply
+            self.replied.set()
+
+    def stats(self):
+        client = self.client
+        return {"published": self.published, "retries": self.retries, "timeouts": self.timeouts,
+                "connects": client.connects, "bytes_out": client.bytes_out, "bytes_in": client.bytes_in}
@@ -0,0 +1,165 @@
+# ui.py
+
+import uasyncio as asyncio
+
+# Encoder poll period in seconds, on ports without uasyncio.ThreadSafeFlag.
+POLL = 0.02
+# Longest wait for an encoder event in seconds.
+SETTLE = 0.25
+# Encoder acceleration as (detents per second, steps per detent), fastest
+# first; slower turns move one step per detent.
+ACCEL = ((25, 20), (12, 5))
+# Menus with at least this many options scroll faster on fast spins.
+LONG_LIST = 20
+CURSOR = ">"
+
+
+def accel(speed):
+    """Steps per detent at an encoder speed of ``speed`` detents/s."""
+    for rate, mult in ACCEL:
+        if speed >= rate:
+            return mult
+    return 1
+
+
+async def wait_input(encoder):
+    """Wait for the next encoder event: a detent or a switch edge."""
+    flag = encoder.flag
+    if flag is None or encoder.button.value() != encoder.last_button:
+        # No events on this port, or a switch edge came inside the debounce
+        # time and was not taken yet: look again shortly.
+        await asyncio.sleep(POLL)
+        return
+    try:
+        await asyncio.wait_for(flag.wait(), SETTLE)
+    except asyncio.TimeoutError:
+        pass
+
+
+class Menu:
+    """Scrolling list of options picked with the encoder.
+
+    Without a title the options fill every row, ``>`` marking the current
+    one; with a title the first row shows it and the position (``2/5``)
+    and the second the current option. Lists of any length scroll. A
+    detent that keeps the cursor inside the window rewrites only the two
+    cursor cells; otherwise the rows are redrawn and the display's
+    framebuffer sends just the cells that changed.
+    """
+
+    def __init__(self, lcd, options, title=None, index=0):
+        self.lcd = lcd
+        self.options = options
+        self.title = title
+        self.rows = 1 if title is not None else min(lcd.rows, len(options))
+        self.index = index % len(options)
+        self.top = min(self.index, len(options) - self.rows)
+
+    def _line(self, i):
+        mark = CURSOR if i == self.index else " "
+        return mark + self.options[i][:self.lcd.cols - 1]
+
+    def _header(self):
+        pos = "%d/%d" % (self.index + 1, len(self.options))
+        width = self.lcd.cols - len(pos) - 1
+        if width < 1:
+            return self.title
+        return self.title[:width] + " " * (width + 1 - len(self.title[:width])) + pos
+
+    def draw(self):
+        lcd = self.lcd
+        if self.title is not None:
+            lcd.show(self._header(), self._line(self.index))
+        elif self.rows > 1:
+            lcd.show(self._line(self.top), self._line(self.top + 1))
+        else:
+            lcd.show(self._line(self.top), "")
+
+    def move(self, diff, wrap=True):
+        n = len(self.options)
+        old = self.index
+        if wrap:
+            new = (old + diff) % n
+        else:
+            new = min(n - 1, max(0, old + diff))
+        if new == old:
+            return
+        self.index = new
+        if self.title is not None:
+            self.draw()
+            return
+        if self.top <= new < self.top + self.rows:
+            self.lcd.write(old - self.top, 0, " ", flush=False)
+            self.lcd.write(new - self.top, 0, CURSOR)
+            return
+        # Scroll just far enough to bring the new option into view.
+        self.top = new if new < self.top else new - self.rows + 1
+        self.draw()
+
+    async def run(self, encoder):
+        """Show the menu until the encoder is clicked; returns the index."""
+        encoder.reset(0)
+        self.draw()
+        long_list = len(self.options) >= LONG_LIST
+        while True:
+            diff = encoder.get()
+            if diff != 0:
+                mult = accel(encoder.speed()) if long_list else 1
+                # Fast spins stop at the ends instead of wrapping past them.
+                self.move(diff * mult, wrap=mult == 1)
+            if encoder.clicked():
+                return self.index
+            await wait_input(encoder)
+
+
+async def select_index(lcd, options, encoder, title=None, index=0):
+    """Pick one of ``options`` with a :class:`Menu`; returns its index."""
+    return await Menu(lcd, options, title, index).run(encoder)
+
+
+async def select_from_list(lcd, title, options, encoder):
+    return options[await Menu(lcd, options, title).run(encoder)]
+
+
+async def select_with_arrow(lcd, options, encoder):
+    """Display all options on one line with a moving arrow underneath.
+
+    Options that do not fit on one line are shown as a :class:`Menu`.
+    """
+    row = " ".join(options)
+    if len(row) > lcd.cols:
+        return options[await Menu(lcd, options).run(encoder)]
+    positions = []
+    pos = 0
+    for opt in options:
+        positions.append(pos)
+        pos += len(opt) + 1  # space after each option
+    idx = 0
+    encoder.reset(0)
+    lcd.show(row, " " * positions[idx] + "^")
+    while True:
+        diff = encoder.get()
+        if diff != 0:
+            new = (idx + diff) % len(options)
+            if new != idx:
+                lcd.write(1, positions[idx], " ", flush=False)
+                lcd.write(1, positions[new], "^")
+                idx = new
+        if encoder.clicked():
+            return options[idx]
+        await wait_input(encoder)
+
+
+async def show_pages(lcd, pages, encoder):
+    """Browse two-line pages with the encoder; a click closes the view."""
+    idx = 0
+    encoder.reset(0)
+    lcd.show(*pages[idx])
+    while True:
+        diff = encoder.get()
+        if diff != 0:
+            idx = (idx + diff) % len(pages)
+            lcd.show(*pages[idx])
+        if encoder.clicked():
+            return idx
+        await wait_input(encoder)